@@ -0,0 +1,231 @@
+"""
+apps/chatbot/answers.py
+
+챗봇 답변 캐시 (프로세스 전역, 메모리)
+- 대부분의 질문은 같은 몇 가지(적정 수온, 환수 주기, 합사 가능 여부) → 같은 질문에 LLM 을 다시 부르지 않음
+- 키: 정규화한 질문 (NFKC, 소문자, 문장부호·공백 정리) — 뷰마다 프롬프트가 달라 scope 로 구분
+- 근접 중복: 글자 3-gram 역색인 + Dice 유사도 ≥ CHATBOT_ANSWER_CACHE['similarity']
+  질문 속 숫자가 다르면("26도" / "28도") 유사해도 다른 질문으로 취급
+  다른 단어는 조사·어미가 붙은 같은 단어("수온" / "수온은")나 군말("뭐야", "please")만 허용
+  → 어종이 바뀌거나("구피" / "베타") 부정이 붙으면("가능한가요" / "불가능한가요", "can" / "cannot") 다른 질문
+- 저장하는 것은 LLM 원문 — 캐시에서 꺼낸 답변도 뷰의 후처리(_format_reply 등)를 그대로 거침
+- 만료: TTL + 최대 항목 수 초과 시 가장 오래 안 쓰인 항목부터 (LRU)
+- 사진이 있는 요청은 캐시를 거치지 않음 (question=None)
+- 어항 현황을 근거로 한 답변은 캐시하지 않음 (뷰가 question=None) — 측정마다 바뀌어 적중 없이 LRU 만 채우므로
+- 지표: metrics() → exact/similar 적중, 미스, 우회, 적중률
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+from . import llm
+
+DEFAULTS = {
+    'ttl':         24 * 3600,   # 초
+    'max_entries': 500,
+    'similarity':  0.8,         # 0~1, 1 이면 정확히 같은 질문만
+}
+
+_PUNCT  = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+_DIGITS = re.compile(r'\d+(?:\.\d+)?')
+
+# 있어도 없어도 같은 질문인 단어
+FILLERS = frozenset({
+    '뭐야', '뭐예요', '뭔가요', '무엇인가요', '알려줘', '알려주세요', '궁금해요', '좀',
+    'what', 'is', 'are', 'the', 'a', 'an', 'please', 'tell', 'me',
+})
+# 단어 끝에 붙어 뜻을 뒤집는 말
+NEGATIONS = ('않', '없', '못', 'not')
+
+
+def _options() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'CHATBOT_ANSWER_CACHE', {})}
+
+
+def normalize(question: str) -> str:
+    text = unicodedata.normalize('NFKC', question).lower()
+    return _SPACES.sub(' ', _PUNCT.sub(' ', text)).strip()
+
+
+def _grams(normalized: str) -> frozenset:
+    compact = normalized.replace(' ', '')
+    if len(compact) < 3:
+        return frozenset()
+    return frozenset(compact[i:i + 3] for i in range(len(compact) - 2))
+
+
+def _words(normalized: str) -> frozenset:
+    return frozenset(normalized.split())
+
+
+def _inflected(word: str, other: str) -> bool:
+    """word 가 other 에 조사·어미·복수형만 붙은 형태 (앞에 붙는 불-·안-·im- 등은 아님)"""
+    return word.startswith(other) and not any(n in word[len(other):] for n in NEGATIONS)
+
+
+def _same_words(words: frozenset, other: frozenset) -> bool:
+    """글자가 비슷해도 한쪽에만 있는 단어가 군말이나 같은 단어의 활용형이어야 같은 질문"""
+    for mine, theirs in ((words - other, other), (other - words, words)):
+        for word in mine:
+            if word in FILLERS:
+                continue
+            if not any(_inflected(word, w) or _inflected(w, word) for w in theirs):
+                return False
+    return True
+
+
+class _Entry:
+    __slots__ = ('text', 'grams', 'words', 'numbers', 'expires')
+
+    def __init__(self, text, grams, words, numbers, expires):
+        self.text    = text
+        self.grams   = grams
+        self.words   = words
+        self.numbers = numbers
+        self.expires = expires
+
+
+class AnswerCache:
+
+    def __init__(self, ttl: float, max_entries: int, similarity: float):
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self.similarity  = similarity
+        self._lock    = threading.Lock()
+        self._entries = OrderedDict()      # (scope, 정규화 질문) → _Entry, 오래 안 쓰인 것이 앞
+        self._index   = defaultdict(set)   # (scope, 3-gram) → {(scope, 정규화 질문)}
+        self._stats   = {'exact': 0, 'similar': 0, 'misses': 0, 'bypassed': 0}
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        for gram in entry.grams:
+            bucket = self._index[(key[0], gram)]
+            bucket.discard(key)
+            if not bucket:
+                del self._index[(key[0], gram)]
+
+    def _similar(self, scope: str, grams: frozenset, words: frozenset, numbers: tuple, now: float):
+        """가장 비슷한 유효 항목의 키 (없으면 None)"""
+        shared = defaultdict(int)
+        for gram in grams:
+            for key in self._index.get((scope, gram), ()):
+                shared[key] += 1
+        best, best_score = None, self.similarity
+        for key, count in shared.items():
+            entry = self._entries[key]
+            if entry.expires <= now or entry.numbers != numbers:
+                continue
+            score = 2 * count / (len(grams) + len(entry.grams))
+            if score >= best_score and _same_words(words, entry.words):
+                best, best_score = key, score
+        return best
+
+    def get(self, scope: str, question: str):
+        """캐시된 LLM 원문 (없으면 None)"""
+        normalized = normalize(question)
+        key, now   = (scope, normalized), time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= now:
+                self._drop(key)
+                entry = None
+            kind = 'exact'
+            if entry is None and self.similarity < 1:
+                grams = _grams(normalized)
+                key   = (self._similar(scope, grams, _words(normalized), tuple(_DIGITS.findall(normalized)), now)
+                         if grams else None)
+                entry = self._entries.get(key) if key else None
+                kind  = 'similar'
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats[kind] += 1
+            return entry.text
+
+    def put(self, scope: str, question: str, text: str):
+        if not text:
+            return
+        normalized = normalize(question)
+        key        = (scope, normalized)
+        entry      = _Entry(text, _grams(normalized), _words(normalized), tuple(_DIGITS.findall(normalized)),
+                            time.monotonic() + self.ttl)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            for gram in entry.grams:
+                self._index[(scope, gram)].add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def bypass(self):
+        with self._lock:
+            self._stats['bypassed'] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            hits   = self._stats['exact'] + self._stats['similar']
+            looked = hits + self._stats['misses']
+            return {
+                **self._stats,
+                'entries':  len(self._entries),
+                'hit_rate': round(hits / looked, 3) if looked else None,
+            }
+
+
+_cache      = None
+_cache_lock = threading.Lock()
+
+
+def cache() -> AnswerCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache(**_options())
+    return _cache
+
+
+def reset():
+    """캐시 폐기 (설정 변경·테스트용)"""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+# ──────────────────────────────────────────────
+# LLM 호출 래퍼 — 뷰는 llm.registry() 대신 이것을 씀
+# ──────────────────────────────────────────────
+
+async def astream(parts: list, *, scope: str, question, model: str = None, config: dict = None):
+    """
+    적중하면 캐시된 원문을 한 조각으로, 아니면 llm.astream() 조각을 그대로 흘리고 끝까지 받으면 저장.
+    question=None (사진 첨부 등) 이면 캐시를 거치지 않음.
+    """
+    answers   = cache()
+    cacheable = question is not None and bool(normalize(question))
+    if not cacheable:
+        answers.bypass()
+    else:
+        cached = answers.get(scope, question)
+        if cached is not None:
+            yield cached
+            return
+
+    received = []
+    async for chunk in llm.registry().astream(parts, model=model, config=config):
+        received.append(chunk)
+        yield chunk
+    if cacheable:
+        answers.put(scope, question, ''.join(received))
+
+
+async def agenerate(parts: list, *, scope: str, question, model: str = None, config: dict = None) -> str:
+    return ''.join([chunk async for chunk in astream(parts, scope=scope, question=question, model=model, config=config)])
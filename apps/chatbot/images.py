@@ -0,0 +1,175 @@
+"""
+apps/chatbot/images.py
+
+챗봇 사진 업로드 전처리
+- 요청 스레드/이벤트 루프 밖(스레드 또는 프로세스 풀)에서 디코딩·축소·재인코딩
+- 디코딩 전에 헤더의 가로×세로로 max_pixels 검사 (압축 폭탄 방지) → 넘으면 ImageError
+- JPEG 은 draft 모드로 DCT 단계에서 1/2~1/8 축소 디코딩 — 폰 사진 원본 크기 버퍼를 만들지 않음
+- EXIF 방향 반영 후 EXIF 제거, RGB JPEG 로 max_side 이내 · max_bytes 이내가 될 때까지 품질을 낮춰 재인코딩
+- 결과는 원본 바이트 해시로 캐시 (Django 캐시, CHATBOT_IMAGE['cache'] 별칭) — 같은 사진 재전송은 처리 없음
+- 반환 Prepared(data, mime_type) 는 LLM 백엔드가 요청 형식으로 바꿈 (GeminiBackend → types.Part)
+- 지표: metrics() → 캐시 적중/처리/거부 건수
+"""
+
+import asyncio
+import hashlib
+import io
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from PIL import Image, ImageOps
+
+DEFAULT_OPTIONS = {
+    'max_side':   1024,             # px, 긴 변 상한
+    'max_pixels': 40_000_000,       # 디코딩 전 가로×세로 상한
+    'max_upload': 20 * 1024 * 1024, # byte, 업로드 원본 상한
+    'max_bytes':  300 * 1024,       # byte, 재인코딩 결과 상한
+    'quality':    85,               # JPEG 시작 품질 (max_bytes 를 넘으면 단계적으로 낮춤)
+    'executor':   'thread',         # 'thread' | 'process'
+    'workers':    2,
+    'cache':      'default',        # CACHES 별칭
+    'cache_ttl':  3600,             # 초
+}
+MIN_QUALITY = 50
+
+
+def option(name: str):
+    return {**DEFAULT_OPTIONS, **getattr(settings, 'CHATBOT_IMAGE', {})}[name]
+
+
+class ImageError(ValueError):
+    """처리할 수 없는 업로드 (형식 오류, 크기 초과)"""
+
+
+class Prepared:
+    """전처리한 이미지 — LLM 요청 부분(part)으로 그대로 넘김"""
+
+    __slots__ = ('data', 'mime_type')
+
+    def __init__(self, data: bytes, mime_type: str = 'image/jpeg'):
+        self.data      = data
+        self.mime_type = mime_type
+
+    def __repr__(self):
+        return f"<Prepared {self.mime_type} {len(self.data)}B>"
+
+
+# ──────────────────────────────────────────────
+# 처리 (풀에서 실행 — 프로세스 풀도 되도록 모듈 최상위 함수, 인자는 바이트와 숫자만)
+# ──────────────────────────────────────────────
+
+def _encode(img: Image.Image, quality: int, max_bytes: int) -> bytes:
+    while True:
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=quality, optimize=True)
+        if buffer.tell() <= max_bytes or quality <= MIN_QUALITY:
+            return buffer.getvalue()
+        quality -= 10
+
+
+def process(raw: bytes, max_side: int, max_pixels: int, quality: int, max_bytes: int) -> bytes:
+    try:
+        img = Image.open(io.BytesIO(raw))
+        width, height = img.size
+    except Exception as e:
+        raise ImageError(f"이미지를 읽을 수 없습니다: {e}") from e
+    if width * height > max_pixels:
+        raise ImageError(f"이미지가 너무 큽니다 ({width}×{height})")
+
+    try:
+        # JPEG: 목표 크기 이상을 유지하는 가장 작은 배율로 디코딩 (그 외 형식은 무시됨)
+        img.draft('RGB', (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, 'white')
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail((max_side, max_side), Image.LANCZOS, reducing_gap=2.0)
+        # 새로 인코딩하면 EXIF(위치 등)는 따라가지 않음
+        return _encode(img, quality, max_bytes)
+    except Exception as e:
+        raise ImageError(f"이미지를 처리할 수 없습니다: {e}") from e
+
+
+# ──────────────────────────────────────────────
+# 풀 / 캐시
+# ──────────────────────────────────────────────
+
+_executor      = None
+_executor_lock = threading.Lock()
+_stats_lock    = threading.Lock()
+_stats         = {'cached': 0, 'processed': 0, 'rejected': 0}
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                pool      = ProcessPoolExecutor if option('executor') == 'process' else ThreadPoolExecutor
+                _executor = pool(max_workers=option('workers'))
+    return _executor
+
+
+def reset():
+    """풀 종료 (설정 변경·테스트용)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def metrics() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _cache():
+    return caches[option('cache')]
+
+
+def _read(upload):
+    """업로드 원본 바이트와 내용 해시 (파일 읽기·해시는 스레드에서)"""
+    upload.seek(0)
+    raw = upload.read()
+    return raw, hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+async def prepare(upload, max_side: int = None) -> Prepared:
+    """업로드 파일 → Prepared. 실패하면 ImageError."""
+    max_side = max_side or option('max_side')
+    if upload.size is not None and upload.size > option('max_upload'):
+        _count('rejected')
+        raise ImageError(f"이미지 파일이 너무 큽니다 ({upload.size // 1024}KB)")
+
+    raw, digest = await sync_to_async(_read, thread_sensitive=False)(upload)
+    key = f"chatbot:image:{digest}:{max_side}:{option('quality')}:{option('max_bytes')}"
+
+    data = await _cache().aget(key)
+    if data is not None:
+        _count('cached')
+        return Prepared(data)
+
+    loop = asyncio.get_running_loop()
+    try:
+        data = await loop.run_in_executor(
+            get_executor(), process, raw, max_side, option('max_pixels'), option('quality'), option('max_bytes'),
+        )
+    except ImageError:
+        _count('rejected')
+        raise
+    _count('processed')
+    await _cache().aset(key, data, option('cache_ttl'))
+    return Prepared(data)
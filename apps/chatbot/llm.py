@@ -0,0 +1,298 @@
+"""
+apps/chatbot/llm.py
+
+Gemini 모델 레지스트리 (프로세스 전역)
+- 키마다 클라이언트를 한 번 만들어 재사용 (google.genai.Client 는 키별 인스턴스 — 전역 configure 없음)
+- 키마다 사용할 모델을 list_models() 로 한 번 고르고 CHATBOT_MODEL_TTL 동안 캐시
+  → 챗 요청마다 있던 모델 목록 조회 왕복이 없어짐
+- 키 문제(인증·할당량 401/403/429, 서버 5xx, 연결 오류)로 실패한 키는 CHATBOT_KEY_COOLDOWN 초 동안 건너뛰고
+  다음 키로 (모델 선택 캐시도 버림). 그 외 거부(잘못된 이미지·인자, 안전 차단, 없는 모델 등 4xx)는
+  어느 키로 보내도 같으므로 키를 건드리지 않고 LLMRequestError 로 바로 호출자에게
+- 백엔드 교체: settings.CHATBOT_LLM_BACKEND (dotted path) — 테스트는 로컬 스텁 백엔드
+- 스트리밍: astream() → 토큰 조각을 도착하는 대로 (client.aio — 이벤트 루프를 막지 않음)
+  첫 조각 전에 키 문제로 실패하면 다음 키로, 조각을 보낸 뒤의 실패는 LLMError
+- 지표: metrics() → 모델 조회·생성 횟수, 키별 쿨다운 남은 시간
+"""
+
+import logging
+import os
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import images
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - google-genai 가 함께 설치하지만 없으면 OSError 만 연결 오류로 봄
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+# 선호 순서. 키에서 쓸 수 있는 것이 없으면 generateContent 를 지원하는 첫 모델.
+PREFERRED_MODELS = [
+    'models/gemini-2.5-flash',
+    'models/gemini-2.0-flash',
+    'models/gemini-1.5-flash',
+    'models/gemini-flash-latest',
+]
+
+
+class LLMError(RuntimeError):
+    """쓸 수 있는 키가 모두 실패"""
+
+
+class LLMRequestError(LLMError):
+    """요청 자체가 거부됨 (status: HTTP 상태 코드, 모르면 None) — 키 문제가 아니라 쿨다운하지 않음"""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+# 키를 쿨다운할 상태 코드 (인증 · 권한 · 할당량) — 5xx 는 모두
+COOLDOWN_STATUS = {401, 403, 429}
+
+_TRANSPORT_ERRORS = (OSError,) + ((httpx.TransportError,) if httpx else ())
+
+
+def _status(error):
+    """SDK 예외의 HTTP 상태 코드 (google.genai APIError.code, httpx HTTPStatusError.response)"""
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def key_failed(error) -> bool:
+    """키를 바꿔 다시 시도할 실패인가 — 인증·할당량·서버 오류·연결 오류"""
+    status = _status(error)
+    if status is None:
+        return isinstance(error, _TRANSPORT_ERRORS)
+    return status in COOLDOWN_STATUS or status >= 500
+
+
+def api_keys() -> list:
+    """GEMINI_API_KEY_1~3 환경변수 + settings.GEMINI_API_KEY (중복 제거, 순서 유지)"""
+    keys = [
+        os.getenv('GEMINI_API_KEY_1'),
+        os.getenv('GEMINI_API_KEY_2'),
+        os.getenv('GEMINI_API_KEY_3'),
+        getattr(settings, 'GEMINI_API_KEY', None),
+    ]
+    return list(dict.fromkeys(k for k in keys if k))
+
+
+def _model_ttl() -> float:
+    return getattr(settings, 'CHATBOT_MODEL_TTL', 3600)
+
+
+def _cooldown() -> float:
+    return getattr(settings, 'CHATBOT_KEY_COOLDOWN', 60)
+
+
+# ──────────────────────────────────────────────
+# 백엔드
+# ──────────────────────────────────────────────
+
+class GeminiBackend:
+    """google.genai — 키별 Client"""
+
+    @staticmethod
+    def _contents(parts: list) -> list:
+        """전처리한 이미지(images.Prepared)는 인코딩된 바이트 그대로 — SDK 가 다시 인코딩하지 않도록"""
+        from google.genai import types
+        return [types.Part.from_bytes(data=p.data, mime_type=p.mime_type) if isinstance(p, images.Prepared) else p
+                for p in parts]
+
+    def client(self, key: str):
+        from google import genai
+        return genai.Client(api_key=key)
+
+    def list_models(self, client) -> list:
+        """generateContent 를 지원하는 모델 이름"""
+        return [m.name for m in client.models.list() if 'generateContent' in (m.supported_actions or [])]
+
+    def generate(self, client, model: str, parts: list, config: dict = None) -> str:
+        from google.genai import types
+        response = client.models.generate_content(
+            model=model, contents=self._contents(parts),
+            config=types.GenerateContentConfig(**config) if config else None,
+        )
+        return response.text if response is not None else ''
+
+    async def stream(self, client, model: str, parts: list, config: dict = None):
+        """응답 텍스트 조각 (async iterator)"""
+        from google.genai import types
+        chunks = await client.aio.models.generate_content_stream(
+            model=model, contents=self._contents(parts),
+            config=types.GenerateContentConfig(**config) if config else None,
+        )
+        async for chunk in chunks:
+            if chunk.text:
+                yield chunk.text
+
+
+# ──────────────────────────────────────────────
+# 레지스트리
+# ──────────────────────────────────────────────
+
+class Registry:
+
+    def __init__(self, backend=None):
+        self.backend  = backend or import_string(getattr(settings, 'CHATBOT_LLM_BACKEND', 'chatbot.llm.GeminiBackend'))()
+        self._lock    = threading.Lock()
+        self._clients = {}   # 키 → 클라이언트
+        self._models  = {}   # 키 → (모델 이름, 만료 시각)
+        self._cooling = {}   # 키 → 쿨다운 끝 시각
+        self._stats   = {'lookups': 0, 'generations': 0, 'failures': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def client(self, key: str):
+        with self._lock:
+            client = self._clients.get(key)
+        if client is None:
+            client = self.backend.client(key)
+            with self._lock:
+                client = self._clients.setdefault(key, client)
+        return client
+
+    def resolve(self, key: str):
+        """키에서 쓸 모델 (TTL 캐시). 없으면 None."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._models.get(key)
+        if cached is not None and now < cached[1]:
+            return cached[0]
+
+        self._count('lookups')
+        available = self.backend.list_models(self.client(key))
+        model     = next((m for m in PREFERRED_MODELS if m in available), available[0] if available else None)
+        with self._lock:
+            self._models[key] = (model, now + _model_ttl())
+        return model
+
+    def cooling_down(self, key: str) -> bool:
+        with self._lock:
+            until = self._cooling.get(key)
+            if until is not None and time.monotonic() >= until:
+                del self._cooling[key]
+                until = None
+        return until is not None
+
+    def _fail(self, key: str, error: Exception):
+        """키 문제면 쿨다운, 아니면 LLMRequestError 로 호출자에게"""
+        self._count('failures')
+        if not key_failed(error):
+            logger.warning(f"[LLM] 요청 거부 (키 ...{key[-4:]} 유지): {error}")
+            raise LLMRequestError(str(error), status=_status(error)) from error
+        logger.warning(f"[LLM] 키 ...{key[-4:]} 실패 — {_cooldown()}초 쿨다운: {error}")
+        with self._lock:
+            self._cooling[key] = time.monotonic() + _cooldown()
+            self._models.pop(key, None)
+
+    def generate(self, parts: list, model: str = None, config: dict = None) -> str:
+        """
+        쿨다운이 아닌 키를 순서대로 시도해 응답 텍스트 반환.
+        model 을 주면 모델 선택(list_models) 없이 그 모델로. 빈 응답이면 다음 키.
+        """
+        keys = api_keys()
+        if not keys:
+            raise LLMError("API 키가 없습니다.")
+
+        last_error = None
+        for key in keys:
+            if self.cooling_down(key):
+                continue
+            try:
+                name = model or self.resolve(key)
+                if not name:
+                    continue
+                self._count('generations')
+                text = self.backend.generate(self.client(key), name, parts, config)
+            except Exception as e:
+                self._fail(key, e)
+                last_error = e
+                continue
+            if text:
+                return text
+        self._exhausted(keys, last_error)
+
+    async def astream(self, parts: list, model: str = None, config: dict = None):
+        """
+        generate() 의 스트리밍판 — 텍스트 조각을 도착하는 대로 yield.
+        키 전환은 첫 조각 전까지만 (이미 보낸 조각은 되돌릴 수 없음).
+        """
+        keys = api_keys()
+        if not keys:
+            raise LLMError("API 키가 없습니다.")
+
+        last_error = None
+        for key in keys:
+            if self.cooling_down(key):
+                continue
+            started = False
+            try:
+                # 모델 목록 조회는 동기 호출 — 캐시가 비었을 때만 스레드에서
+                name = model or await sync_to_async(self.resolve, thread_sensitive=False)(key)
+                if not name:
+                    continue
+                self._count('generations')
+                async for chunk in self.backend.stream(self.client(key), name, parts, config):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started:
+                    raise LLMError(str(e)) from e
+                self._fail(key, e)
+                last_error = e
+                continue
+            if started:
+                return
+        self._exhausted(keys, last_error)
+
+    async def agenerate(self, parts: list, model: str = None, config: dict = None) -> str:
+        """astream() 을 모은 전체 텍스트"""
+        return ''.join([chunk async for chunk in self.astream(parts, model, config)])
+
+    def _exhausted(self, keys: list, last_error):
+        if last_error is None and all(self.cooling_down(k) for k in keys):
+            raise LLMError("모든 API 키가 쿨다운 중입니다.")
+        raise LLMError(str(last_error) if last_error else "응답이 비어 있습니다.")
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                **self._stats,
+                'models':   {f"...{k[-4:]}": m for k, (m, _) in self._models.items()},
+                'cooldown': {f"...{k[-4:]}": round(until - now, 1) for k, until in self._cooling.items() if until > now},
+            }
+
+
+_registry      = None
+_registry_lock = threading.Lock()
+
+
+def registry() -> Registry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = Registry()
+    return _registry
+
+
+def reset():
+    """레지스트리 폐기 (설정 변경·테스트용)"""
+    global _registry
+    with _registry_lock:
+        _registry = None
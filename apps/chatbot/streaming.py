@@ -0,0 +1,62 @@
+"""
+apps/chatbot/streaming.py
+
+챗봇 응답 스트리밍 (Server-Sent Events)
+- 클라이언트가 Accept: text/event-stream 으로 요청하면 토큰을 도착하는 대로 push
+  · token: {"text": 조각}         — 화면에 바로 이어 붙임 (기호 제거만 한 원문)
+  · done:  {"reply": 최종 답변}   — 뷰의 후처리(줄 수 제한 등)를 거친 답변, 말풍선을 이것으로 교체
+  · error: {"message": 안내 문구}
+- 생성은 answers.astream() (답변 캐시 → llm.astream()) 을 await — 워커 스레드를 점유하지 않음
+- ASGI(fish.asgi) 에서만 스트리밍. WSGI 에서는 기존처럼 JSON 한 번에 응답
+"""
+
+import json
+import logging
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from . import answers, llm
+
+logger = logging.getLogger(__name__)
+
+
+def wants_stream(request) -> bool:
+    return isinstance(request, ASGIRequest) and 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _relay(parts, *, finish, save, clean, error_message, scope, question, model, config):
+    received = []
+    try:
+        async for chunk in answers.astream(parts, scope=scope, question=question, model=model, config=config):
+            received.append(chunk)
+            text = clean(chunk)
+            if text:
+                yield _sse('token', {'text': text})
+    except llm.LLMError as e:
+        logger.warning(f"[Chat] 스트리밍 실패: {e}")
+        yield _sse('error', {'message': error_message(e)})
+        return
+
+    reply = finish(''.join(received))
+    yield _sse('done', {'status': 'success', 'reply': reply})
+    await save(reply)
+
+
+def response(parts, *, finish, save, scope, question, clean=str, error_message=str,
+             model=None, config=None) -> StreamingHttpResponse:
+    """
+    finish(전체 텍스트) → 최종 답변, save(답변) 은 async — 스트림을 다 보낸 뒤 기록.
+    clean(조각) → 화면에 보낼 조각, error_message(LLMError) → 안내 문구.
+    scope/question → 답변 캐시 (question=None 이면 캐시 우회)
+    """
+    events   = _relay(parts, finish=finish, save=save, clean=clean, error_message=error_message,
+                      scope=scope, question=question, model=model, config=config)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control']     = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -4,10 +4,12 @@ try:
     from core.views import chat_api
 except ImportError:
     from apps.core.views import chat_api
+from . import views
 
 app_name = 'chatbot'
 
 urlpatterns = [
     # base.html의 fetch('/chatbot/ask/')와 매칭됩니다.
     path('ask/', chat_api, name='ask'),
+    path('metrics/', views.chat_metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,11 +1,9 @@
 from django.shortcuts import render
-import google.generativeai as genai
-from django.conf import settings
 from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from . import answers, images, llm, streaming
 from .models import ChatMessage
-import PIL.Image
-import os
 import json
 
 @login_required
@@ -14,8 +12,22 @@ def chatbot_home(request):
     history = ChatMessage.objects.filter(user=request.user).order_by('-created_at')[:50]
     return render(request, 'chatbot/chat.html', {'history': reversed(list(history))})
 
+@staff_member_required
+def chat_metrics(request):
+    """답변 캐시 적중률 · 사진 전처리 · LLM 키/모델 상태"""
+    return JsonResponse({
+        'answers': answers.cache().metrics(),
+        'images':  images.metrics(),
+        'llm':     llm.registry().metrics(),
+    })
+
+
+def _strip_symbols(text: str) -> str:
+    return text.replace('*', '').replace('#', '').replace('-', ' ')
+
+
 @login_required
-def ask_chatbot(request):
+async def ask_chatbot(request):
     if request.method == "POST":
         user_message = ""
         image_file = None
@@ -30,43 +42,61 @@ def ask_chatbot(request):
             user_message = request.POST.get('message', '').strip()
             image_file = request.FILES.get('image')
 
-        display_name = getattr(request.user, 'nickname', request.user.username)
+        user = await request.auser()
+        display_name = getattr(user, 'nickname', user.username)
         
-        # API 키 참조 (settings.py 우선)
-        api_key = getattr(settings, 'GEMINI_API_KEY', None) or os.environ.get('GEMINI_API_KEY_1')
-
-        if not api_key:
+        # API 키·클라이언트는 레지스트리가 관리 (키별 클라이언트 재사용, 실패한 키는 쿨다운)
+        if not llm.api_keys():
             return JsonResponse({'status': 'error', 'message': "API 키가 설정되지 않았습니다."}, status=500)
 
-        try:
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(
-                model_name='gemini-1.5-flash',
-                system_instruction=(
-                    f"당신은 '어항 도우미'입니다.\n"
-                    f"1. 첫 문장은 반드시 '{display_name}님! 🌊'으로 시작.\n"
-                    f"2. 별표(*), 해시(#), 대시(-) 등 특수 기호는 절대 사용 금지.\n"
-                    f"3. 아주 쉽고 짧게 핵심만 말할 것.\n"
-                    f"4. 가독성을 위해 줄바꿈을 자주 할 것.\n"
-                    f"5. 마지막에 [권장설정: 온도 26도, pH 7.0, 환수 7일] 형태를 꼭 포함할 것."
-                )
-            )
-            
-            if image_file:
-                img = PIL.Image.open(image_file)
-                response = model.generate_content([user_message or "이 어항 사진을 분석해줘.", img])
-            else:
-                response = model.generate_content(user_message)
-            
-            # 응답 텍스트 정리
-            bot_response = response.text.replace('*', '').replace('#', '').replace('-', ' ').strip()
-            
+        config = {
+            'system_instruction': (
+                f"당신은 '어항 도우미'입니다.\n"
+                f"1. 첫 문장은 반드시 '{display_name}님! 🌊'으로 시작.\n"
+                f"2. 별표(*), 해시(#), 대시(-) 등 특수 기호는 절대 사용 금지.\n"
+                f"3. 아주 쉽고 짧게 핵심만 말할 것.\n"
+                f"4. 가독성을 위해 줄바꿈을 자주 할 것.\n"
+                f"5. 마지막에 [권장설정: 온도 26도, pH 7.0, 환수 7일] 형태를 꼭 포함할 것."
+            ),
+        }
+
+        if image_file:
+            # 축소·EXIF 제거·재인코딩은 풀에서 (같은 사진은 캐시)
+            try:
+                img = await images.prepare(image_file)
+            except images.ImageError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            parts = [user_message or "이 어항 사진을 분석해줘.", img]
+        else:
+            parts = [user_message]
+
+        async def save(bot_response):
             # DB 저장 (message가 비어있을 경우 대응)
-            ChatMessage.objects.create(
-                user=request.user, 
-                message=user_message if user_message else "(사진 분석 요청)", 
+            await ChatMessage.objects.acreate(
+                user=user,
+                message=user_message if user_message else "(사진 분석 요청)",
                 response=bot_response
             )
+
+        def finish(text):
+            # 응답 텍스트 정리
+            return _strip_symbols(text).strip()
+
+        # 답변 첫 줄에 이름이 들어가므로 캐시는 사용자 이름별
+        scope    = f"chatbot:{display_name}"
+        question = None if image_file else user_message
+
+        if streaming.wants_stream(request):
+            return streaming.response(parts, finish=finish, save=save, clean=_strip_symbols,
+                                      error_message=lambda e: "AI 응답 중 오류가 발생했습니다.",
+                                      scope=scope, question=question,
+                                      model='gemini-1.5-flash', config=config)
+
+        try:
+            text = await answers.agenerate(parts, scope=scope, question=question,
+                                           model='gemini-1.5-flash', config=config)
+            bot_response = finish(text)
+            await save(bot_response)
             
             # 프론트엔드 JS가 'reply' 또는 'response' 중 무엇을 찾든 대응하도록 둘 다 보냅니다.
             return JsonResponse({
@@ -79,4 +109,4 @@ def ask_chatbot(request):
             print(f"Chatbot Error: {e}")
             return JsonResponse({'status': 'error', 'message': "AI 응답 중 오류가 발생했습니다."}, status=500)
             
-    return JsonResponse({'status': 'error', 'message': "잘못된 접근입니다."}, status=405)
\ No newline at end of file
+    return JsonResponse({'status': 'error', 'message': "잘못된 접근입니다."}, status=405)
@@ -1,3 +1,329 @@
-from django.test import TestCase
+import io
+import json
+import os
+from unittest import mock
 
-# Create your tests here.
+import PIL.Image
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from chatbot import answers, images, llm
+from chatbot.models import ChatMessage
+from monitoring import jobs
+from monitoring.models import Tank
+
+
+class TankIndexQueryCountTest(TestCase):
+    """어항 목록 페이지는 어항 수와 무관하게 일정한 쿼리 수를 유지해야 함 (N+1 회귀 방지)"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.client.force_login(self.user)
+
+    def _add_tanks(self, count):
+        for i in range(count):
+            tank = Tank.objects.create(user=self.user, name=f'어항{i}', target_temp=22.0)
+            for temp in (21.0, 22.5, 25.0):
+                self.client.post(
+                    '/monitoring/api/sensor/',
+                    json.dumps({'tank_id': tank.id, 'temperature': temp, 'ph': 7.4}),
+                    content_type='application/json', secure=True,
+                )
+        jobs.run_pending()
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response
+
+    def test_core_index_is_constant(self):
+        self._add_tanks(1)
+        single, _ = self._count_queries('/')
+        self._add_tanks(7)
+        many, response = self._count_queries('/')
+        self.assertEqual(single, many)
+
+        # 최신 측정값(25.0°C)이 상태 판정에 반영됐는지 확인
+        item = response.context['tank_data'][0]
+        self.assertEqual(item['latest'].temperature, 25.0)
+        self.assertEqual(item['status'], 'DANGER')
+
+    def test_monitoring_index_is_constant(self):
+        self._add_tanks(1)
+        single, _ = self._count_queries('/monitoring/')
+        self._add_tanks(7)
+        many, _ = self._count_queries('/monitoring/')
+        self.assertEqual(single, many)
+
+    def test_tank_without_readings(self):
+        Tank.objects.create(user=self.user, name='빈 어항')
+        _, response = self._count_queries('/')
+        item = response.context['tank_data'][0]
+        self.assertIsNone(item['latest'])
+        self.assertEqual(item['status'], 'NORMAL')
+
+
+def _png(size=(8, 8)):
+    buffer = io.BytesIO()
+    PIL.Image.new('RGB', size, 'blue').save(buffer, 'PNG')
+    return SimpleUploadedFile('tank.png', buffer.getvalue(), content_type='image/png')
+
+
+class StubAPIError(Exception):
+    """google.genai APIError 처럼 HTTP 상태 코드를 가진 예외"""
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+class StubBackend:
+    """Gemini 대신 쓰는 LLM 백엔드 — 호출 기록, 'bad' 로 시작하는 키는 할당량 초과, 'models/retired' 는 404"""
+
+    calls   = []
+    prompts = []
+
+    def client(self, key):
+        return key
+
+    @staticmethod
+    def _check(client, model):
+        if client.startswith('bad'):
+            raise StubAPIError('quota exceeded', 429)
+        if model == 'models/retired':
+            raise StubAPIError('model not found', 404)
+
+    def list_models(self, client):
+        self.calls.append(('list_models', client))
+        return ['models/other', 'models/gemini-2.0-flash']
+
+    def generate(self, client, model, parts, config=None):
+        self.calls.append(('generate', client, model))
+        self._check(client, model)
+        return '**🌡️ 수온: 24~26°C**'
+
+    async def stream(self, client, model, parts, config=None):
+        self.calls.append(('stream', client, model))
+        self.prompts.append(parts)
+        self._check(client, model)
+        for chunk in ('**🌡️ 수온', ': 24~26', '°C**'):
+            yield chunk
+
+
+@override_settings(CHATBOT_LLM_BACKEND='core.tests.StubBackend', GEMINI_API_KEY='good-key')
+class ChatModelRegistryTest(TestCase):
+
+    def setUp(self):
+        StubBackend.calls   = []
+        StubBackend.prompts = []
+        llm.reset()
+        answers.reset()
+        self.addCleanup(llm.reset)
+        self.addCleanup(answers.reset)
+        # 개발 환경의 실제 키가 섞이지 않도록
+        env = mock.patch.dict(os.environ)
+        env.start()
+        self.addCleanup(env.stop)
+        for name in ('GEMINI_API_KEY_1', 'GEMINI_API_KEY_2', 'GEMINI_API_KEY_3'):
+            os.environ.pop(name, None)
+        self.user = get_user_model().objects.create_user(username='chatter', password='pw-1234!')
+        self.client.force_login(self.user)
+
+    def _ask(self, message='수온?'):
+        return self.client.post('/chatbot/ask/', json.dumps({'message': message}),
+                                content_type='application/json', secure=True)
+
+    def test_model_lookup_is_cached(self):
+        for _ in range(2):
+            response = self._ask()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['reply'], '🌡️ 수온: 24~26°C')
+
+        lookups = [c for c in StubBackend.calls if c[0] == 'list_models']
+        self.assertEqual(len(lookups), 1)
+        self.assertIn(('stream', 'good-key', 'models/gemini-2.0-flash'), StubBackend.calls)
+        self.assertEqual(llm.registry().metrics()['lookups'], 1)
+
+    def test_failing_key_cools_down(self):
+        os.environ.update(GEMINI_API_KEY_1='bad-key', GEMINI_API_KEY_2='good-key')
+        with self.settings(GEMINI_API_KEY=None):
+            self.assertEqual(self._ask().status_code, 200)
+            self.assertEqual(self._ask().status_code, 200)
+
+        # 실패한 키는 쿨다운 동안 다시 시도하지 않음
+        bad = [c for c in StubBackend.calls if c[0] == 'stream' and c[1] == 'bad-key']
+        self.assertEqual(len(bad), 1)
+        self.assertIn('...-key', llm.registry().metrics()['cooldown'])
+
+    def test_rejected_request_keeps_key(self):
+        # 요청 자체의 문제(없는 모델 등 4xx)는 어느 키로도 같음 — 다음 키로 넘기거나 쿨다운하지 않고 호출자에게
+        os.environ.update(GEMINI_API_KEY_1='good-key-1')
+        with self.assertRaises(llm.LLMRequestError) as ctx:
+            llm.registry().generate(['수온?'], model='models/retired')
+        self.assertEqual(ctx.exception.status, 404)
+        self.assertEqual([c[1] for c in StubBackend.calls], ['good-key-1'])
+        self.assertEqual(llm.registry().metrics()['cooldown'], {})
+        self.assertEqual(llm.registry().generate(['수온?']), '**🌡️ 수온: 24~26°C**')
+
+        # 연결 오류는 키를 바꿔 다시 시도
+        self.assertTrue(llm.key_failed(ConnectionError('reset')))
+        self.assertFalse(llm.key_failed(StubAPIError('bad image', 400)))
+        self.assertTrue(llm.key_failed(StubAPIError('unavailable', 503)))
+
+    def test_all_keys_failing(self):
+        with self.settings(GEMINI_API_KEY='bad-key'):
+            response = self._ask()
+            self.assertEqual(response.status_code, 500)
+            self.assertEqual(self._ask().json()['message'], '연결 실패: 모든 API 키가 쿨다운 중입니다.')
+
+    async def test_streams_tokens(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            '/chatbot/ask/', {'message': '수온?'}, content_type='application/json',
+            headers={'Accept': 'text/event-stream'}, secure=True,
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        events = [frame.split('\n') for frame in body.strip().split('\n\n')]
+        tokens = [json.loads(lines[1][6:])['text'] for lines in events if lines[0] == 'event: token']
+        self.assertEqual(tokens, ['🌡️ 수온', ': 24~26', '°C'])
+        self.assertEqual(events[-1][0], 'event: done')
+        self.assertEqual(json.loads(events[-1][1][6:])['reply'], '🌡️ 수온: 24~26°C')
+        self.assertTrue(await ChatMessage.objects.filter(user=self.user, response='🌡️ 수온: 24~26°C').aexists())
+
+    def test_answer_cache(self):
+        self._ask('구피 적정 수온은?')
+        self._ask('구피 적정 수온은??')            # 정규화하면 같은 질문
+        self._ask('구피 적정 수온은 뭐야?')        # 비슷한 질문
+        self._ask('구피 26도 괜찮아?')             # 다른 질문
+        response = self._ask('구피 28도 괜찮아?')  # 숫자가 다르면 다른 질문
+        self.assertEqual(response.json()['reply'], '🌡️ 수온: 24~26°C')
+
+        self.assertEqual(len([c for c in StubBackend.calls if c[0] == 'stream']), 3)
+        metrics = answers.cache().metrics()
+        self.assertEqual((metrics['exact'], metrics['similar'], metrics['misses']), (1, 1, 3))
+        self.assertEqual(metrics['hit_rate'], 0.4)
+
+        # 사진이 있으면 캐시를 거치지 않음
+        self.client.post('/chatbot/ask/', {'message': '구피 적정 수온은?', 'image': _png()}, secure=True)
+        self.assertEqual(answers.cache().metrics()['bypassed'], 1)
+
+    def test_answer_cache_lru(self):
+        cache = answers.AnswerCache(ttl=60, max_entries=2, similarity=1)
+        cache.put('core', '환수 주기', 'a')
+        cache.put('core', '적정 수온', 'b')
+        cache.get('core', '환수 주기')
+        cache.put('core', '합사 가능', 'c')
+        self.assertEqual(cache.get('core', '환수 주기'), 'a')
+        self.assertIsNone(cache.get('core', '적정 수온'))
+        self.assertIsNone(cache.get('monitoring', '환수 주기'))
+
+    def test_answer_cache_similar_keeps_meaning(self):
+        # 글자는 비슷해도 어종이 바뀌거나 부정이 붙으면 다른 질문
+        cache = answers.AnswerCache(ttl=3600, max_entries=500, similarity=0.8)
+        cache.put('core', 'what is the ideal temperature for guppies', 'guppy-temp')
+        cache.put('core', 'how often should I change water for a guppy tank', 'guppy-water')
+        cache.put('core', '구피와 네온테트라 합사 가능한가요', 'mix-ok')
+        self.assertIsNone(cache.get('core', 'what is the ideal temperature for bettas'))
+        self.assertIsNone(cache.get('core', 'how often should I change water for a betta tank'))
+        self.assertIsNone(cache.get('core', '구피와 네온테트라 합사 불가능한가요'))
+        self.assertIsNone(cache.get('core', '구피와 네온테트라 합사 가능하지 않나요'))
+
+        # 군말 · 조사만 다르면 같은 질문
+        self.assertEqual(cache.get('core', 'what is the ideal temperature for guppies please'), 'guppy-temp')
+        self.assertEqual(cache.get('core', '구피와 네온테트라는 합사 가능한가요'), 'mix-ok')
+
+    def test_prompt_includes_tank_context(self):
+        tank = Tank.objects.create(user=self.user, name='거실 어항', target_temp=26.0)
+        self.client.post('/monitoring/api/sensor/', json.dumps({'tank_id': tank.id, 'temperature': 29.5, 'ph': 7.1}),
+                         content_type='application/json', secure=True)
+        jobs.run_pending()
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._ask('우리 어항 수온 괜찮아?').status_code, 200)
+        instruction = StubBackend.prompts[-1][0]
+        self.assertIn('[내 어항 현황]\n[거실 어항]', instruction)
+        self.assertIn('수온 29.5°C', instruction)
+        # 요약은 TankState 에서만 읽음 — 히스토리 테이블 조회 없음
+        self.assertFalse([q for q in ctx.captured_queries
+                          if 'monitoring_sensorreading' in q['sql'] or 'monitoring_sensorrollup' in q['sql']])
+
+        # 내 어항 질문은 측정값마다 답이 달라 캐시하지 않고, 일반 질문에는 현황을 넣지 않아 새 측정값이 와도 캐시 적중
+        self._ask('우리 어항 수온 괜찮아?')
+        self._ask('구피 적정 수온은?')
+        self.assertNotIn('[내 어항 현황]', StubBackend.prompts[-1][0])
+        self.client.post('/monitoring/api/sensor/', json.dumps({'tank_id': tank.id, 'temperature': 27.0, 'ph': 7.1}),
+                         content_type='application/json', secure=True)
+        jobs.run_pending()
+        self._ask('구피 적정 수온은?')
+        self.assertEqual(len([c for c in StubBackend.calls if c[0] == 'stream']), 3)
+        # "현재 …" 같은 일반 질문도 내 어항 질문이 아님 → 현황 없이, 측정값이 바뀌어도 캐시 적중
+        self._ask('현재 추천하는 사료는?')
+        self.assertNotIn('[내 어항 현황]', StubBackend.prompts[-1][0])
+        self.client.post('/monitoring/api/sensor/', json.dumps({'tank_id': tank.id, 'temperature': 26.5, 'ph': 7.1}),
+                         content_type='application/json', secure=True)
+        jobs.run_pending()
+        self._ask('현재 추천하는 사료는?')
+        self.assertEqual(len([c for c in StubBackend.calls if c[0] == 'stream']), 4)
+        metrics = answers.cache().metrics()
+        self.assertEqual((metrics['exact'], metrics['bypassed']), (2, 2))
+
+
+@override_settings(CHATBOT_LLM_BACKEND='core.tests.StubBackend', GEMINI_API_KEY='good-key')
+class ChatImageTest(TestCase):
+    """사진은 풀에서 축소·방향 보정·EXIF 제거 후 재인코딩, 같은 사진은 다시 처리하지 않아야 함"""
+
+    def setUp(self):
+        StubBackend.calls   = []
+        StubBackend.prompts = []
+        llm.reset()
+        self.addCleanup(llm.reset)
+        self.addCleanup(images.reset)
+        self.user = get_user_model().objects.create_user(username='photographer', password='pw-1234!')
+        self.client.force_login(self.user)
+
+    def _photo(self):
+        """가로 3000×2000 JPEG, EXIF 방향 6(시계 방향 90° 회전해서 보기) + 촬영 위치 태그"""
+        exif = PIL.Image.Exif()
+        exif[0x0112] = 6
+        exif[0x8825] = {1: 'N'}
+        buffer = io.BytesIO()
+        PIL.Image.new('RGB', (3000, 2000), 'green').save(buffer, 'JPEG', exif=exif)
+        return buffer.getvalue()
+
+    def _ask(self, data: bytes):
+        upload = SimpleUploadedFile('photo.jpg', data, content_type='image/jpeg')
+        return self.client.post('/chatbot/ask/', {'message': '이 어항 어때?', 'image': upload}, secure=True)
+
+    def test_preprocessed_and_cached(self):
+        before = images.metrics()
+        photo  = self._photo()
+        self.assertEqual(self._ask(photo).status_code, 200)
+
+        prepared = StubBackend.prompts[-1][1]
+        self.assertIsInstance(prepared, images.Prepared)
+        self.assertLessEqual(len(prepared.data), images.option('max_bytes'))
+        result = PIL.Image.open(io.BytesIO(prepared.data))
+        self.assertEqual((result.format, result.size), ('JPEG', (683, 1024)))
+        self.assertFalse(result.getexif())
+
+        self.assertEqual(self._ask(photo).status_code, 200)
+        after = images.metrics()
+        self.assertEqual(after['processed'] - before['processed'], 1)
+        self.assertEqual(after['cached'] - before['cached'], 1)
+        self.assertEqual(StubBackend.prompts[-1][1].data, prepared.data)
+
+    def test_rejects_bad_uploads(self):
+        response = self._ask(b'not an image')
+        self.assertEqual(response.status_code, 400)
+
+        with self.settings(CHATBOT_IMAGE={'max_pixels': 100}):
+            response = self._ask(_png((20, 20)).read())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('너무 큽니다', response.json()['message'])
+        self.assertFalse(StubBackend.calls)
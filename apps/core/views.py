@@ -1,17 +1,15 @@
 import json
-import os
-import PIL.Image
-import google.generativeai as genai
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from django.conf import settings
 from django.views.decorators.http import require_POST
 from django.apps import apps
 from datetime import date, timedelta
 from django.core.paginator import Paginator
 
 # 모델 임포트
+from chatbot import answers, images, llm, streaming
+from monitoring import context as tank_context
 from monitoring.models import Tank, SensorReading
 
 def home(request):
@@ -26,13 +24,13 @@ def index(request):
         return render(request, 'core/index.html', {'tank_data': [], 'is_guest': True})
 
     # 편집 센터와 순서를 맞추기 위해 최신순(-id) 정렬 (삭제 즉시 반영)
-    all_tanks = Tank.objects.filter(user=request.user).order_by('-id')
+    all_tanks = Tank.objects.filter(user=request.user).select_related('state').order_by('-id')
     paginator = Paginator(all_tanks, 10)
     page_obj = paginator.get_page(request.GET.get('page'))
 
     tank_data = []
     for tank in page_obj:
-        latest = tank.readings.order_by('-created_at').first()
+        latest = tank.latest_reading
         status = "NORMAL"
         
         try:
@@ -61,13 +59,18 @@ def index(request):
         'tank_data': tank_data, 
         'page_obj': page_obj,
         'is_guest': False,
-        'has_tanks': all_tanks.exists()
+        'has_tanks': paginator.count > 0
     })
 
+def _strip_symbols(text: str) -> str:
+    """기호 강제 제거 필터"""
+    return text.replace('*', '').replace('#', '').replace('-', '')
+
+
 @login_required
 @require_POST
-def chat_api(request):
-    """AI 챗봇 API: 가독성 강화 버전 (핵심 로직 유지)"""
+async def chat_api(request):
+    """AI 챗봇 API: 가독성 강화 버전 (핵심 로직 유지) — Accept: text/event-stream 이면 토큰 스트리밍"""
     user_message = ""
     image_file = None
 
@@ -79,73 +82,63 @@ def chat_api(request):
     else:
         user_message = request.POST.get('message', '').strip()
         image_file = request.FILES.get('image')
-    
-    # 실시간 어항 데이터 연동
-    user_tanks = Tank.objects.filter(user=request.user)
-    tank_info = ", ".join([f"{t.name}" for t in user_tanks]) if user_tanks else "등록된 어항 없음"
-    display_name = getattr(request.user, 'nickname', None) or request.user.username
-
-    api_keys = [
-        os.getenv('GEMINI_API_KEY_1'),
-        os.getenv('GEMINI_API_KEY_2'),
-        os.getenv('GEMINI_API_KEY_3'),
-        getattr(settings, 'GEMINI_API_KEY', None)
-    ]
-    valid_keys = [k for k in api_keys if k]
-
-    if not valid_keys:
+
+    user = await request.auser()
+
+    if not llm.api_keys():
         return JsonResponse({'status': 'error', 'message': "API 키가 없습니다."}, status=500)
 
-    last_error_msg = ""
-    for key in valid_keys:
+    # 실시간 어항 데이터 연동 — 내 어항 질문·사진이면 수신 시 미리 만들어 둔 요약 (TankState 1쿼리, 히스토리 조회 없음)
+    tanks = await tank_context.grounding(user, None if image_file else user_message)
+
+    instruction = (
+        f"너는 친근한 어항 관리 전문가야.\n\n"
+        f"[답변 규칙]\n"
+        f"1. 사용자 질문에 바로 핵심 답변부터 시작해. 인사 금지.\n"
+        f"2. 7줄 이내로 작성. 절대 넘기지 마.\n"
+        f"3. 줄마다 이모지 1개로 시작해서 가독성 높여.\n"
+        f"4. 수치가 있으면 반드시 포함. 예) 🌡️ 수온: 24~26°C\n"
+        f"5. 문장체('~입니다', '~세요') 금지. 짧고 명확하게.\n"
+        f"6. 질문 내용에만 집중해서 답해. 관련 없는 내용 추가 금지.\n"
+    )
+    if tanks:
+        instruction += (
+            f"7. 질문이 내 어항 상태와 관련 있으면 아래 [내 어항 현황] 수치를 근거로 답해.\n\n"
+            f"[내 어항 현황]\n{tanks}\n"
+        )
+
+    prompt_parts = [instruction, user_message]
+    if image_file:
+        # 축소·EXIF 제거·재인코딩은 풀에서 (같은 사진은 캐시)
+        try:
+            prompt_parts.insert(1, await images.prepare(image_file))
+        except images.ImageError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    async def save(reply):
         try:
-            genai.configure(api_key=key)
-            available_models = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
-            
-            selected_model = None
-            candidates = ["models/gemini-2.5-flash", "models/gemini-2.0-flash", "models/gemini-1.5-flash", "models/gemini-flash-latest"]
-            for cand in candidates:
-                if cand in available_models:
-                    selected_model = cand
-                    break
-            
-            if not selected_model and available_models:
-                selected_model = available_models[0]
-            if not selected_model: continue
-
-            model = genai.GenerativeModel(model_name=selected_model)
-            
-            instruction = (
-                f"너는 친근한 어항 관리 전문가야.\n\n"
-                f"[답변 규칙]\n"
-                f"1. 사용자 질문에 바로 핵심 답변부터 시작해. 인사 금지.\n"
-                f"2. 7줄 이내로 작성. 절대 넘기지 마.\n"
-                f"3. 줄마다 이모지 1개로 시작해서 가독성 높여.\n"
-                f"4. 수치가 있으면 반드시 포함. 예) 🌡️ 수온: 24~26°C\n"
-                f"5. 문장체('~입니다', '~세요') 금지. 짧고 명확하게.\n"
-                f"6. 질문 내용에만 집중해서 답해. 관련 없는 내용 추가 금지.\n"
-            )
-            
-            prompt_parts = [instruction, user_message]
-            if image_file:
-                image_file.seek(0)
-                prompt_parts.insert(1, PIL.Image.open(image_file))
-
-            response = model.generate_content(prompt_parts)
-            
-            if response and response.text:
-                # 기호 강제 제거 필터
-                reply = response.text.replace('*', '').replace('#', '').replace('-', '').strip()
-                
-                try:
-                    ChatMessage = apps.get_model('chatbot', 'ChatMessage')
-                    ChatMessage.objects.create(user=request.user, message=user_message or "(사진 분석)", response=reply)
-                except: pass
-                
-                return JsonResponse({'status': 'success', 'reply': reply, 'response': reply})
-
-        except Exception as e:
-            last_error_msg = str(e)
-            continue
-
-    return JsonResponse({'status': 'error', 'message': f"연결 실패: {last_error_msg}"}, status=500)
\ No newline at end of file
+            ChatMessage = apps.get_model('chatbot', 'ChatMessage')
+            await ChatMessage.objects.acreate(user=user, message=user_message or "(사진 분석)", response=reply)
+        except: pass
+
+    def finish(text):
+        return _strip_symbols(text).strip()
+
+    # 같은 질문은 답변 캐시에서 (사진 · 어항 현황을 근거로 한 답변은 측정값마다 달라지므로 우회)
+    question = None if image_file or tanks else user_message
+    scope    = 'core'
+
+    if streaming.wants_stream(request):
+        return streaming.response(prompt_parts, finish=finish, save=save, clean=_strip_symbols,
+                                  error_message=lambda e: f"연결 실패: {e}",
+                                  scope=scope, question=question)
+
+    # 키별 클라이언트·모델 선택은 레지스트리가 캐시 (요청마다 모델 목록 조회 없음), 실패한 키는 쿨다운
+    try:
+        text = await answers.agenerate(prompt_parts, scope=scope, question=question)
+    except llm.LLMError as e:
+        return JsonResponse({'status': 'error', 'message': f"연결 실패: {e}"}, status=500)
+
+    reply = finish(text)
+    await save(reply)
+    return JsonResponse({'status': 'success', 'reply': reply, 'response': reply})
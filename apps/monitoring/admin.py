@@ -1,3 +1,38 @@
 from django.contrib import admin
 
-# Register your models here.
+from . import auth
+from .models import GatewayKey, IngestJob, IngestReceipt, WaterStandard
+
+
+@admin.register(WaterStandard)
+class WaterStandardAdmin(admin.ModelAdmin):
+    list_display  = ('name', 'species', 'tank', 'temp_min', 'temp_max', 'ph_min', 'ph_max', 'updated_at')
+    search_fields = ('name', 'species')
+
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display  = ('id', 'tank', 'kind', 'status', 'attempts', 'available_at', 'created_at')
+    list_filter   = ('status', 'kind')
+
+
+@admin.register(IngestReceipt)
+class IngestReceiptAdmin(admin.ModelAdmin):
+    list_display  = ('gateway', 'kind', 'key', 'created_at')
+    list_filter   = ('kind',)
+    search_fields = ('gateway', 'key')
+
+
+@admin.register(GatewayKey)
+class GatewayKeyAdmin(admin.ModelAdmin):
+    list_display      = ('name', 'prefix', 'is_active', 'last_used_at', 'created_at')
+    list_filter       = ('is_active',)
+    fields            = ('name', 'tanks', 'is_active', 'prefix', 'last_used_at')
+    readonly_fields   = ('prefix', 'last_used_at')
+    filter_horizontal = ('tanks',)
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            raw, obj.prefix, obj.key_hash = auth.generate_key()
+            self.message_user(request, f"발급된 API Key: {raw} — 이 화면을 벗어나면 다시 볼 수 없습니다.")
+        super().save_model(request, obj, form, change)
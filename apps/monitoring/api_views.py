@@ -3,23 +3,33 @@ apps/monitoring/api_views.py
 
 Raspberry Pi ↔ Render 서버 간 REST API
 - Pi → 서버 : 센서/행동/급이/성장/패턴 데이터 전송
-- 서버 → Pi : 장치 제어 명령 응답 (polling 방식)
+- 서버 → Pi : 장치 제어 명령 응답 (polling / ?since= long-poll 방식 — 대기는 ASGI 에서만)
+- 수신 API 는 원본 행 + 후처리 작업(monitoring.jobs)만 저장하고 응답
+  (자동 제어 · 이벤트 로그 · 롤업 · 스냅샷 갱신은 작업 큐에서 어항별 순서대로)
+- 센서/행동/급이/성장 레코드는 measured_at(게이트웨이 측정 시각)을 함께 받음 — 조회·집계 기준
 
-인증: 헤더 X-API-KEY (Render 환경변수 PI_API_KEY)
+인증: 헤더 X-API-KEY — 게이트웨이별 키(GatewayKey, 허용 어항 지정) 또는 공용 키(환경변수 PI_API_KEY)
+      검증·캐시는 monitoring.auth
 수질 기준: 코멧 금붕어 치어 기준 (설계 문서 v2.0)
 """
 
-import json
-import os
+import asyncio
 import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-from django.http import JsonResponse
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse, HttpResponseNotModified
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
+from . import auth, codecs, events, device_commands, idempotency, jobs, standards, tank_cache
 from .models import (
-    Tank, SensorReading, FishBehavior, DeviceControl, EventLog,
+    Tank, SensorReading, FishBehavior, DeviceControl,
     FeedingEvent, FeedingResponse, GrowthRecord, ActivityPattern,
 )
 
@@ -27,39 +37,29 @@ logger = logging.getLogger(__name__)
 
 
 # ──────────────────────────────────────────────
-# 수질 기준값 (코멧 금붕어 치어 — 설계 문서 v2.0)
+# 인증 데코레이터
 # ──────────────────────────────────────────────
 
-WATER_STANDARDS = {
-    'temp_min':       21.0,
-    'temp_max':       24.0,
-    'temp_optimal':   22.0,
-    'ph_min':         6.5,
-    'ph_max':         8.0,
-    'ph_optimal_lo':  7.4,
-    'ph_optimal_hi':  7.5,
-    'do_min':         5.0,
-    'do_danger':      4.0,
-    'turbidity_max':  50.0,
-    'turbidity_ok':   20.0,
-    'turbidity_warn': 100.0,
-}
-
+def _check_api_key(request):
+    """인증 실패 시 오류 응답, 통과 시 None (호출자는 request.credential)"""
+    if auth.open_mode():
+        logger.warning("PI_API_KEY 환경변수도, 활성 GatewayKey 도 없습니다 — 인증 없이 허용")
+        request.credential = auth.LEGACY
+        return None
+    credential = auth.authenticate(request.headers.get('X-API-KEY', ''))
+    if credential is None:
+        return _error("인증 실패: 유효하지 않은 API Key입니다.", status=401)
+    request.credential = credential
+    return None
 
-# ──────────────────────────────────────────────
-# 인증 데코레이터
-# ──────────────────────────────────────────────
 
 def api_key_required(func):
-    def wrapper(request, *args, **kwargs):
-        server_key = os.getenv('PI_API_KEY', '')
-        if not server_key:
-            logger.warning("PI_API_KEY 환경변수가 설정되어 있지 않습니다.")
-            return func(request, *args, **kwargs)
-        client_key = request.headers.get('X-API-KEY', '')
-        if client_key != server_key:
-            return _error("인증 실패: 유효하지 않은 API Key입니다.", status=401)
-        return func(request, *args, **kwargs)
+    if iscoroutinefunction(func):
+        async def wrapper(request, *args, **kwargs):
+            return await sync_to_async(_check_api_key)(request) or await func(request, *args, **kwargs)
+    else:
+        def wrapper(request, *args, **kwargs):
+            return _check_api_key(request) or func(request, *args, **kwargs)
     return wrapper
 
 
@@ -78,118 +78,120 @@ def _error(message: str, status: int = 400) -> JsonResponse:
     return JsonResponse({'status': 'error', 'message': message}, status=status)
 
 
-def _parse_body(request) -> dict:
-    try:
-        return json.loads(request.body)
-    except (json.JSONDecodeError, ValueError):
-        return {}
-
-
-def _get_tank(tank_id) -> tuple:
-    if not tank_id:
-        return None, _error("tank_id 필드가 필요합니다.")
-    try:
-        return Tank.objects.get(id=tank_id), None
-    except Tank.DoesNotExist:
-        return None, _error(f"tank_id={tank_id} 에 해당하는 어항이 없습니다.", status=404)
+def _replayed(response: dict) -> JsonResponse:
+    """이미 처리한 요청의 재전송 → 처음 응답 그대로 (duplicate 표시)"""
+    return _ok({**response, 'duplicate': True})
 
 
-# ──────────────────────────────────────────────
-# 수질 점수 계산 (금붕어 기준)
-# ──────────────────────────────────────────────
+def _replayed_or_raise(idem) -> JsonResponse:
+    """같은 키가 동시에 들어와 유니크 인덱스에 걸린 경우 → 먼저 저장된 응답"""
+    done = idem.lookup()
+    if done is None:
+        raise
+    return _replayed(done)
 
-def _calc_water_quality(temp, ph, do_val, turbidity) -> int:
-    score = 100
-    s = WATER_STANDARDS
 
-    # 수온
-    if temp < s['temp_min'] or temp > s['temp_max']:
-        score -= 30
-    else:
-        score -= min(int(abs(temp - s['temp_optimal']) / 1.0) * 5, 15)
+def _reading_result(reading) -> dict:
+    return {
+        'reading_id': reading.id, 'water_quality_score': reading.water_quality_score,
+        'timestamp': reading.measured_at.isoformat(),
+    }
 
-    # pH
-    if ph < 6.0 or ph > 8.5:
-        score -= 30
-    elif ph < s['ph_min'] or ph > s['ph_max']:
-        score -= 15
-    elif not (s['ph_optimal_lo'] <= ph <= s['ph_optimal_hi']):
-        score -= 5
 
-    # DO
-    if do_val < s['do_danger']:
-        score -= 30
-    elif do_val < s['do_min']:
-        score -= 15
+def _parse_body(request) -> tuple:
+    """요청 바디 → (데이터, 오류 응답). JSON / MessagePack / CBOR, gzip / zstd 압축 (monitoring.codecs)"""
+    try:
+        return codecs.decode(request) or {}, None
+    except codecs.BodyError as e:
+        return None, _error(str(e), status=e.status)
 
-    # 탁도
-    if turbidity > s['turbidity_warn']:
-        score -= 30
-    elif turbidity > s['turbidity_max']:
-        score -= 15
-    elif turbidity > 30:
-        score -= 5
 
-    return max(score, 0)
+def _to_pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 
-# ──────────────────────────────────────────────
-# 장치 자동 제어 (금붕어 기준)
-# ──────────────────────────────────────────────
+def _forbidden(tank_id) -> JsonResponse:
+    return _error(f"이 API Key 로는 tank_id={tank_id} 에 접근할 수 없습니다.", status=403)
 
-def _auto_control(tank: Tank, reading: SensorReading) -> list:
-    actions  = []
-    s        = WATER_STANDARDS
-    controls = {d.type: d for d in DeviceControl.objects.filter(tank=tank, is_auto=True)}
-
-    def _set_device(device_type: str, turn_on: bool, reason: str):
-        device = controls.get(device_type)
-        if device and device.is_on != turn_on:
-            device.is_on = turn_on
-            device.save(update_fields=['is_on', 'last_action_at'])
-            state = "ON" if turn_on else "OFF"
-            actions.append(f"{device_type}:{state}")
-            EventLog.objects.create(
-                tank=tank, level='INFO',
-                message=f"[자동제어] {device.get_type_display()} {state} — {reason}"
-            )
 
-    temp = reading.temperature
-    do_v = reading.dissolved_oxygen
-    turb = reading.turbidity
-    ph   = reading.ph
+def _get_tank(request, tank_id) -> tuple:
+    if not tank_id:
+        return None, _error("tank_id 필드가 필요합니다.")
+    # 존재 여부를 드러내지 않도록 조회 전에 권한부터 확인
+    if not request.credential.allows(_to_pk(tank_id)):
+        return None, _forbidden(tank_id)
+    tank = tank_cache.get(_to_pk(tank_id))
+    if tank is None:
+        return None, _error(f"tank_id={tank_id} 에 해당하는 어항이 없습니다.", status=404)
+    return tank, None
 
-    # 히터: 21°C 미만 ON / 22°C 초과 OFF
-    if temp < s['temp_min']:
-        _set_device('HEATER', True,  f"수온 {temp}°C → 최솟값 미달")
-    elif temp > s['temp_optimal']:
-        _set_device('HEATER', False, f"수온 {temp}°C → 최적값 도달")
 
-    # 냉각팬: 24°C 초과 ON / 23°C 이하 OFF
-    if temp > s['temp_max']:
-        _set_device('COOLING', True,  f"수온 {temp}°C → 최댓값 초과")
-    elif temp <= s['temp_max'] - 1:
-        _set_device('COOLING', False, f"수온 {temp}°C → 정상 범위")
+# ──────────────────────────────────────────────
+# 측정 시각 / 센서 필드 검증
+# ──────────────────────────────────────────────
 
-    # 여과기: 50 NTU 초과 ON / 20 NTU 이하 OFF
-    if turb > s['turbidity_max']:
-        _set_device('FILTER', True,  f"탁도 {turb} NTU → 기준 초과")
-    elif turb <= s['turbidity_ok']:
-        _set_device('FILTER', False, f"탁도 {turb} NTU → 정상")
+def _max_clock_skew() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'MONITORING_MAX_CLOCK_SKEW', 300))
 
-    # 에어펌프: DO 4mg/L 이하 즉각 ON / 6mg/L 이상 OFF
-    if do_v < s['do_danger']:
-        _set_device('AIR_PUMP', True,  f"DO {do_v} mg/L → 위험")
-    elif do_v >= 6.0:
-        _set_device('AIR_PUMP', False, f"DO {do_v} mg/L → 정상")
 
-    # 위험 이벤트 로그
-    if ph < 6.0 or ph > 8.5:
-        EventLog.objects.create(tank=tank, level='DANGER', message=f"pH 위험 수치: {ph}")
-    if turb > s['turbidity_warn']:
-        EventLog.objects.create(tank=tank, level='WARNING', message=f"탁도 스트레스: {turb} NTU — 환수 권장")
+def _measured_at(value) -> tuple:
+    """
+    게이트웨이 측정 시각 → (aware datetime, 오류 메시지)
+    ISO 8601 문자열 또는 Unix 초. 생략하면 수신 시각 (실시간 전송).
+    장애 후 재전송한 과거 시각은 그대로 받고, 서버 시각보다 MONITORING_MAX_CLOCK_SKEW 넘게 미래면 거부.
+    """
+    now = timezone.now()
+    if value is None or value == '':
+        return now, None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            measured = datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None, f"measured_at 형식 오류: {value}"
+    else:
+        try:
+            measured = parse_datetime(str(value))
+        except ValueError:
+            measured = None
+        if measured is None:
+            return None, f"measured_at 형식 오류: {value} (ISO 8601 또는 Unix 초)"
+        if timezone.is_naive(measured):
+            measured = timezone.make_aware(measured)
+    if measured > now + _max_clock_skew():
+        return None, f"measured_at 이 서버 시각보다 미래입니다: {measured.isoformat()}"
+    return measured, None
+
+
+def _sensor_fields(data: dict, rules: standards.RuleSet = None) -> tuple:
+    """센서 요청 1건 검증 → (SensorReading 필드 dict, 오류 메시지)
+    rules 가 없으면 water_quality_score 를 빼고 반환 (배치 수신에서 어항별로 한 번에 채점)"""
+    missing = [f for f in ['temperature', 'ph'] if f not in data]
+    if missing:
+        return None, f"필수 필드 누락: {', '.join(missing)}"
 
-    return actions
+    try:
+        temp      = float(data['temperature'])
+        ph        = float(data['ph'])
+        do_val    = float(data.get('dissolved_oxygen', 0.0))
+        turbidity = float(data.get('turbidity', 0.0))
+        w_level   = float(data.get('water_level', 100.0))
+    except (TypeError, ValueError) as e:
+        return None, f"숫자 변환 오류: {e}"
+    measured_at, msg = _measured_at(data.get('measured_at'))
+    if msg:
+        return None, msg
+
+    fields = {
+        'temperature': temp, 'ph': ph,
+        'dissolved_oxygen': do_val, 'turbidity': turbidity,
+        'water_level': w_level, 'measured_at': measured_at,
+    }
+    if rules is not None:
+        fields['water_quality_score'] = rules.score(temp, ph, do_val, turbidity)
+    return fields, None
 
 
 # ──────────────────────────────────────────────
@@ -204,42 +206,217 @@ def receive_sensor_data(request):
     요청 바디:
     {
         "tank_id": 1, "temperature": 22.5, "ph": 7.2,
-        "dissolved_oxygen": 6.8, "turbidity": 12.3, "water_level": 90.0
+        "dissolved_oxygen": 6.8, "turbidity": 12.3, "water_level": 90.0,
+        "measured_at": "2024-05-01T09:00:00+09:00"   (선택, ISO 8601 또는 Unix 초 — 생략 시 수신 시각)
     }
     """
-    data = _parse_body(request)
+    data, err = _parse_body(request)
+    if err:
+        return err
     if not data:
         return _error("요청 바디가 비어있거나 JSON 형식이 아닙니다.")
 
-    tank, err = _get_tank(data.get('tank_id'))
+    idem = idempotency.Key(request, 'sensor', data)
+    done = idem.lookup()
+    if done is not None:
+        return _replayed(done)
+
+    tank, err = _get_tank(request, data.get('tank_id'))
     if err:
         return err
 
-    missing = [f for f in ['temperature', 'ph'] if f not in data]
-    if missing:
-        return _error(f"필수 필드 누락: {', '.join(missing)}")
+    fields, msg = _sensor_fields(data, standards.for_tank(tank))
+    if msg:
+        return _error(msg)
 
     try:
-        temp      = float(data['temperature'])
-        ph        = float(data['ph'])
-        do_val    = float(data.get('dissolved_oxygen', 0.0))
-        turbidity = float(data.get('turbidity', 0.0))
-        w_level   = float(data.get('water_level', 100.0))
-    except (TypeError, ValueError) as e:
-        return _error(f"숫자 변환 오류: {e}")
+        with transaction.atomic():
+            reading = SensorReading.objects.create(tank=tank, **fields)
+            jobs.enqueue(tank.id, 'sensor', {'reading_ids': [reading.id]})
+            result = _reading_result(reading)
+            idem.remember(result)
+    except IntegrityError:
+        return _replayed_or_raise(idem)
+    logger.info(
+        f"[센서] tank={tank.id} temp={reading.temperature} ph={reading.ph} "
+        f"do={reading.dissolved_oxygen} score={reading.water_quality_score}"
+    )
+
+    return _ok(result)
 
-    score   = _calc_water_quality(temp, ph, do_val, turbidity)
-    reading = SensorReading.objects.create(
-        tank=tank, temperature=temp, ph=ph,
-        dissolved_oxygen=do_val, turbidity=turbidity,
-        water_level=w_level, water_quality_score=score,
+
+# ──────────────────────────────────────────────
+# [1-1] 센서 데이터 일괄 전송  POST /monitoring/api/sensor/batch/
+# ──────────────────────────────────────────────
+
+MAX_BATCH_SIZE = 1000
+
+# 컬럼 배치의 센서 숫자 필드와 생략 시 기본값 (_sensor_fields 와 같은 규칙)
+SENSOR_COLUMNS  = ('temperature', 'ph', 'dissolved_oxygen', 'turbidity', 'water_level')
+SENSOR_DEFAULTS = {'dissolved_oxygen': 0.0, 'turbidity': 0.0, 'water_level': 100.0}
+
+
+def _check_batch(request, n: int, tank_ids) -> tuple:
+    """배치 공통 검사 → (어항 dict, 오류 응답)"""
+    if not n:
+        return None, _error("readings 배열이 비어있거나 JSON 형식이 아닙니다.")
+    if n > MAX_BATCH_SIZE:
+        return None, _error(f"한 번에 최대 {MAX_BATCH_SIZE}건까지 전송할 수 있습니다.", status=413)
+    forbidden = sorted(t for t in tank_ids if t is not None and not request.credential.allows(t))
+    if forbidden:
+        return None, _forbidden(', '.join(map(str, forbidden)))
+    return tank_cache.get_many(tank_ids), None
+
+
+def _item_readings(request, items: list) -> tuple:
+    """행 단위 배치 ([{...}, ...]) → (SensorReading 목록, 멱등 키 목록, 오류 응답)"""
+    tank_ids   = {_to_pk(item.get('tank_id')) for item in items if isinstance(item, dict)}
+    tanks, err = _check_batch(request, len(items), tank_ids)
+    if err:
+        return None, None, err
+
+    readings, keys, errors = [], [], []
+    for idx, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': idx, 'message': "객체 형식이 아닙니다."})
+            continue
+        tank = tanks.get(_to_pk(item.get('tank_id')))
+        if tank is None:
+            errors.append({'index': idx, 'message': f"tank_id={item.get('tank_id')} 에 해당하는 어항이 없습니다."})
+            continue
+        fields, msg = _sensor_fields(item)
+        if msg:
+            errors.append({'index': idx, 'message': msg})
+            continue
+        readings.append(SensorReading(tank=tank, **fields))
+        keys.append(idempotency.record_key(item))
+
+    if errors:
+        return None, None, JsonResponse({'status': 'error', 'message': "검증 실패", 'errors': errors}, status=400)
+    return readings, keys, None
+
+
+def _columnar_readings(request, data: dict) -> tuple:
+    """
+    컬럼 배치 → (SensorReading 목록, 멱등 키 목록, 오류 응답). 숫자 변환·검증은 컬럼마다 한 번.
+    멱등 키는 fields 에 seq 또는 idempotency_key 컬럼이 있을 때만 (행마다 달라야 하므로).
+    """
+    try:
+        cols, n = codecs.columns(data, SENSOR_COLUMNS, SENSOR_DEFAULTS)
+    except codecs.BodyError as e:
+        return None, None, _error(str(e), status=e.status)
+    missing = [f for f in ('tank_id', 'temperature', 'ph') if f not in cols]
+    if missing:
+        return None, None, _error(f"필수 필드 누락: {', '.join(missing)}")
+
+    row_tanks  = [_to_pk(v) for v in cols['tank_id']]
+    tanks, err = _check_batch(request, n, set(row_tanks))
+    if err:
+        return None, None, err
+    errors = [
+        {'index': idx, 'message': f"tank_id={cols['tank_id'][idx]} 에 해당하는 어항이 없습니다."}
+        for idx, tank_id in enumerate(row_tanks) if tank_id not in tanks
+    ]
+    measured = []
+    for idx, value in enumerate(cols.get('measured_at') or [None] * n):
+        at, msg = _measured_at(value)
+        if msg:
+            errors.append({'index': idx, 'message': msg})
+        measured.append(at)
+    if errors:
+        return None, None, JsonResponse({'status': 'error', 'message': "검증 실패", 'errors': errors}, status=400)
+
+    key_field = next((f for f in ('seq', 'idempotency_key') if f in data['fields']), None)
+    keys = (
+        [idempotency.record_key({key_field: v}) for v in cols[key_field]] if key_field
+        else [None] * n
     )
-    actions = _auto_control(tank, reading)
-    logger.info(f"[센서] tank={tank.id} temp={temp} ph={ph} do={do_val} score={score}")
+    values = zip(row_tanks, measured, *(cols[f].tolist() for f in SENSOR_COLUMNS))
+    return [
+        SensorReading(tank=tanks[tank_id], measured_at=at, temperature=temp, ph=ph,
+                      dissolved_oxygen=do_val, turbidity=turb, water_level=level)
+        for tank_id, at, temp, ph, do_val, turb, level in values
+    ], keys, None
+
 
+@csrf_exempt
+@api_key_required
+@require_http_methods(['POST'])
+def receive_sensor_batch(request):
+    """
+    업링크 장애 동안 Pi 에 쌓인 측정값을 한 번에 재전송.
+    요청 바디 (배열 그대로 보내도 됨):
+    {
+        "readings": [
+            {"tank_id": 1, "temperature": 22.5, "ph": 7.2, ...},
+            {"tank_id": 2, "temperature": 23.1, "ph": 7.4, ...}
+        ]
+    }
+    또는 컬럼 배치 (필드 이름은 한 번, 값은 필드별 배열 — MessagePack/CBOR + zstd 권장):
+    {"tank_id": 1, "fields": ["measured_at", "temperature", "ph"],
+     "columns": [[1714521600, 1714521660], [22.5, 22.6], [7.2, 7.3]]}
+    하나라도 검증에 실패하면 전체를 거부하고, 통과하면 한 트랜잭션으로 저장.
+    후처리는 어항별 작업 1건 — 롤업은 전체(측정 시각 구간에 합산), 자동 제어는 측정 시각이 가장 늦은 값에 대해서만 1회.
+    레코드에 seq / idempotency_key 가 있으면 이미 처리한 레코드는 건너뛰고 처음 id 를 돌려줌
+    (reading_ids 는 요청 순서, duplicates = 건너뛴 수).
+    """
+    data, err = _parse_body(request)
+    if err:
+        return err
+    if codecs.is_columnar(data):
+        readings, keys, err = _columnar_readings(request, data)
+    else:
+        items = data.get('readings') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return _error("readings 배열이 비어있거나 JSON 형식이 아닙니다.")
+        readings, keys, err = _item_readings(request, items)
+    if err:
+        return err
+
+    # 이미 처리한 레코드(이전 요청 또는 같은 배치 안의 중복)는 건너뜀 — 조회 1회
+    scope = idempotency.gateway(request, data if isinstance(data, dict) else None)
+    if not scope:
+        keys = [idempotency.for_tank(key, reading.tank_id) for reading, key in zip(readings, keys)]
+    seen  = idempotency.lookup_many(scope, 'sensor', keys)
+    fresh, fresh_keys, taken = [], [], set(seen)
+    for reading, key in zip(readings, keys):
+        if key is None or key not in taken:
+            fresh.append(reading)
+            fresh_keys.append(key)
+            taken.add(key)
+
+    # 어항별 기준으로 한 번에 채점
+    by_tank = {}
+    for reading in fresh:
+        by_tank.setdefault(reading.tank_id, []).append(reading)
+    for group in by_tank.values():
+        rules  = standards.for_tank(group[0].tank)
+        scores = rules.score_many(*zip(*[(r.temperature, r.ph, r.dissolved_oxygen, r.turbidity) for r in group]))
+        for reading, score in zip(group, scores.tolist()):
+            reading.water_quality_score = score
+
+    try:
+        with transaction.atomic():
+            created = SensorReading.objects.bulk_create(fresh)
+
+            # 어항별 측정값 id (요청 순서 = id 순서)
+            reading_ids = {}
+            for reading in created:
+                reading_ids.setdefault(reading.tank_id, []).append(reading.id)
+            jobs.enqueue_many([(tank_id, 'sensor', {'reading_ids': ids}) for tank_id, ids in reading_ids.items()])
+            results = {key: _reading_result(r) for key, r in zip(fresh_keys, created) if key is not None}
+            idempotency.remember_many(scope, 'sensor', results.items())
+    except IntegrityError:
+        # 같은 레코드를 담은 배치가 동시에 들어옴 — 전체 롤백, 재전송하면 먼저 저장된 결과를 받음
+        return _error("같은 seq 의 측정값이 동시에 처리 중입니다. 잠시 후 다시 보내주세요.", status=409)
+
+    results.update(seen)
+    new_ids = iter([r.id for key, r in zip(fresh_keys, created) if key is None])
+    logger.info(f"[센서 배치] count={len(created)} duplicates={len(readings) - len(created)} tanks={sorted(reading_ids)}")
     return _ok({
-        'reading_id': reading.id, 'water_quality_score': score,
-        'auto_actions': actions, 'timestamp': reading.created_at.isoformat(),
+        'count':       len(created),
+        'duplicates':  len(readings) - len(created),
+        'reading_ids': [results[key]['reading_id'] if key is not None else next(new_ids) for key in keys],
     })
 
 
@@ -259,14 +436,22 @@ def receive_fish_behavior(request):
         "dominant_zone": "MID", "zone_top_ratio": 0.1,
         "zone_mid_ratio": 0.6, "zone_bot_ratio": 0.3,
         "size_index": 7.8, "feeding_score": 82,
-        "status": "GOOD", "is_anomaly": false, "note": ""
+        "status": "GOOD", "is_anomaly": false, "note": "",
+        "measured_at": "2024-05-01T09:00:00+09:00"   (선택)
     }
     """
-    data = _parse_body(request)
+    data, err = _parse_body(request)
+    if err:
+        return err
     if not data:
         return _error("요청 바디가 비어있거나 JSON 형식이 아닙니다.")
 
-    tank, err = _get_tank(data.get('tank_id'))
+    idem = idempotency.Key(request, 'behavior', data)
+    done = idem.lookup()
+    if done is not None:
+        return _replayed(done)
+
+    tank, err = _get_tank(request, data.get('tank_id'))
     if err:
         return err
 
@@ -279,39 +464,38 @@ def receive_fish_behavior(request):
         dominant_zone = 'MID'
 
     is_anomaly = bool(data.get('is_anomaly', False))
+    measured_at, msg = _measured_at(data.get('measured_at'))
+    if msg:
+        return _error(msg)
 
-    behavior = FishBehavior.objects.create(
-        tank=tank,
-        fish_count=int(data.get('fish_count', 0)),
-        overlap_frames=int(data.get('overlap_frames', 0)),
-        activity_level=float(data.get('activity_level', 0.0)),
-        abr_score=float(data.get('abr_score', 0.0)),
-        dominant_zone=dominant_zone,
-        zone_top_ratio=float(data.get('zone_top_ratio', 0.0)),
-        zone_mid_ratio=float(data.get('zone_mid_ratio', 0.0)),
-        zone_bot_ratio=float(data.get('zone_bot_ratio', 0.0)),
-        size_index=float(data.get('size_index', 0.0)),
-        feeding_score=int(data.get('feeding_score', 0)),
-        status=status, is_anomaly=is_anomaly,
-        note=data.get('note', ''),
-    )
-
-    if is_anomaly:
-        EventLog.objects.create(
-            tank=tank, level='WARNING',
-            message=f"[AI 이상 감지] {data.get('note', '상세 내용 없음')}"
-        )
-    if behavior.feeding_score < 30:
-        EventLog.objects.create(
-            tank=tank, level='WARNING',
-            message=f"[FRS 저조] {behavior.feeding_score}점 — 어류 상태 확인 권장"
-        )
+    try:
+        with transaction.atomic():
+            behavior = FishBehavior.objects.create(
+                tank=tank,
+                fish_count=int(data.get('fish_count', 0)),
+                overlap_frames=int(data.get('overlap_frames', 0)),
+                activity_level=float(data.get('activity_level', 0.0)),
+                abr_score=float(data.get('abr_score', 0.0)),
+                dominant_zone=dominant_zone,
+                zone_top_ratio=float(data.get('zone_top_ratio', 0.0)),
+                zone_mid_ratio=float(data.get('zone_mid_ratio', 0.0)),
+                zone_bot_ratio=float(data.get('zone_bot_ratio', 0.0)),
+                size_index=float(data.get('size_index', 0.0)),
+                feeding_score=int(data.get('feeding_score', 0)),
+                status=status, is_anomaly=is_anomaly,
+                note=data.get('note', ''), measured_at=measured_at,
+            )
+            jobs.enqueue(tank.id, 'behavior', {'behavior_id': behavior.id})
+            result = {
+                'behavior_id': behavior.id, 'status': status,
+                'is_anomaly': is_anomaly, 'timestamp': behavior.measured_at.isoformat(),
+            }
+            idem.remember(result)
+    except IntegrityError:
+        return _replayed_or_raise(idem)
 
     logger.info(f"[행동] tank={tank.id} status={status} anomaly={is_anomaly}")
-    return _ok({
-        'behavior_id': behavior.id, 'status': status,
-        'is_anomaly': is_anomaly, 'timestamp': behavior.created_at.isoformat(),
-    })
+    return _ok(result)
 
 
 # ──────────────────────────────────────────────
@@ -330,14 +514,22 @@ def receive_feeding_event(request):
         "turbidity_after": 18.5, "is_overfeeding": false,
         "rt_seconds": 4.2, "ar_ratio": 1.8, "sf_ratio": 0.45,
         "frs_score": 78, "activity_before": 12.3,
-        "activity_during": 22.1, "activity_after": 15.4
+        "activity_during": 22.1, "activity_after": 15.4,
+        "measured_at": "2024-05-01T09:00:00+09:00"   (선택)
     }
     """
-    data = _parse_body(request)
+    data, err = _parse_body(request)
+    if err:
+        return err
     if not data:
         return _error("요청 바디가 비어있거나 JSON 형식이 아닙니다.")
 
-    tank, err = _get_tank(data.get('tank_id'))
+    idem = idempotency.Key(request, 'feeding', data)
+    done = idem.lookup()
+    if done is not None:
+        return _replayed(done)
+
+    tank, err = _get_tank(request, data.get('tank_id'))
     if err:
         return err
 
@@ -353,44 +545,44 @@ def receive_feeding_event(request):
     delta_ntu      = round(turb_after - turb_before, 2)
     is_overfeeding = bool(data.get('is_overfeeding', False))
 
-    feeding = FeedingEvent.objects.create(
-        tank=tank, trigger=trigger,
-        amount_g=float(data.get('amount_g', 0.0)),
-        growth_stage=growth_stage,
-        turbidity_before=turb_before, turbidity_after=turb_after,
-        delta_ntu=delta_ntu, is_overfeeding=is_overfeeding,
-    )
-
     frs_score = int(data.get('frs_score', 0))
-    response  = FeedingResponse.objects.create(
-        tank=tank, feeding_event=feeding,
-        rt_seconds=float(data.get('rt_seconds', 0.0)),
-        ar_ratio=float(data.get('ar_ratio', 0.0)),
-        sf_ratio=float(data.get('sf_ratio', 0.0)),
-        frs_score=frs_score,
-        activity_before=float(data.get('activity_before', 0.0)),
-        activity_during=float(data.get('activity_during', 0.0)),
-        activity_after=float(data.get('activity_after', 0.0)),
-    )
+    measured_at, msg = _measured_at(data.get('measured_at'))
+    if msg:
+        return _error(msg)
 
-    if is_overfeeding:
-        EventLog.objects.create(
-            tank=tank, level='WARNING',
-            message=f"[과급여] ΔNTU={delta_ntu} — 다음 급이량 조정 필요"
-        )
-    if frs_score < 40:
-        EventLog.objects.create(
-            tank=tank, level='WARNING',
-            message=f"[FRS 저조] 급이 반응 {frs_score}점 — 건강 상태 확인"
-        )
+    try:
+        with transaction.atomic():
+            feeding = FeedingEvent.objects.create(
+                tank=tank, trigger=trigger,
+                amount_g=float(data.get('amount_g', 0.0)),
+                growth_stage=growth_stage,
+                turbidity_before=turb_before, turbidity_after=turb_after,
+                delta_ntu=delta_ntu, is_overfeeding=is_overfeeding,
+                measured_at=measured_at,
+            )
+            response = FeedingResponse.objects.create(
+                tank=tank, feeding_event=feeding,
+                rt_seconds=float(data.get('rt_seconds', 0.0)),
+                ar_ratio=float(data.get('ar_ratio', 0.0)),
+                sf_ratio=float(data.get('sf_ratio', 0.0)),
+                frs_score=frs_score,
+                activity_before=float(data.get('activity_before', 0.0)),
+                activity_during=float(data.get('activity_during', 0.0)),
+                activity_after=float(data.get('activity_after', 0.0)),
+            )
+            jobs.enqueue(tank.id, 'feeding', {'feeding_id': feeding.id})
+            result = {
+                'feeding_id': feeding.id, 'response_id': response.id,
+                'frs_score': frs_score, 'delta_ntu': delta_ntu,
+                'is_overfeeding': is_overfeeding,
+                'timestamp': feeding.measured_at.isoformat(),
+            }
+            idem.remember(result)
+    except IntegrityError:
+        return _replayed_or_raise(idem)
 
     logger.info(f"[급이] tank={tank.id} amount={feeding.amount_g}g frs={frs_score}")
-    return _ok({
-        'feeding_id': feeding.id, 'response_id': response.id,
-        'frs_score': frs_score, 'delta_ntu': delta_ntu,
-        'is_overfeeding': is_overfeeding,
-        'timestamp': feeding.created_at.isoformat(),
-    })
+    return _ok(result)
 
 
 # ──────────────────────────────────────────────
@@ -407,14 +599,22 @@ def receive_growth_record(request):
         "tank_id": 1, "fish_id": 1, "size_index": 7.8,
         "estimated_length": 2.1, "estimated_weight": 0.098,
         "growth_rate": 0.05, "growth_stage": "FRY",
-        "recommended_feed_g": 0.01
+        "recommended_feed_g": 0.01,
+        "measured_at": "2024-05-01T09:00:00+09:00"   (선택)
     }
     """
-    data = _parse_body(request)
+    data, err = _parse_body(request)
+    if err:
+        return err
     if not data:
         return _error("요청 바디가 비어있거나 JSON 형식이 아닙니다.")
 
-    tank, err = _get_tank(data.get('tank_id'))
+    idem = idempotency.Key(request, 'growth', data)
+    done = idem.lookup()
+    if done is not None:
+        return _replayed(done)
+
+    tank, err = _get_tank(request, data.get('tank_id'))
     if err:
         return err
 
@@ -424,26 +624,37 @@ def receive_growth_record(request):
     growth_stage = data.get('growth_stage', 'FRY').upper()
     if growth_stage not in ['FRY', 'YOUNG', 'ADULT']:
         growth_stage = 'FRY'
+    measured_at, msg = _measured_at(data.get('measured_at'))
+    if msg:
+        return _error(msg)
 
-    record = GrowthRecord.objects.create(
-        tank=tank,
-        fish_id=int(data['fish_id']),
-        size_index=float(data['size_index']),
-        estimated_length=float(data.get('estimated_length', 0.0)),
-        estimated_weight=float(data.get('estimated_weight', 0.0)),
-        growth_rate=float(data.get('growth_rate', 0.0)),
-        growth_stage=growth_stage,
-        recommended_feed_g=float(data.get('recommended_feed_g', 0.0)),
-    )
+    try:
+        with transaction.atomic():
+            record = GrowthRecord.objects.create(
+                tank=tank,
+                fish_id=int(data['fish_id']),
+                size_index=float(data['size_index']),
+                estimated_length=float(data.get('estimated_length', 0.0)),
+                estimated_weight=float(data.get('estimated_weight', 0.0)),
+                growth_rate=float(data.get('growth_rate', 0.0)),
+                growth_stage=growth_stage,
+                recommended_feed_g=float(data.get('recommended_feed_g', 0.0)),
+                measured_at=measured_at,
+            )
+            jobs.enqueue(tank.id, 'growth', {'record_id': record.id})
+            result = {
+                'record_id': record.id, 'fish_id': record.fish_id,
+                'estimated_length': record.estimated_length,
+                'growth_stage': growth_stage,
+                'recommended_feed_g': record.recommended_feed_g,
+                'timestamp': record.measured_at.isoformat(),
+            }
+            idem.remember(result)
+    except IntegrityError:
+        return _replayed_or_raise(idem)
 
     logger.info(f"[성장] tank={tank.id} fish={record.fish_id} length={record.estimated_length}cm")
-    return _ok({
-        'record_id': record.id, 'fish_id': record.fish_id,
-        'estimated_length': record.estimated_length,
-        'growth_stage': growth_stage,
-        'recommended_feed_g': record.recommended_feed_g,
-        'timestamp': record.created_at.isoformat(),
-    })
+    return _ok(result)
 
 
 # ──────────────────────────────────────────────
@@ -467,11 +678,18 @@ def receive_activity_pattern(request):
         "anomaly_hours": [2, 3, 14], "has_anomaly": true
     }
     """
-    data = _parse_body(request)
+    data, err = _parse_body(request)
+    if err:
+        return err
     if not data:
         return _error("요청 바디가 비어있거나 JSON 형식이 아닙니다.")
 
-    tank, err = _get_tank(data.get('tank_id'))
+    idem = idempotency.Key(request, 'pattern', data)
+    done = idem.lookup()
+    if done is not None:
+        return _replayed(done)
+
+    tank, err = _get_tank(request, data.get('tank_id'))
     if err:
         return err
 
@@ -481,49 +699,106 @@ def receive_activity_pattern(request):
 
     has_anomaly = bool(data.get('has_anomaly', False))
 
-    pattern = ActivityPattern.objects.create(
-        tank=tank,
-        period_start=data['period_start'],
-        period_end=data['period_end'],
-        hourly_activity=data.get('hourly_activity', {}),
-        baseline_mean=float(data.get('baseline_mean', 0.0)),
-        baseline_std=float(data.get('baseline_std', 0.0)),
-        current_mean=float(data.get('current_mean', 0.0)),
-        deviation_ratio=float(data.get('deviation_ratio', 0.0)),
-        daytime_activity=float(data.get('daytime_activity', 0.0)),
-        nighttime_activity=float(data.get('nighttime_activity', 0.0)),
-        anomaly_hours=data.get('anomaly_hours', []),
-        has_anomaly=has_anomaly,
-    )
-
-    if has_anomaly:
-        EventLog.objects.create(
-            tank=tank, level='WARNING',
-            message=f"[패턴 이상] 이상 시간대: {data.get('anomaly_hours', [])} — 편차 {data.get('deviation_ratio', 0):.0%}"
-        )
+    try:
+        with transaction.atomic():
+            pattern = ActivityPattern.objects.create(
+                tank=tank,
+                period_start=data['period_start'],
+                period_end=data['period_end'],
+                hourly_activity=data.get('hourly_activity', {}),
+                baseline_mean=float(data.get('baseline_mean', 0.0)),
+                baseline_std=float(data.get('baseline_std', 0.0)),
+                current_mean=float(data.get('current_mean', 0.0)),
+                deviation_ratio=float(data.get('deviation_ratio', 0.0)),
+                daytime_activity=float(data.get('daytime_activity', 0.0)),
+                nighttime_activity=float(data.get('nighttime_activity', 0.0)),
+                anomaly_hours=data.get('anomaly_hours', []),
+                has_anomaly=has_anomaly,
+            )
+            jobs.enqueue(tank.id, 'pattern', {'pattern_id': pattern.id})
+            result = {
+                'pattern_id': pattern.id,
+                'has_anomaly': has_anomaly,
+                'timestamp': pattern.created_at.isoformat(),
+            }
+            idem.remember(result)
+    except IntegrityError:
+        return _replayed_or_raise(idem)
 
     logger.info(f"[패턴] tank={tank.id} anomaly={has_anomaly}")
-    return _ok({
-        'pattern_id': pattern.id,
-        'has_anomaly': has_anomaly,
-        'timestamp': pattern.created_at.isoformat(),
-    })
+    return _ok(result)
 
 
 # ──────────────────────────────────────────────
 # [6] 제어 명령 polling  GET /monitoring/api/commands/<tank_id>/
 # ──────────────────────────────────────────────
 
+COMMAND_POLL_TIMEOUT     = 25   # 초, since 지정 시 기본 대기 시간
+COMMAND_POLL_TIMEOUT_MAX = 55
+COMMAND_POLL_RECHECK     = 5    # 초, 다른 워커에서 바뀐 경우 대비 DB 재확인 주기
+
+
+async def _wait_for_version(tank_id, since: int, timeout: float) -> int:
+    """command_version 이 since 와 달라지거나 timeout 이 지날 때까지 대기"""
+    loop     = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    # 구독을 먼저 걸고 DB 를 확인해야 그 사이 변경을 놓치지 않음
+    async with events.get_broker().subscribe(device_commands.command_channel(tank_id)) as sub:
+        while True:
+            version   = await Tank.objects.filter(id=tank_id).values_list('command_version', flat=True).aget()
+            remaining = deadline - loop.time()
+            # since 가 서버 버전보다 크면(DB 복구 등) 기다려도 소용없음 → 바로 반환
+            if version != since or remaining <= 0:
+                return version
+            await sub.get(timeout=min(remaining, COMMAND_POLL_RECHECK))
+
+
 @csrf_exempt
 @api_key_required
 @require_http_methods(['GET'])
-def get_pending_commands(request, tank_id):
-    tank, err = _get_tank(tank_id)
-    if err:
-        return err
+async def get_pending_commands(request, tank_id):
+    """
+    ?since 없음        → 전체 장치 목록 (기존 polling 호환)
+    ?since=<version>   → since 이후 바뀐 장치만. 변경이 없으면 timeout 까지 대기 후 304
+                         since 가 서버 버전보다 크면(DB 복구 등) 전체 목록 — 클라이언트는 version 으로 다시 맞춤
+    ?timeout=<초>      → 대기 시간 (기본 25, 최대 55)
+    대기는 ASGI(fish.asgi) 에서만. WSGI 에서는 워커를 붙잡지 않도록 대기 없이 바로 응답 (일반 polling 과 같음)
+    """
+    if not request.credential.allows(tank_id):
+        return _forbidden(tank_id)
+    tank = await tank_cache.aget(tank_id)
+    if tank is None:
+        return _error(f"tank_id={tank_id} 에 해당하는 어항이 없습니다.", status=404)
+
+    devices = DeviceControl.objects.filter(tank_id=tank.id).values('type', 'is_on', 'is_auto', 'version')
+    since   = _to_pk(request.GET.get('since'))
+    version = None
+
+    if since is not None:
+        try:
+            timeout = min(float(request.GET.get('timeout', COMMAND_POLL_TIMEOUT)), COMMAND_POLL_TIMEOUT_MAX)
+        except ValueError:
+            timeout = COMMAND_POLL_TIMEOUT
+        if not isinstance(request, ASGIRequest):
+            timeout = 0
+        version = await _wait_for_version(tank.id, since, max(timeout, 0))
+        if version == since:
+            return HttpResponseNotModified()
+        if version > since:
+            devices = devices.filter(version__gt=since)
+
+    rows = [d async for d in devices]
+    if version is None:
+        # 전체 목록: 장치별 마지막 변경 버전의 최댓값 = 어항 명령 버전 (bump_version 이 함께 기록)
+        version = max((d['version'] for d in rows), default=0)
+    for d in rows:
+        del d['version']
 
-    devices = list(DeviceControl.objects.filter(tank=tank).values('type', 'is_on', 'is_auto'))
-    return _ok({'tank_id': tank.id, 'devices': devices, 'timestamp': timezone.now().isoformat()})
+    return _ok({
+        'tank_id': tank.id, 'version': version,
+        'devices': rows,
+        'timestamp': timezone.now().isoformat(),
+    })
 
 
 # ──────────────────────────────────────────────
@@ -533,4 +808,16 @@ def get_pending_commands(request, tank_id):
 @csrf_exempt
 @require_http_methods(['GET'])
 def health_check(request):
-    return _ok({'message': 'server is running', 'time': timezone.now().isoformat()})
\ No newline at end of file
+    return _ok({'message': 'server is running', 'time': timezone.now().isoformat()})
+
+
+# ──────────────────────────────────────────────
+# [8] 후처리 큐 상태  GET /monitoring/api/jobs/
+# ──────────────────────────────────────────────
+
+@csrf_exempt
+@api_key_required
+@require_http_methods(['GET'])
+def job_metrics(request):
+    """대기 건수(depth) · 가장 오래된 대기 작업 나이(lag_seconds) · 실패 건수 · 이 프로세스 처리 통계"""
+    return _ok({'queue': jobs.metrics(), 'time': timezone.now().isoformat()})
\ No newline at end of file
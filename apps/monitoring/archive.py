@@ -0,0 +1,312 @@
+"""
+apps/monitoring/archive.py
+
+오래된 히스토리의 Parquet 아카이브 계층
+- archive_history 명령: MONITORING_ARCHIVE_AFTER_DAYS 보다 오래된 월을 어항·월 단위 Parquet(zstd) 로 옮기고
+  원본 테이블에서 삭제, ArchiveSegment 에 매니페스트 기록
+  · 조각은 쓸 때마다 새 파일 — 매니페스트 교체와 원본 삭제를 한 트랜잭션으로, 이전 파일은 커밋 뒤 삭제
+  · 어항 삭제 등으로 매니페스트 행이 지워지면 파일도 커밋 뒤 삭제 (signals → discard())
+- 내보내기(exports)와 통계 리포트(reports.stats)는 조회 구간에 걸친 아카이브 월을 자동으로 함께 읽음
+- 파일은 memory_map 으로 열고 필요한 컬럼만 읽음
+- 월 구분·구간 필터·정렬은 측정 시각(measured_at) 기준 (도입 이전 조각은 created_at 을 측정 시각으로 읽음)
+- pyarrow 는 아카이브를 쓰거나 읽을 때만 필요
+"""
+
+import json
+import os
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import ArchiveSegment, FishBehavior, SensorReading
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - 아카이브를 쓰지 않는 환경
+    pa = pc = pq = None
+
+
+# 아카이브 대상 종류 → 모델 (exports.EXPORT_MODELS 와 같은 키)
+ARCHIVE_MODELS = {
+    'readings':  SensorReading,
+    'behaviors': FishBehavior,
+}
+
+# 아카이브 대상 모델 공통 기준 시각 필드
+TIME_FIELD = 'measured_at'
+
+CHUNK_SIZE = 50_000
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImproperlyConfigured("히스토리 아카이브를 사용하려면 pyarrow 패키지가 필요합니다.")
+
+
+def archive_dir():
+    return settings.MONITORING_ARCHIVE_DIR
+
+
+def _month_bounds(month: date):
+    """월 1일 → (해당 월 시작, 다음 월 시작) aware datetime"""
+    nxt = date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+    return (timezone.make_aware(datetime.combine(month, time.min)),
+            timezone.make_aware(datetime.combine(nxt, time.min)))
+
+
+# ──────────────────────────────────────────────
+# 스키마
+# ──────────────────────────────────────────────
+
+def _columns(model) -> list:
+    """아카이브에 저장하는 컬럼 = 내보내기 가능한 필드 전부"""
+    return [f for f in model._meta.concrete_fields if not f.is_relation]
+
+
+def _arrow_type(field):
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, (models.IntegerField, models.AutoField)):
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    return pa.string()
+
+
+def _schema(model):
+    return pa.schema([pa.field(f.name, _arrow_type(f)) for f in _columns(model)])
+
+
+def _with_time_field(table):
+    """measured_at 도입 이전에 쓴 조각이면 created_at 을 측정 시각 컬럼으로 덧붙임"""
+    if TIME_FIELD in table.column_names:
+        return table
+    return table.append_column(TIME_FIELD, table['created_at'])
+
+
+def _to_arrow_value(field, value):
+    if isinstance(field, models.JSONField) and value is not None:
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+# ──────────────────────────────────────────────
+# 쓰기 (hot 테이블 → Parquet)
+# ──────────────────────────────────────────────
+
+def pending_months(kind: str, cutoff, tank_ids=None) -> list:
+    """cutoff 이전에 완전히 끝난 월 중 원본이 남아 있는 (tank_id, month) 목록"""
+    model = ARCHIVE_MODELS[kind]
+    local = timezone.localtime(cutoff)
+    limit = timezone.make_aware(datetime.combine(date(local.year, local.month, 1), time.min))
+
+    qs = model.objects.of_existing_tanks().filter(**{f'{TIME_FIELD}__lt': limit})
+    if tank_ids is not None:
+        qs = qs.filter(tank_id__in=tank_ids)
+    rows = qs.annotate(month=TruncMonth(TIME_FIELD)).values_list('tank_id', 'month').distinct().order_by('tank_id', 'month')
+    return [(tank_id, timezone.localtime(month).date()) for tank_id, month in rows]
+
+
+def archive_month(kind: str, tank_id: int, month: date) -> ArchiveSegment:
+    """어항 1개·월 1개를 Parquet 로 옮기고 원본 삭제. 이미 아카이브된 월이면 합쳐서 다시 씀."""
+    _require_pyarrow()
+    model   = ARCHIVE_MODELS[kind]
+    columns = _columns(model)
+    names   = [f.name for f in columns]
+    schema  = _schema(model)
+    start, end = _month_bounds(month)
+
+    # 매번 새 파일에 쓰고 매니페스트의 path 를 트랜잭션 안에서 바꿈 — 커밋 전에는 기존 조각이 그대로 유효
+    # (덮어쓰면 원본 삭제가 롤백됐을 때 다음 실행이 같은 행을 다시 합쳐 중복됨)
+    rel_path = os.path.join(kind, f"tank{tank_id}", f"{month:%Y-%m}.{timezone.now():%Y%m%d%H%M%S%f}.parquet")
+    path     = os.path.join(archive_dir(), rel_path)
+    tmp_path = path + '.tmp'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    existing = ArchiveSegment.objects.filter(tank_id=tank_id, kind=kind, month=month).first()
+    in_month = {f'{TIME_FIELD}__gte': start, f'{TIME_FIELD}__lt': end}
+    rows     = (model.objects.filter(tank_id=tank_id, **in_month)
+                .order_by(TIME_FIELD, 'id').values_list(*names))
+
+    max_id, count = None, 0
+    with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+        if existing is not None:
+            # 늦게 들어온 행이 있던 경우 — 기존 조각 뒤에 이어 쓰고 읽을 때 measured_at 으로 거름
+            table = pq.read_table(os.path.join(archive_dir(), existing.path), memory_map=True)
+            writer.write_table(_with_time_field(table).select(schema.names).cast(schema))
+            count += table.num_rows
+
+        batch = []
+        for row in rows.iterator(chunk_size=CHUNK_SIZE):
+            batch.append(row)
+            if len(batch) >= CHUNK_SIZE:
+                max_id = _write_batch(writer, schema, columns, batch, max_id)
+                count += len(batch)
+                batch  = []
+        if batch:
+            max_id = _write_batch(writer, schema, columns, batch, max_id)
+            count += len(batch)
+
+    table    = pq.read_table(tmp_path, columns=[TIME_FIELD], memory_map=True)
+    first_at = pc.min(table[TIME_FIELD]).as_py()
+    last_at  = pc.max(table[TIME_FIELD]).as_py()
+    os.replace(tmp_path, path)
+
+    try:
+        with transaction.atomic():
+            segment, _ = ArchiveSegment.objects.update_or_create(
+                tank_id=tank_id, kind=kind, month=month,
+                defaults={
+                    'path': rel_path, 'row_count': count, 'size': os.path.getsize(path),
+                    'first_at': first_at, 'last_at': last_at,
+                },
+            )
+            if max_id is not None:
+                # 아카이브 도중 들어온 행은 남겨 둠 (다음 실행에서 합쳐짐)
+                model.objects.filter(tank_id=tank_id, id__lte=max_id, **in_month).delete()
+            if existing is not None:
+                old_path = os.path.join(archive_dir(), existing.path)
+                transaction.on_commit(lambda: _remove(old_path))
+    except Exception:
+        _remove(path)
+        raise
+    return segment
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard(segment: ArchiveSegment):
+    """지워진 매니페스트 행의 파일을 커밋 뒤 삭제 (롤백되면 파일 유지). 비게 된 어항 폴더도 정리."""
+    path = os.path.join(archive_dir(), segment.path)
+
+    def remove():
+        _remove(path)
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass   # 다른 조각이 남아 있음
+
+    transaction.on_commit(remove)
+
+
+def _write_batch(writer, schema, columns, batch, max_id):
+    arrays = []
+    for i, field in enumerate(columns):
+        values = [_to_arrow_value(field, row[i]) for row in batch]
+        arrays.append(pa.array(values, type=schema.field(field.name).type))
+    writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    id_idx = [f.name for f in columns].index('id')
+    return max([max_id or 0] + [row[id_idx] for row in batch])
+
+
+# ──────────────────────────────────────────────
+# 읽기
+# ──────────────────────────────────────────────
+
+def segments(kind: str, tank, start=None, end=None):
+    """[start, end) 와 겹치는 아카이브 조각 (오래된 월부터)"""
+    qs = ArchiveSegment.objects.filter(tank=tank, kind=kind)
+    if start is not None:
+        qs = qs.filter(last_at__gte=start)
+    if end is not None:
+        qs = qs.filter(first_at__lt=end)
+    return qs.order_by('month')
+
+
+def archived_until(tank_ids=None):
+    """아카이브된 마지막 월의 끝 (이전 구간은 원본이 없음). 없으면 None."""
+    qs = ArchiveSegment.objects.all()
+    if tank_ids is not None:
+        qs = qs.filter(tank_id__in=tank_ids)
+    month = qs.aggregate(m=models.Max('month'))['m']
+    return _month_bounds(month)[1] if month else None
+
+
+def _read(segment, columns: list, start=None, end=None):
+    _require_pyarrow()
+    path   = os.path.join(archive_dir(), segment.path)
+    stored = pq.read_schema(path).names
+    wanted = list(dict.fromkeys(columns + [TIME_FIELD if TIME_FIELD in stored else 'created_at']))
+    table  = _with_time_field(pq.read_table(path, columns=[c for c in wanted if c in stored], memory_map=True))
+    at_type = table.schema.field(TIME_FIELD).type
+    mask = None
+    if start is not None and segment.first_at < start:
+        mask = pc.greater_equal(table[TIME_FIELD], pa.scalar(start, type=at_type))
+    if end is not None and segment.last_at >= end:
+        upper = pc.less(table[TIME_FIELD], pa.scalar(end, type=at_type))
+        mask  = upper if mask is None else pc.and_(mask, upper)
+    if mask is not None:
+        table = table.filter(mask)
+    return table
+
+
+def iter_rows(kind: str, tank, fields: list, start=None, end=None):
+    """아카이브 구간 행을 오래된 순으로 튜플 단위 반환 (exports.iter_rows 와 같은 형태)"""
+    json_fields = {f.name for f in _columns(ARCHIVE_MODELS[kind]) if isinstance(f, models.JSONField)}
+    for segment in segments(kind, tank, start, end):
+        table = _read(segment, fields, start, end)
+        table = table.sort_by([(TIME_FIELD, 'ascending'), ('id', 'ascending')]) if 'id' in table.column_names else table.sort_by(TIME_FIELD)
+        for batch in table.select(fields).to_batches(max_chunksize=CHUNK_SIZE):
+            cols = [batch.column(i).to_pylist() for i in range(batch.num_columns)]
+            for i, name in enumerate(fields):
+                if name in json_fields:
+                    cols[i] = [json.loads(v) if v is not None else None for v in cols[i]]
+            yield from zip(*cols)
+
+
+def aggregate(tank, metrics: list, ranges: dict, start=None, end=None) -> dict:
+    """
+    아카이브된 센서 측정값 집계 (reports.stats 에서 원본 집계와 합침)
+    ranges: {지표: (하한 또는 None, 상한 또는 None)} — 벗어난 건수를 셈
+    반환: {'count', 'first_at', 'last_at', 'metrics': {지표: {'sum', 'sumsq', 'min', 'max'}}, 'out': {지표|'any': n}}
+    """
+    result = {
+        'count': 0, 'first_at': None, 'last_at': None,
+        'metrics': {m: {'sum': 0.0, 'sumsq': 0.0, 'min': None, 'max': None} for m in metrics},
+        'out':     {**{m: 0 for m in ranges}, 'any': 0},
+    }
+    for segment in segments('readings', tank, start, end):
+        table = _read(segment, list(metrics), start, end)
+        if not table.num_rows:
+            continue
+        result['count'] += table.num_rows
+
+        first = pc.min(table[TIME_FIELD]).as_py()
+        last  = pc.max(table[TIME_FIELD]).as_py()
+        result['first_at'] = first if result['first_at'] is None else min(result['first_at'], first)
+        result['last_at']  = last if result['last_at'] is None else max(result['last_at'], last)
+
+        for m in metrics:
+            col, acc = table[m], result['metrics'][m]
+            acc['sum']   += pc.sum(col).as_py() or 0.0
+            acc['sumsq'] += pc.sum(pc.multiply(col, col)).as_py() or 0.0
+            lo, hi = pc.min(col).as_py(), pc.max(col).as_py()
+            acc['min'] = lo if acc['min'] is None else min(acc['min'], lo)
+            acc['max'] = hi if acc['max'] is None else max(acc['max'], hi)
+
+        any_mask = None
+        for m, (lo, hi) in ranges.items():
+            mask = None
+            if lo is not None:
+                mask = pc.less(table[m], lo)
+            if hi is not None:
+                upper = pc.greater(table[m], hi)
+                mask  = upper if mask is None else pc.or_(mask, upper)
+            result['out'][m] += pc.sum(mask).as_py() or 0
+            any_mask = mask if any_mask is None else pc.or_(any_mask, mask)
+        if any_mask is not None:
+            result['out']['any'] += pc.sum(any_mask).as_py() or 0
+    return result
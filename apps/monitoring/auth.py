@@ -0,0 +1,155 @@
+"""
+apps/monitoring/auth.py
+
+Pi REST API 인증
+- 게이트웨이별 키(GatewayKey): '<prefix>.<secret>' 형식, DB 에는 SHA-256 해시만 저장
+  · 키 자체가 충분히 긴 난수라 느린 해시(PBKDF2 등)는 필요 없음
+  · prefix 로 행을 찾고 해시는 hmac.compare_digest 로 상수 시간 비교
+  · 키마다 쓸 수 있는 어항이 정해져 있음 (Credential.allows)
+- 인증 결과는 프로세스 메모리 LRU 에 TTL 동안 보관 → 같은 게이트웨이의 반복 요청은 DB 조회 없음
+  · GatewayKey 저장/삭제·어항 변경 시 signals 에서 invalidate() (다른 워커는 MONITORING_API_KEY_TTL 초 안에 반영)
+  · 틀린 키도 캐시 → 잘못된 키를 반복해서 보내도 DB 를 두드리지 않음
+- 기존 공용 키(settings.PI_API_KEY)는 모든 어항에 쓸 수 있는 키로 계속 허용
+"""
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import GatewayKey
+
+
+class Credential:
+    """인증된 호출자. tank_ids 가 None 이면 모든 어항 허용."""
+
+    __slots__ = ('key_id', 'name', 'tank_ids')
+
+    def __init__(self, key_id, name: str, tank_ids: frozenset = None):
+        self.key_id   = key_id
+        self.name     = name
+        self.tank_ids = tank_ids
+
+    def allows(self, tank_id) -> bool:
+        return self.tank_ids is None or tank_id in self.tank_ids
+
+
+LEGACY = Credential(None, 'PI_API_KEY')
+
+
+# ──────────────────────────────────────────────
+# 키 발급 · 해시
+# ──────────────────────────────────────────────
+
+def hash_key(raw: str) -> str:
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def generate_key() -> tuple:
+    """(원문 키, prefix, 해시) — 원문은 발급 시 한 번만 보여주고 버림"""
+    prefix = secrets.token_hex(4)
+    raw    = f"{prefix}.{secrets.token_urlsafe(32)}"
+    return raw, prefix, hash_key(raw)
+
+
+def create_key(name: str, tanks) -> tuple:
+    """GatewayKey 발급. 반환: (GatewayKey, 원문 키)"""
+    raw, prefix, digest = generate_key()
+    key = GatewayKey.objects.create(name=name, prefix=prefix, key_hash=digest)
+    key.tanks.set(tanks)
+    return key, raw
+
+
+# ──────────────────────────────────────────────
+# 프로세스 캐시 (LRU + TTL)
+# ──────────────────────────────────────────────
+
+_MISS = object()
+_OPEN_MODE = 'open-mode'   # open_mode() 결과 캐시 항목 (해시 digest 와 겹치지 않는 키)
+
+_cache      = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _ttl() -> float:
+    return getattr(settings, 'MONITORING_API_KEY_TTL', 60)
+
+
+def _max_size() -> int:
+    return getattr(settings, 'MONITORING_API_KEY_CACHE_SIZE', 1024)
+
+
+def _cache_get(digest: str):
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(digest)
+        if entry is None:
+            return _MISS
+        credential, expires = entry
+        if now >= expires:
+            del _cache[digest]
+            return _MISS
+        _cache.move_to_end(digest)
+        return credential
+
+
+def _cache_set(digest: str, credential):
+    with _cache_lock:
+        _cache[digest] = (credential, time.monotonic() + _ttl())
+        _cache.move_to_end(digest)
+        while len(_cache) > _max_size():
+            _cache.popitem(last=False)
+
+
+def invalidate():
+    with _cache_lock:
+        _cache.clear()
+
+
+# ──────────────────────────────────────────────
+# 인증
+# ──────────────────────────────────────────────
+
+def _lookup(raw: str, digest: str):
+    legacy = getattr(settings, 'PI_API_KEY', '')
+    if legacy and hmac.compare_digest(raw.encode(), legacy.encode()):
+        return LEGACY
+
+    prefix, sep, _ = raw.partition('.')
+    if not sep:
+        return None
+    key = GatewayKey.objects.filter(prefix=prefix, is_active=True).first()
+    if key is None or not hmac.compare_digest(digest, key.key_hash):
+        return None
+
+    # 캐시 미스 때만 기록 → 키당 TTL 마다 최대 1회 UPDATE
+    GatewayKey.objects.filter(id=key.id).update(last_used_at=timezone.now())
+    return Credential(key.id, key.name, frozenset(key.tanks.values_list('id', flat=True)))
+
+
+def authenticate(raw: str):
+    """키 원문 → Credential 또는 None. 캐시 적중 시 DB 조회 없음."""
+    if not raw:
+        return None
+    digest     = hash_key(raw)
+    credential = _cache_get(digest)
+    if credential is _MISS:
+        credential = _lookup(raw, digest)
+        _cache_set(digest, credential)
+    return credential
+
+
+def open_mode() -> bool:
+    """공용 키도, 활성 게이트웨이 키도 없으면 인증 없이 허용 (개발 환경)"""
+    if getattr(settings, 'PI_API_KEY', ''):
+        return False
+    state = _cache_get(_OPEN_MODE)
+    if state is _MISS:
+        state = not GatewayKey.objects.filter(is_active=True).exists()
+        _cache_set(_OPEN_MODE, state)
+    return state
@@ -0,0 +1,180 @@
+"""
+apps/monitoring/codecs.py
+
+Pi REST API 요청 바디 디코딩
+- Content-Type: application/json (orjson, 없으면 표준 json) / application/msgpack / application/cbor
+- Content-Encoding: gzip / zstd (압축 해제 크기는 MONITORING_MAX_BODY_SIZE 로 제한)
+- 컬럼 배치 형식 (센서 일괄 전송): 필드 이름은 한 번, 값은 필드별 배열로
+    {"tank_id": 1, "fields": ["temperature", "ph", ...], "columns": [[22.5, 22.6, ...], [7.2, 7.3, ...]]}
+  · tank_id 를 필드로 넣으면 행마다 다른 어항
+  · columns() 가 컬럼 단위로 숫자 변환·검증 (행마다 dict 를 만들지 않음)
+- msgpack / cbor2 / zstandard 는 해당 형식을 받을 때만 필요
+"""
+
+import gzip
+import io
+import json
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 표준 json 으로 대체
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - MessagePack 을 받지 않는 환경
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - CBOR 을 받지 않는 환경
+    cbor2 = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd 압축을 받지 않는 환경
+    zstandard = None
+
+
+class BodyError(ValueError):
+    """해석할 수 없는 요청 바디 (status: 응답 코드)"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+_DECOMPRESS_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def _max_size() -> int:
+    return getattr(settings, 'MONITORING_MAX_BODY_SIZE', 10 * 1024 * 1024)
+
+
+# ──────────────────────────────────────────────
+# 압축 해제
+# ──────────────────────────────────────────────
+
+def _read_limited(stream) -> bytes:
+    limit = _max_size()
+    data  = stream.read(limit + 1)
+    if len(data) > limit:
+        raise BodyError(f"압축 해제 후 바디가 {limit:,} bytes 를 넘습니다.", status=413)
+    return data
+
+
+def decompress(body: bytes, encoding: str) -> bytes:
+    encoding = (encoding or 'identity').strip().lower()
+    if encoding == 'identity':
+        return body
+    if encoding == 'gzip':
+        stream = gzip.GzipFile(fileobj=io.BytesIO(body))
+    elif encoding == 'zstd':
+        if zstandard is None:
+            raise BodyError("zstd 압축을 해제하려면 zstandard 패키지가 필요합니다.", status=415)
+        # 스트리밍 압축기는 여러 프레임을 이어 보내기도 함 — 첫 프레임에서 멈추지 않고 끝까지 읽음
+        stream = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body), read_across_frames=True)
+    else:
+        stream = None
+    if stream is not None:
+        try:
+            return _read_limited(stream)
+        except _DECOMPRESS_ERRORS as e:
+            raise BodyError(f"압축 해제 실패: {e}")
+    raise BodyError(f"지원하지 않는 Content-Encoding: {encoding}", status=415)
+
+
+# ──────────────────────────────────────────────
+# 역직렬화
+# ──────────────────────────────────────────────
+
+def _loads_json(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _loads_msgpack(raw: bytes):
+    if msgpack is None:
+        raise BodyError("MessagePack 바디를 읽으려면 msgpack 패키지가 필요합니다.", status=415)
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+def _loads_cbor(raw: bytes):
+    if cbor2 is None:
+        raise BodyError("CBOR 바디를 읽으려면 cbor2 패키지가 필요합니다.", status=415)
+    return cbor2.loads(raw)
+
+
+# Content-Type → 역직렬화 함수 (그 외·없음은 기존처럼 JSON 으로 해석)
+LOADERS = {
+    'application/json':        _loads_json,
+    'application/msgpack':     _loads_msgpack,
+    'application/x-msgpack':   _loads_msgpack,
+    'application/vnd.msgpack': _loads_msgpack,
+    'application/cbor':        _loads_cbor,
+}
+
+
+def decode(request):
+    """요청 바디 → Python 객체. 빈 바디는 None."""
+    content_type = (request.content_type or 'application/json').lower()
+    loader       = LOADERS.get(content_type, _loads_json)
+    raw = decompress(request.body, request.headers.get('Content-Encoding'))
+    if not raw:
+        return None
+    try:
+        return loader(raw)
+    except BodyError:
+        raise
+    except Exception as e:
+        raise BodyError(f"{content_type} 형식이 아닙니다: {e}")
+
+
+# ──────────────────────────────────────────────
+# 컬럼 배치
+# ──────────────────────────────────────────────
+
+def is_columnar(data) -> bool:
+    return isinstance(data, dict) and 'fields' in data and 'columns' in data
+
+
+def columns(data: dict, numeric: tuple, defaults: dict) -> tuple:
+    """
+    컬럼 배치 → ({필드: 배열}, 행 수)
+    numeric 필드는 float64 배열로 변환, 없으면 defaults 값으로 채움. 기타 필드는 list 그대로.
+    바디 최상위의 스칼라 값(예: tank_id)은 모든 행에 적용.
+    """
+    fields, cols = data['fields'], data['columns']
+    if not isinstance(fields, list) or not isinstance(cols, list) or len(fields) != len(cols):
+        raise BodyError("fields 와 columns 는 길이가 같은 배열이어야 합니다.")
+    if not all(isinstance(c, list) for c in cols):
+        raise BodyError("columns 의 각 항목은 배열이어야 합니다.")
+    lengths = {len(c) for c in cols}
+    if len(lengths) > 1:
+        raise BodyError(f"컬럼 길이가 서로 다릅니다: {sorted(lengths)}")
+    n = lengths.pop() if lengths else 0
+
+    out = {}
+    for name, col in zip(fields, cols):
+        if name in numeric:
+            try:
+                out[name] = np.asarray(col, dtype=np.float64)
+            except (TypeError, ValueError) as e:
+                raise BodyError(f"숫자 변환 오류 ({name}): {e}")
+            if np.isnan(out[name]).any():
+                raise BodyError(f"숫자 변환 오류 ({name}): 빈 값이 있습니다.")
+        else:
+            out[name] = col
+
+    for name, value in data.items():
+        if name not in ('fields', 'columns') and name not in out:
+            out[name] = [value] * n
+    for name, value in defaults.items():
+        if name not in out:
+            out[name] = np.full(n, value, dtype=np.float64)
+    return out, n
@@ -0,0 +1,249 @@
+"""
+apps/monitoring/context.py
+
+챗봇 프롬프트용 어항 요약 블록 (TankState.context)
+- 최신 측정값 · 24시간 추이(시간 롤업) · 최근 경고(EventLog) · 급이/FRS · 성장 단계 · 행동 · 환수 예정
+- 수신 후처리(jobs.drain)가 어항의 작업 묶음을 처리한 뒤 한 번 갱신 — 히스토리 원본 대신
+  스냅샷 1행 + 시간 롤업 24행 + 집계 몇 번만 읽음
+- 어항 정보(이름·목표값 등)를 저장하면 signals 가 바로 갱신
+- 챗 요청은 TankState.context 만 읽음 (히스토리 쿼리 없음) → prompt_block() 이 토큰 예산 안에서 자름
+  · 수신이 멈춰 CHATBOT_CONTEXT_MAX_AGE 초보다 오래된 블록만 읽을 때 다시 계산 ("24h" 추이·경고가 멈춰 있지 않도록)
+  · grounding() 은 질문이 내 어항에 관한 것일 때만 (사진·"우리 어항"·어항 이름) 요약을 돌려줌
+- 줄 순서가 우선순위: 예산이 모자라면 어항마다 뒤 줄(성장·환수 등)부터 빠짐
+- 복구: python manage.py rebuild_tank_state (컨텍스트도 함께 재구성)
+"""
+
+import re
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from . import rollups, tank_cache
+from .models import EventLog, FeedingEvent, GrowthRecord, Tank, TankState
+
+WINDOW = timedelta(hours=24)
+
+# 24시간 추이에 넣을 측정 항목 → (라벨, 단위, 소수 자릿수)
+TREND_METRICS = {
+    'temperature':      ('수온', '°C', 1),
+    'ph':               ('pH', '', 2),
+    'dissolved_oxygen': ('DO', 'mg/L', 1),
+    'turbidity':        ('탁도', 'NTU', 1),
+}
+MAX_WARNINGS = 3
+
+# 내 어항에 관한 질문 (어항 이름이 들어 있어도 해당)
+OWN_TANK = re.compile(r'\b(?:우리|저희)|\b[내제]\s*어항|\bmy\b|\bour\b', re.IGNORECASE)
+
+
+def _budget() -> int:
+    return getattr(settings, 'CHATBOT_CONTEXT_TOKENS', 600)
+
+
+def _max_age() -> int:
+    return getattr(settings, 'CHATBOT_CONTEXT_MAX_AGE', 600)
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 — ASCII 는 4글자당 1, 한글 등은 글자당 1 (넉넉하게 잡음)"""
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def _num(value, digits: int = 1) -> str:
+    return '-' if value is None else f"{value:.{digits}f}"
+
+
+def _at(dt) -> str:
+    return timezone.localtime(dt).strftime('%m/%d %H:%M')
+
+
+# ──────────────────────────────────────────────
+# 줄 단위 요약
+# ──────────────────────────────────────────────
+
+def _header(tank) -> str:
+    parts = []
+    if tank.capacity:
+        parts.append(f"{tank.capacity:g}L")
+    if tank.fish_species:
+        parts.append(tank.fish_species)
+    parts.append(f"목표 {_num(tank.target_temp)}°C / pH {_num(tank.target_ph)}")
+    return f"[{tank.name}] " + ' · '.join(parts)
+
+
+def _latest(state: TankState):
+    if state is None or state.reading_at is None:
+        return None
+    return (f"현재({_at(state.reading_at)}): 수온 {_num(state.temperature)}°C, pH {_num(state.ph, 2)}, "
+            f"DO {_num(state.dissolved_oxygen)}mg/L, 탁도 {_num(state.turbidity)}NTU, "
+            f"수위 {_num(state.water_level, 0)}%, 수질 {state.water_quality_score if state.water_quality_score is not None else '-'}점")
+
+
+def _trends(tank, since):
+    """시간 롤업으로 24시간 최저~최고(평균, 처음→마지막 변화)"""
+    buckets = sorted(rollups.series(tank, since, granularity='HOUR'), key=lambda r: r.bucket_start)
+    if not buckets:
+        return None
+    items = []
+    for metric, (label, unit, digits) in TREND_METRICS.items():
+        rows = [b for b in buckets if getattr(b, f'{metric}_min') is not None]
+        if not rows:
+            continue
+        low   = min(getattr(b, f'{metric}_min') for b in rows)
+        high  = max(getattr(b, f'{metric}_max') for b in rows)
+        mean  = sum(getattr(b, f'{metric}_sum') for b in rows) / sum(b.count for b in rows)
+        delta = rows[-1].avg(metric) - rows[0].avg(metric)
+        arrow = '→' if abs(delta) < 10 ** -digits else ('↑' if delta > 0 else '↓')
+        items.append(f"{label} {_num(low, digits)}~{_num(high, digits)}{unit}"
+                     f"(평균 {_num(mean, digits)}, {arrow}{_num(abs(delta), digits)})")
+    return "24h: " + ', '.join(items) if items else None
+
+
+def _warnings(tank, since):
+    logs = list(EventLog.objects.filter(tank=tank, level__in=['WARNING', 'DANGER'], created_at__gte=since)
+                .order_by('-created_at').values_list('created_at', 'message')[:MAX_WARNINGS])
+    if not logs:
+        return "경고(24h): 없음"
+    return "경고(24h): " + '; '.join(f"{message[:40]} ({_at(at)})" for at, message in logs)
+
+
+def _feeding(tank, state: TankState, since):
+    agg = FeedingEvent.objects.filter(tank=tank, measured_at__gte=since).aggregate(
+        count=Count('id'), amount=Sum('amount_g'), over=Count('id', filter=Q(is_overfeeding=True)),
+    )
+    if not agg['count'] and (state is None or state.last_feeding_at is None):
+        return None
+    line = f"급이(24h): {agg['count']}회 {_num(agg['amount'] or 0.0)}g"
+    if agg['over']:
+        line += f", 과급여 {agg['over']}회"
+    if state is not None and state.last_frs_score is not None:
+        line += f", 최근 FRS {state.last_frs_score}점({_at(state.last_feeding_at)})"
+    return line
+
+
+def _behavior(state: TankState):
+    if state is None or state.behavior_at is None:
+        return None
+    line = (f"행동({_at(state.behavior_at)}): {state.get_behavior_status_display() or '-'}, "
+            f"{state.fish_count}마리, 활동량 {_num(state.activity_level)}")
+    if state.is_anomaly:
+        line += f", 이상 감지 — {state.behavior_note[:40]}" if state.behavior_note else ", 이상 감지"
+    return line
+
+
+def _growth(tank):
+    record = GrowthRecord.objects.filter(tank=tank).order_by('-measured_at').first()
+    if record is None:
+        return None
+    return (f"성장({_at(record.measured_at)}): {record.get_growth_stage_display()}, "
+            f"체장 {_num(record.estimated_length)}cm, 권장 급이 {_num(record.recommended_feed_g, 2)}g")
+
+
+def _water_change(tank, state: TankState):
+    due = state.next_water_change if state is not None else None
+    if due is None:
+        return None
+    return f"다음 환수: {due:%m/%d} (주기 {tank.water_change_period}일)"
+
+
+# ──────────────────────────────────────────────
+# 갱신 / 조회
+# ──────────────────────────────────────────────
+
+def build(tank, state: TankState = None, now=None) -> str:
+    """어항 요약 블록 (줄 순서 = 우선순위)"""
+    since = (now or timezone.now()) - WINDOW
+    lines = [
+        _header(tank),
+        _latest(state),
+        _warnings(tank, since),
+        _trends(tank, since),
+        _behavior(state),
+        _feeding(tank, state, since),
+        _growth(tank),
+        _water_change(tank, state),
+    ]
+    return '\n'.join(line for line in lines if line)
+
+
+def refresh(tank, create: bool = True) -> str:
+    """
+    TankState.context 재계산. 대시보드 스트림에는 발행하지 않음 (챗봇 전용 필드).
+    create=False 면 스냅샷 행이 없는 어항은 건너뜀 (rebuild_tank_state --missing 이 만들도록).
+    """
+    state = TankState.objects.filter(tank_id=tank.id).first()
+    if state is None and not create:
+        return ''
+    text   = build(tank, state)
+    fields = {'context': text, 'context_at': timezone.now()}
+    if not TankState.objects.filter(tank_id=tank.id).update(**fields):
+        try:
+            with transaction.atomic():
+                TankState.objects.create(tank_id=tank.id, **fields)
+        except IntegrityError:
+            TankState.objects.filter(tank_id=tank.id).update(**fields)
+    return text
+
+
+def _refresh_stale(rows: list, cutoff) -> list:
+    """[(tank_id, context, context_at)] 중 cutoff 이전에 만든 블록만 다시 계산"""
+    result = []
+    for tank_id, text, at in rows:
+        if at is None or at < cutoff:
+            tank = tank_cache.get(tank_id)
+            if tank is not None:
+                text = refresh(tank)
+        result.append(text)
+    return result
+
+
+async def for_user(user) -> list:
+    """사용자 어항들의 요약 블록 (최근 갱신 순) — TankState 1쿼리, 오래된 블록만 다시 계산"""
+    rows   = TankState.objects.filter(tank__user=user).order_by('-updated_at')
+    rows   = [row async for row in rows.values_list('tank_id', 'context', 'context_at')]
+    cutoff = timezone.now() - timedelta(seconds=_max_age())
+    if any(at is None or at < cutoff for _, _, at in rows):
+        texts = await sync_to_async(_refresh_stale)(rows, cutoff)
+    else:
+        texts = [text for _, text, _ in rows]
+    return [text for text in texts if text]
+
+
+def about_own_tank(question: str, names) -> bool:
+    return bool(OWN_TANK.search(question)) or any(name and name in question for name in names)
+
+
+async def grounding(user, question: str = None) -> str:
+    """
+    프롬프트에 넣을 [내 어항 현황]. question=None(사진 등) 이면 항상, 아니면 내 어항에 관한 질문일 때만
+    — 일반 질문은 어항 현황 없이 답해야 측정값이 바뀌어도 답변 캐시를 그대로 씀.
+    """
+    if question is not None:
+        names = [name async for name in Tank.objects.filter(user=user).values_list('name', flat=True)]
+        if not about_own_tank(question, names):
+            return ''
+    return prompt_block(await for_user(user))
+
+
+def prompt_block(blocks, budget: int = None) -> str:
+    """
+    토큰 예산 안에 들어가는 만큼. 모든 어항의 첫 줄(이름)·둘째 줄(현재값)부터 채우고
+    예산이 남으면 다음 줄 — 어항 수가 많아도 각 어항의 핵심은 빠지지 않음.
+    """
+    budget = _budget() if budget is None else budget
+    blocks = [block.split('\n') for block in blocks]
+    keep   = [0] * len(blocks)
+    for depth in range(max(map(len, blocks), default=0)):
+        for i, lines in enumerate(blocks):
+            if keep[i] != depth or depth >= len(lines):
+                continue
+            cost = estimate_tokens(lines[depth])
+            if cost <= budget:
+                budget  -= cost
+                keep[i] += 1
+    return '\n'.join(line for lines, n in zip(blocks, keep) for line in lines[:n])
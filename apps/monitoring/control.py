@@ -0,0 +1,141 @@
+"""
+apps/monitoring/control.py
+
+장치 자동 제어기 (히스테리시스 + 최소 유지 시간 + 변경 대기)
+- ON/OFF 조건은 어항 기준(standards.RuleSet.thresholds)의 서로 다른 경계 → 히스테리시스 구간
+- 상태를 바꾼 뒤 min_on / min_off 초 동안은 반대로 바꾸지 않음 (릴레이 채터링 방지)
+- 전환 요청이 confirm 회 연속으로 들어와야 실제로 전환 (변경 대기 상태는 캐시에 보관)
+- 안전 전환(에어펌프 DO 위험 ON 등)은 대기·유지 시간 없이 즉시
+- 측정값 1건의 모든 전환을 모아 DeviceControl bulk_update 1회 + EventLog bulk_create 1회
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import device_commands, events, standards
+from .models import DeviceControl, EventLog
+
+
+# 장치 → (켜기 플래그, 끄기 플래그, 켜기 사유, 끄기 사유)
+DEVICE_RULES = {
+    'HEATER':   ('heater_on',   'heater_off',   "수온 {temp}°C → 최솟값 미달",  "수온 {temp}°C → 최적값 도달"),
+    'COOLING':  ('cooling_on',  'cooling_off',  "수온 {temp}°C → 최댓값 초과",  "수온 {temp}°C → 정상 범위"),
+    'FILTER':   ('filter_on',   'filter_off',   "탁도 {turb} NTU → 기준 초과", "탁도 {turb} NTU → 정상"),
+    'AIR_PUMP': ('air_pump_on', 'air_pump_off', "DO {do} mg/L → 위험",         "DO {do} mg/L → 정상"),
+}
+
+# 장치별 제어 파라미터 (초 / 회). settings.MONITORING_CONTROL 로 장치별 덮어쓰기.
+DEFAULT_TIMING = {
+    'HEATER':   {'min_on': 120, 'min_off': 120, 'confirm': 2},
+    'COOLING':  {'min_on': 120, 'min_off': 120, 'confirm': 2},
+    'FILTER':   {'min_on': 60,  'min_off': 60,  'confirm': 2},
+    'AIR_PUMP': {'min_on': 120, 'min_off': 60,  'confirm': 2},
+}
+
+# 대기·유지 시간을 무시하고 즉시 수행하는 전환 (장치, 목표 상태)
+SAFETY_TRANSITIONS = {('AIR_PUMP', True)}
+
+STATE_TTL = 24 * 3600
+
+
+def timing(device_type: str) -> dict:
+    overrides = getattr(settings, 'MONITORING_CONTROL', {}).get(device_type, {})
+    return {**DEFAULT_TIMING.get(device_type, {'min_on': 0, 'min_off': 0, 'confirm': 1}), **overrides}
+
+
+def _state_key(tank_id, device_type) -> str:
+    return f"autoctl:{tank_id}:{device_type}"
+
+
+# ──────────────────────────────────────────────
+# 판정
+# ──────────────────────────────────────────────
+
+def _decide(device: DeviceControl, want, state: dict, now: float) -> tuple:
+    """
+    장치 1개의 이번 측정값 판정.
+    want: True(켜기 조건) / False(끄기 조건) / None(히스테리시스 구간 — 현 상태 유지)
+    반환: (전환 여부, 갱신된 상태 dict)
+    """
+    if want is None or want == device.is_on:
+        # 요청 없음 → 대기 중이던 전환 취소
+        return False, {**state, 'pending': None, 'seen': 0}
+
+    if (device.type, want) in SAFETY_TRANSITIONS:
+        return True, {'pending': None, 'seen': 0, 'switched_at': now}
+
+    t    = timing(device.type)
+    seen = state['seen'] + 1 if state.get('pending') == want else 1
+    held = now - state['switched_at'] if state.get('switched_at') else None
+    dwell = t['min_on'] if device.is_on else t['min_off']
+
+    if seen >= t['confirm'] and (held is None or held >= dwell):
+        return True, {'pending': None, 'seen': 0, 'switched_at': now}
+    return False, {**state, 'pending': want, 'seen': seen}
+
+
+def apply(tank, reading, controls: dict = None) -> list:
+    """
+    측정값 1건으로 자동 제어 수행. controls 를 넘기면 DeviceControl 재조회 없이 사용 (배치 수신용).
+    반환: ["HEATER:ON", ...] 실제로 전환된 장치 목록
+    """
+    if controls is None:
+        controls = {d.type: d for d in DeviceControl.objects.filter(tank=tank, is_auto=True)}
+
+    temp, ph, do_v, turb = reading.temperature, reading.ph, reading.dissolved_oxygen, reading.turbidity
+    flags  = standards.for_tank(tank).thresholds(temp, ph, do_v, turb)
+    values = {'temp': temp, 'ph': ph, 'do': do_v, 'turb': turb}
+
+    devices = [d for dtype, d in controls.items() if dtype in DEVICE_RULES]
+    keys    = {d.type: _state_key(tank.id, d.type) for d in devices}
+    states  = cache.get_many(list(keys.values())) if keys else {}
+
+    now, dt_now = time.time(), timezone.now()
+    changed, logs, actions, new_states = [], [], [], {}
+    for device in devices:
+        on_flag, off_flag, on_reason, off_reason = DEVICE_RULES[device.type]
+        want = True if flags[on_flag] else False if flags[off_flag] else None
+
+        state = states.get(keys[device.type]) or {'pending': None, 'seen': 0, 'switched_at': None}
+        switch, new_state = _decide(device, want, state, now)
+        if new_state != state:
+            new_states[keys[device.type]] = new_state
+        if not switch:
+            continue
+
+        device.is_on          = want
+        device.last_action_at = dt_now
+        changed.append(device)
+        label = "ON" if want else "OFF"
+        actions.append(f"{device.type}:{label}")
+        reason = (on_reason if want else off_reason).format(**values)
+        logs.append(EventLog(tank=tank, level='INFO',
+                             message=f"[자동제어] {device.get_type_display()} {label} — {reason}"))
+
+    # 위험 이벤트 로그
+    if flags['ph_danger']:
+        logs.append(EventLog(tank=tank, level='DANGER', message=f"pH 위험 수치: {ph}"))
+    if flags['turbidity_alert']:
+        logs.append(EventLog(tank=tank, level='WARNING', message=f"탁도 스트레스: {turb} NTU — 환수 권장"))
+
+    if changed or logs:
+        with transaction.atomic():
+            if changed:
+                DeviceControl.objects.bulk_update(changed, ['is_on', 'last_action_at'])
+                device_commands.bump_version(tank.id, [d.id for d in changed])
+            for log in EventLog.objects.bulk_create(logs):
+                events.publish_log(log)
+
+    if new_states:
+        cache.set_many(new_states, STATE_TTL)
+    return actions
+
+
+def note_manual(tank_id, device_type: str):
+    """수동 전환도 유지 시간 기준점으로 — 직후 측정값이 바로 되돌리지 않도록"""
+    if device_type in DEVICE_RULES:
+        cache.set(_state_key(tank_id, device_type), {'pending': None, 'seen': 0, 'switched_at': time.time()}, STATE_TTL)
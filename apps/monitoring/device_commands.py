@@ -0,0 +1,35 @@
+"""
+apps/monitoring/device_commands.py
+
+Pi 장치 명령 버전 관리
+- 어항마다 단조 증가하는 Tank.command_version
+- 장치 상태가 바뀔 때마다 버전을 올리고, 바뀐 DeviceControl 행에 그 버전을 기록
+- GET /monitoring/api/commands/<tank_id>/?since=<version> 는 since 이후 바뀐 장치만 응답
+"""
+
+from django.db import transaction
+from django.db.models import F
+
+from . import events
+from .models import Tank, DeviceControl
+
+
+def command_channel(tank_id) -> str:
+    return f"commands:{tank_id}"
+
+
+def bump_version(tank_id, device_ids) -> int:
+    """장치 변경 1회 = 버전 +1. 같은 트랜잭션 안에서 어항 행 잠금으로 직렬화."""
+    device_ids = list(device_ids)
+    if not device_ids:
+        return None
+
+    with transaction.atomic():
+        Tank.objects.filter(id=tank_id).update(command_version=F('command_version') + 1)
+        version = Tank.objects.filter(id=tank_id).values_list('command_version', flat=True).get()
+        DeviceControl.objects.filter(id__in=device_ids).update(version=version)
+
+    transaction.on_commit(
+        lambda: events.get_broker().publish(command_channel(tank_id), {'version': version})
+    )
+    return version
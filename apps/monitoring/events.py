@@ -0,0 +1,126 @@
+"""
+apps/monitoring/events.py
+
+대시보드 실시간 스트림용 pub/sub
+- 수신 API / 수동 제어가 publish → SSE 구독자(asyncio)에게 전달
+- 기본 LocalBroker 는 프로세스 내부 전용 (워커 1개 또는 개발 환경)
+- 다중 워커 배포 시 settings.MONITORING_EVENT_BROKER 로 외부 브로커 구현체 지정
+"""
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# ──────────────────────────────────────────────
+# 브로커
+# ──────────────────────────────────────────────
+
+class Subscription:
+    """채널 1개에 대한 구독 — async with / async for 로 사용"""
+
+    def __init__(self, broker, channel: str, maxsize: int = 100):
+        self.broker  = broker
+        self.channel = channel
+        self.loop    = None
+        self.queue   = None
+        self.maxsize = maxsize
+
+    async def __aenter__(self):
+        self.loop  = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self.broker._add(self)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.broker._remove(self)
+
+    async def get(self, timeout: float = None):
+        """다음 이벤트. timeout 초 동안 없으면 None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _deliver(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(f"[이벤트] 구독 큐 가득 참 — {self.channel} 이벤트 유실")
+
+
+class LocalBroker:
+    """프로세스 내 pub/sub. publish 는 어느 스레드에서 호출해도 안전."""
+
+    def __init__(self):
+        self._lock        = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, channel: str) -> Subscription:
+        return Subscription(self, channel)
+
+    def publish(self, channel: str, event: dict):
+        with self._lock:
+            subs = list(self._subscribers.get(channel, ()))
+        for sub in subs:
+            sub.loop.call_soon_threadsafe(sub._deliver, event)
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+    def _add(self, sub: Subscription):
+        with self._lock:
+            self._subscribers[sub.channel].add(sub)
+
+    def _remove(self, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(sub.channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.channel]
+
+
+_broker      = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path    = getattr(settings, 'MONITORING_EVENT_BROKER', 'monitoring.events.LocalBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+# ──────────────────────────────────────────────
+# 발행 헬퍼
+# ──────────────────────────────────────────────
+
+def tank_channel(tank_id) -> str:
+    return f"tank:{tank_id}"
+
+
+def publish(tank_id, event_type: str, data: dict):
+    """트랜잭션 커밋 후 어항 채널로 발행 (롤백된 변경은 나가지 않음)"""
+    event = {'type': event_type, 'data': data}
+    transaction.on_commit(lambda: get_broker().publish(tank_channel(tank_id), event))
+
+
+def publish_log(log):
+    """EventLog 1건 → 대시보드 'log' 이벤트 (bulk_create 처럼 post_save 가 없는 경로에서도 호출)"""
+    publish(log.tank_id, 'log', {
+        'level':      log.level,
+        'message':    log.message,
+        'created_at': log.created_at,
+    })
@@ -0,0 +1,139 @@
+"""
+apps/monitoring/exports.py
+
+히스토리 테이블 스트리밍 내보내기 (CSV / NDJSON)
+- .values_list().iterator(chunk_size) 로 행을 청크 단위로 읽음
+  (PostgreSQL 은 서버 사이드 커서) → 기간이 길어도 메모리 사용량 일정
+- 뷰는 StreamingHttpResponse 로 한 줄씩 흘려보냄
+- 아카이브(archive)로 옮겨진 월도 같은 형태로 이어서 읽음
+"""
+
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import archive
+from .models import SensorReading, FishBehavior, FeedingEvent, GrowthRecord, EventLog, time_field
+
+
+# 내보내기 종류 → 모델
+EXPORT_MODELS = {
+    'readings':  SensorReading,
+    'behaviors': FishBehavior,
+    'feedings':  FeedingEvent,
+    'growth':    GrowthRecord,
+    'logs':      EventLog,
+}
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+CHUNK_SIZE = 2000
+
+
+class ExportError(ValueError):
+    """잘못된 내보내기 파라미터"""
+
+
+# ──────────────────────────────────────────────
+# 파라미터 해석
+# ──────────────────────────────────────────────
+
+def export_fields(model) -> list:
+    """내보낼 수 있는 필드 (tank 외래키 제외, 정의 순서)"""
+    return [
+        f.name for f in model._meta.concrete_fields
+        if not f.is_relation
+    ]
+
+
+def parse_fields(model, value: str = None) -> list:
+    allowed = export_fields(model)
+    if not value:
+        return allowed
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ExportError(f"알 수 없는 필드: {', '.join(unknown)} (가능: {', '.join(allowed)})")
+    return fields
+
+
+def parse_bound(value: str = None, end: bool = False):
+    """'2024-05-01' 또는 ISO datetime. 날짜만 주면 end 는 그날 끝(다음날 0시, 미포함)."""
+    if not value:
+        return None
+    # 형식은 맞지만 없는 날짜·시각(2024-02-30, T25:00)은 parse_* 가 ValueError
+    try:
+        dt = parse_datetime(value)
+        d  = parse_date(value) if dt is None else None
+    except ValueError as e:
+        raise ExportError(f"존재하지 않는 날짜/시각입니다: {value}") from e
+    if dt is None:
+        if d is None:
+            raise ExportError(f"날짜 형식이 아닙니다: {value}")
+        dt = datetime.combine(d + timedelta(days=1) if end else d, time.min)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+# ──────────────────────────────────────────────
+# 행 스트림
+# ──────────────────────────────────────────────
+
+def iter_rows(model, tank, fields: list, start=None, end=None, chunk_size: int = CHUNK_SIZE):
+    """[start, end) 구간 행을 오래된 순으로 튜플 단위 반환 (아카이브된 월 → 원본 테이블 순)
+    구간·정렬은 모델의 기준 시각 (측정 시각이 있으면 measured_at)"""
+    for kind, archived_model in archive.ARCHIVE_MODELS.items():
+        if archived_model is model:
+            yield from archive.iter_rows(kind, tank, fields, start, end)
+
+    at = time_field(model)
+    qs = model.objects.filter(tank=tank)
+    if start is not None:
+        qs = qs.filter(**{f'{at}__gte': start})
+    if end is not None:
+        qs = qs.filter(**{f'{at}__lt': end})
+    yield from qs.order_by(at, 'id').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """csv.writer 가 쓴 한 줄을 그대로 돌려주는 버퍼"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def stream_csv(fields: list, rows):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'   # BOM — 엑셀 한글 깨짐 방지
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_csv_value(v) for v in row])
+
+
+def stream_ndjson(fields: list, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def stream(fmt: str, fields: list, rows):
+    if fmt == 'ndjson':
+        return stream_ndjson(fields, rows)
+    return stream_csv(fields, rows)
+
+
+CONTENT_TYPES = {
+    'csv':    'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
@@ -0,0 +1,92 @@
+"""
+apps/monitoring/idempotency.py
+
+수신 API 멱등성
+- 레코드마다 선택적으로 seq(게이트웨이별 증가 번호) 또는 idempotency_key 를 붙여 보냄
+  (단건 요청은 Idempotency-Key 헤더도 가능)
+- 게이트웨이: 게이트웨이 키로 인증했으면 그 키, 아니면 gateway_id 필드 / X-Gateway-ID 헤더
+  · 셋 다 없으면(공용 PI_API_KEY · 인증 없음) seq 키는 어항별로 — seq 는 게이트웨이마다 세므로 어항끼리 겹칠 수 있음
+- 처리 결과는 원본 행과 같은 트랜잭션으로 IngestReceipt 에 기록, (게이트웨이, 종류, 키) 유니크 인덱스
+- 재전송은 인덱스 조회 1번으로 처음 응답을 그대로 돌려줌 — 원본·로그·롤업·자동 제어 모두 다시 일어나지 않음
+- 동시에 같은 키가 들어오면 늦은 쪽이 유니크 위반으로 롤백되고 먼저 저장된 응답을 돌려줌
+- 오래된 영수증 정리: python manage.py purge_ingest_receipts
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import IngestReceipt
+
+
+def gateway(request, data=None) -> str:
+    credential = getattr(request, 'credential', None)
+    if credential is not None and credential.key_id is not None:
+        return f"key:{credential.key_id}"
+    gateway_id = (data.get('gateway_id') if isinstance(data, dict) else None) or request.headers.get('X-Gateway-ID')
+    return f"gw:{gateway_id}"[:64] if gateway_id else ''
+
+
+def record_key(record, header: str = None):
+    """레코드 1건의 멱등 키 (없으면 None)"""
+    if isinstance(record, dict):
+        if record.get('seq') is not None:
+            return f"seq:{record['seq']}"[:100]
+        if record.get('idempotency_key'):
+            return f"key:{record['idempotency_key']}"[:100]
+    if header:
+        return f"key:{header}"[:100]
+    return None
+
+
+def for_tank(key, tank_id):
+    """게이트웨이를 알 수 없을 때 seq 키에 어항을 붙임 (다른 키는 그대로)"""
+    if key is None or not key.startswith('seq:'):
+        return key
+    return f"tank:{tank_id}:{key}"[:100]
+
+
+class Key:
+    """단건 요청의 멱등 키. 키가 없으면 모든 메서드가 아무 일도 하지 않음."""
+
+    __slots__ = ('gateway', 'kind', 'key')
+
+    def __init__(self, request, kind: str, data: dict):
+        self.gateway = gateway(request, data)
+        self.kind    = kind
+        self.key     = record_key(data, request.headers.get('Idempotency-Key'))
+        if not self.gateway and isinstance(data, dict):
+            self.key = for_tank(self.key, data.get('tank_id'))
+
+    def lookup(self):
+        """처음 응답 또는 None"""
+        if self.key is None:
+            return None
+        return lookup_many(self.gateway, self.kind, [self.key]).get(self.key)
+
+    def remember(self, response: dict):
+        """처리 결과 기록 — 원본 행과 같은 트랜잭션 안에서 호출"""
+        if self.key is not None:
+            IngestReceipt.objects.create(gateway=self.gateway, kind=self.kind, key=self.key, response=response)
+
+
+def lookup_many(gateway: str, kind: str, keys) -> dict:
+    """{키: 처음 응답} — 쿼리 1회"""
+    keys = [k for k in keys if k is not None]
+    if not keys:
+        return {}
+    return dict(IngestReceipt.objects.filter(gateway=gateway, kind=kind, key__in=keys).values_list('key', 'response'))
+
+
+def remember_many(gateway: str, kind: str, items):
+    """[(키, 응답), ...] → INSERT 1회"""
+    IngestReceipt.objects.bulk_create([
+        IngestReceipt(gateway=gateway, kind=kind, key=key, response=response)
+        for key, response in items if key is not None
+    ])
+
+
+def purge(days: int) -> int:
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = IngestReceipt.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,410 @@
+"""
+apps/monitoring/jobs.py
+
+수신 후처리 작업 큐
+- 수신 API 는 원본 행 + IngestJob 1행만 같은 트랜잭션으로 저장하고 바로 응답
+- 자동 제어 · 이벤트 로그 · 롤업 · TankState 스냅샷 갱신은 작업으로 처리
+- 어항별 순서 보장: 어항의 가장 오래된 미완료 작업(선두)만 가져감
+  · 선두가 처리 중이거나 재시도 대기 중이면 그 어항의 뒤 작업도 대기
+  · 가져가기는 (상태, 시도 횟수) 조건부 UPDATE 1회 → 여러 워커/프로세스가 같은 작업을 중복 처리하지 않음
+- 실패 시 지수 백오프로 재시도, MONITORING_JOBS['MAX_ATTEMPTS'] 회 실패하면 FAILED 로 남김
+- 작업 효과와 작업 행 삭제는 한 트랜잭션 → 성공한 작업은 한 번만 반영
+- 어항의 작업 묶음을 처리한 뒤 챗봇용 요약 블록(context)을 한 번 갱신
+- 처리 주체는 settings.MONITORING_JOB_QUEUE
+  · LocalQueue    : 웹 프로세스 안 스레드 풀 (기본) — 시작 시·주기적으로 due_tanks() 를 훑어 남은 작업 복구
+  · InlineQueue   : 커밋 직후 요청 스레드에서 바로 처리 (개발용)
+  · DatabaseQueue : 웹 프로세스는 쌓기만, python manage.py run_ingest_jobs 워커가 처리
+- 지표: metrics() → 대기 건수(depth) · 가장 오래된 대기 작업 나이(lag) · 실패 건수
+"""
+
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import control, rollups, tank_cache
+from . import context as tank_context
+from . import state as tank_state
+from .models import Tank, IngestJob, SensorReading, FishBehavior, FeedingEvent, ActivityPattern, EventLog
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_OPTIONS = {
+    'WORKERS':      4,     # LocalQueue 스레드 수
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF':      2,     # 초, 재시도 대기 = BACKOFF × 2^(시도 횟수 - 1)
+    'BACKOFF_MAX':  300,
+    'LEASE':        300,   # 초, 처리 중 작업의 임대 시간 (프로세스가 죽으면 이후 다시 가져감)
+    'SWEEP':        30,    # 초, LocalQueue 가 due_tanks() 를 다시 훑는 주기
+}
+
+
+def option(name: str):
+    return {**DEFAULT_OPTIONS, **getattr(settings, 'MONITORING_JOBS', {})}[name]
+
+
+# ──────────────────────────────────────────────
+# 작업 종류
+# ──────────────────────────────────────────────
+
+HANDLERS = {}
+
+
+def handler(kind: str):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+@handler('sensor')
+def _process_sensor(tank: Tank, payload: dict):
+    """
+    측정값(들) → 롤업(측정 시각 구간에 증분 합산), 측정 시각이 가장 늦은 값으로 자동 제어 + 스냅샷.
+    장애 후 재전송처럼 스냅샷보다 오래된 측정값만 왔으면 롤업만 반영 — 지난 값으로 장치를 움직이지 않음.
+    """
+    readings = list(SensorReading.objects.filter(id__in=payload['reading_ids']))
+    if not readings:
+        return
+    rollups.apply_readings(readings)
+    newest = max(readings, key=lambda r: (r.measured_at, r.id))
+    if not tank_state.is_newer(tank, 'reading_at', newest.measured_at):
+        return
+    actions = control.apply(tank, newest)
+    tank_state.apply_reading(tank, newest, devices_changed=bool(actions))
+
+
+@handler('behavior')
+def _process_behavior(tank: Tank, payload: dict):
+    behavior = FishBehavior.objects.get(id=payload['behavior_id'])
+    if behavior.is_anomaly:
+        EventLog.objects.create(
+            tank=tank, level='WARNING',
+            message=f"[AI 이상 감지] {behavior.note or '상세 내용 없음'}"
+        )
+    if behavior.feeding_score < 30:
+        EventLog.objects.create(
+            tank=tank, level='WARNING',
+            message=f"[FRS 저조] {behavior.feeding_score}점 — 어류 상태 확인 권장"
+        )
+    if tank_state.is_newer(tank, 'behavior_at', behavior.measured_at):
+        tank_state.apply_behavior(tank, behavior)
+
+
+@handler('feeding')
+def _process_feeding(tank: Tank, payload: dict):
+    feeding   = FeedingEvent.objects.select_related('response').get(id=payload['feeding_id'])
+    frs_score = feeding.response.frs_score
+    if feeding.is_overfeeding:
+        EventLog.objects.create(
+            tank=tank, level='WARNING',
+            message=f"[과급여] ΔNTU={feeding.delta_ntu} — 다음 급이량 조정 필요"
+        )
+    if frs_score < 40:
+        EventLog.objects.create(
+            tank=tank, level='WARNING',
+            message=f"[FRS 저조] 급이 반응 {frs_score}점 — 건강 상태 확인"
+        )
+    if tank_state.is_newer(tank, 'last_feeding_at', feeding.measured_at):
+        tank_state.apply_feeding(tank, feeding, frs_score)
+
+
+@handler('pattern')
+def _process_pattern(tank: Tank, payload: dict):
+    pattern = ActivityPattern.objects.get(id=payload['pattern_id'])
+    if pattern.has_anomaly:
+        EventLog.objects.create(
+            tank=tank, level='WARNING',
+            message=f"[패턴 이상] 이상 시간대: {pattern.anomaly_hours} — 편차 {pattern.deviation_ratio:.0%}"
+        )
+
+
+@handler('growth')
+def _process_growth(tank: Tank, payload: dict):
+    """후처리 없음 — drain() 끝의 요약 블록 갱신에 성장 단계를 반영하기 위한 작업"""
+
+
+# ──────────────────────────────────────────────
+# 등록
+# ──────────────────────────────────────────────
+
+def enqueue(tank_id, kind: str, payload: dict) -> IngestJob:
+    """작업 1건 등록. 호출한 트랜잭션이 커밋된 뒤에 큐에 알림."""
+    return enqueue_many([(tank_id, kind, payload)])[0]
+
+
+def enqueue_many(items) -> list:
+    """[(tank_id, kind, payload), ...] → INSERT 1회"""
+    now     = timezone.now()
+    created = IngestJob.objects.bulk_create([
+        IngestJob(tank_id=tank_id, kind=kind, payload=payload, available_at=now, created_at=now)
+        for tank_id, kind, payload in items
+    ])
+    tank_ids = list(dict.fromkeys(job.tank_id for job in created))
+    transaction.on_commit(lambda: _notify(tank_ids))
+    return created
+
+
+def _notify(tank_ids):
+    q = get_queue()
+    for tank_id in tank_ids:
+        q.notify(tank_id)
+
+
+# ──────────────────────────────────────────────
+# 처리
+# ──────────────────────────────────────────────
+
+def _backoff(attempts: int) -> float:
+    return min(option('BACKOFF') * 2 ** (attempts - 1), option('BACKOFF_MAX'))
+
+
+def claim(tank_id):
+    """
+    어항의 선두 작업을 가져감.
+    반환: (작업, None) / (None, 다시 시도할 시각) / (None, None) 처리할 작업 없음
+    """
+    now  = timezone.now()
+    head = (IngestJob.objects.filter(tank_id=tank_id).exclude(status='FAILED')
+            .order_by('id').only('id', 'tank_id', 'status', 'attempts', 'available_at', 'locked_until').first())
+    if head is None:
+        return None, None
+    if head.status == 'RUNNING' and head.locked_until and head.locked_until > now:
+        return None, head.locked_until
+    if head.available_at > now:
+        return None, head.available_at
+
+    claimed = IngestJob.objects.filter(id=head.id, status=head.status, attempts=head.attempts).update(
+        status='RUNNING', attempts=F('attempts') + 1,
+        locked_until=now + timedelta(seconds=option('LEASE')),
+    )
+    if not claimed:
+        # 다른 워커가 먼저 가져감
+        return None, None
+    job      = IngestJob.objects.get(id=head.id)
+    job.tank = tank_cache.get(job.tank_id)
+    return job, None
+
+
+def run(job: IngestJob) -> bool:
+    """작업 1건 실행. 성공하면 삭제, 실패하면 재시도 예약 또는 FAILED."""
+    started = time.monotonic()
+    try:
+        with transaction.atomic():
+            HANDLERS[job.kind](job.tank, job.payload)
+            IngestJob.objects.filter(id=job.id).delete()
+    except Exception as e:
+        failed = job.attempts >= option('MAX_ATTEMPTS')
+        logger.exception(f"[작업] {job.kind} #{job.id} 실패 ({job.attempts}회) — {'포기' if failed else '재시도 예약'}")
+        IngestJob.objects.filter(id=job.id).update(
+            status='FAILED' if failed else 'PENDING', locked_until=None,
+            available_at=timezone.now() + timedelta(seconds=_backoff(job.attempts)),
+            last_error=f"{type(e).__name__}: {e}"[:2000],
+        )
+        _count('failed' if failed else 'retried')
+        return False
+
+    _count('processed', time.monotonic() - started, (timezone.now() - job.created_at).total_seconds())
+    return True
+
+
+def _refresh_context(tank_id):
+    try:
+        tank_context.refresh(tank_cache.get(tank_id))
+    except Exception:
+        logger.exception(f"[작업] tank={tank_id} 요약 블록 갱신 실패")
+
+
+def drain(tank_id, limit: int = None):
+    """
+    어항의 작업을 순서대로 처리하고, 하나라도 처리했으면 요약 블록 갱신.
+    반환: (처리 건수, 다시 시도할 시각 또는 None)
+    """
+    done, retry_at = 0, None
+    while limit is None or done < limit:
+        job, retry_at = claim(tank_id)
+        if job is None:
+            break
+        run(job)
+        done += 1
+    if done:
+        _refresh_context(tank_id)
+    return done, retry_at
+
+
+def due_tanks() -> list:
+    """지금 처리할 작업이 있는 어항 (임대가 만료된 처리 중 작업 포함)"""
+    now = timezone.now()
+    return list(
+        IngestJob.objects.filter(
+            Q(status='PENDING', available_at__lte=now) | Q(status='RUNNING', locked_until__lte=now)
+        ).order_by('tank_id').values_list('tank_id', flat=True).distinct()
+    )
+
+
+def run_pending(limit: int = None) -> int:
+    """지금 처리할 수 있는 작업 전체를 현재 스레드에서 처리 (워커 명령 · 테스트용)"""
+    total = 0
+    for tank_id in due_tanks():
+        done, _ = drain(tank_id, limit)
+        total  += done
+    return total
+
+
+# ──────────────────────────────────────────────
+# 큐 구현
+# ──────────────────────────────────────────────
+
+class InlineQueue:
+    """커밋 직후 요청 스레드에서 바로 처리 — 단일 프로세스 개발 환경용"""
+
+    def notify(self, tank_id):
+        drain(tank_id)
+
+
+class DatabaseQueue:
+    """웹 프로세스는 작업만 쌓음. python manage.py run_ingest_jobs 가 처리."""
+
+    def notify(self, tank_id):
+        pass
+
+
+class LocalQueue:
+    """
+    프로세스 내 스레드 풀. 어항 id 로 스레드를 고정해 같은 어항은 항상 같은 스레드가 처리.
+    재시도 대기 중인 어항은 타이머로 다시 깨움.
+    시작할 때와 SWEEP 초마다 due_tanks() 를 훑어 알림 없이 남은 작업도 처리
+    (재시작 전에 쌓인 작업, 임대가 만료된 처리 중 작업, 프로세스와 함께 사라진 재시도 타이머, 처리 루프 오류).
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or option('WORKERS')
+        self._queues = [queue.Queue() for _ in range(self.workers)]
+        self._lock   = threading.Lock()
+        self._timers = {}
+        for idx, q in enumerate(self._queues):
+            threading.Thread(target=self._loop, args=(q,), name=f"ingest-jobs-{idx}", daemon=True).start()
+        threading.Thread(target=self._sweep_loop, name="ingest-jobs-sweep", daemon=True).start()
+
+    def notify(self, tank_id):
+        self._queues[tank_id % self.workers].put(tank_id)
+
+    def sweep(self) -> list:
+        """지금 처리할 작업이 있는 어항을 모두 깨움 (가져가기는 조건부 UPDATE 라 다른 프로세스와 겹쳐도 안전)"""
+        tank_ids = due_tanks()
+        for tank_id in tank_ids:
+            self.notify(tank_id)
+        return tank_ids
+
+    def _sweep_loop(self):
+        while True:
+            close_old_connections()
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("[작업] 대기 작업 확인 오류")
+            finally:
+                close_old_connections()
+            time.sleep(option('SWEEP'))
+
+    def backlog(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def _schedule(self, tank_id, at):
+        delay = max((at - timezone.now()).total_seconds(), 0.0)
+        with self._lock:
+            if tank_id in self._timers:
+                return
+            timer = threading.Timer(delay, self._wake, args=(tank_id,))
+            timer.daemon = True
+            self._timers[tank_id] = timer
+        timer.start()
+
+    def _wake(self, tank_id):
+        with self._lock:
+            self._timers.pop(tank_id, None)
+        self.notify(tank_id)
+
+    def _loop(self, q: queue.Queue):
+        while True:
+            tank_id = q.get()
+            close_old_connections()
+            try:
+                _, retry_at = drain(tank_id)
+                if retry_at is not None:
+                    self._schedule(tank_id, retry_at)
+            except Exception:
+                logger.exception(f"[작업] tank={tank_id} 처리 루프 오류")
+            finally:
+                close_old_connections()
+
+
+_queue      = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                path   = getattr(settings, 'MONITORING_JOB_QUEUE', 'monitoring.jobs.LocalQueue')
+                _queue = import_string(path)()
+    return _queue
+
+
+def start():
+    """웹 서버 프로세스 시작 시(fish.wsgi / fish.asgi) 큐를 바로 만듦 — 첫 수신을 기다리지 않고 남은 작업 처리 시작"""
+    return get_queue()
+
+
+# ──────────────────────────────────────────────
+# 지표
+# ──────────────────────────────────────────────
+
+_stats      = {'processed': 0, 'retried': 0, 'failed': 0, 'run_seconds': 0.0, 'lag_seconds': 0.0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, run_seconds: float = 0.0, lag_seconds: float = 0.0):
+    with _stats_lock:
+        _stats[key] += 1
+        _stats['run_seconds'] += run_seconds
+        _stats['lag_seconds'] += lag_seconds
+
+
+def metrics() -> dict:
+    """
+    큐 상태. depth/running/failed/lag_seconds 는 DB 기준(전체 프로세스),
+    process 는 이 프로세스가 처리한 누적 건수와 평균 처리 시간·대기 시간.
+    """
+    row = IngestJob.objects.order_by().aggregate(
+        depth=Count('id', filter=Q(status='PENDING')),
+        running=Count('id', filter=Q(status='RUNNING')),
+        failed=Count('id', filter=Q(status='FAILED')),
+        oldest=Min('created_at', filter=~Q(status='FAILED')),
+    )
+    oldest = row.pop('oldest')
+    row['lag_seconds'] = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    by_kind = IngestJob.objects.filter(status='PENDING').order_by().values('kind').annotate(n=Count('id'))
+    row['depth_by_kind'] = {r['kind']: r['n'] for r in by_kind}
+
+    with _stats_lock:
+        stats = dict(_stats)
+    processed = stats['processed']
+    row['process'] = {
+        'processed':       processed,
+        'retried':         stats['retried'],
+        'failed':          stats['failed'],
+        'avg_run_ms':      round(stats['run_seconds'] / processed * 1000, 2) if processed else 0.0,
+        'avg_lag_seconds': round(stats['lag_seconds'] / processed, 3) if processed else 0.0,
+    }
+    return row
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from monitoring import archive
+
+
+class Command(BaseCommand):
+    help = "오래된 센서/행동 히스토리를 어항·월 단위 Parquet 파일로 옮기고 원본 테이블에서 삭제합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.MONITORING_ARCHIVE_AFTER_DAYS,
+                            help="이 일수보다 오래전에 끝난 월만 아카이브 (기본: MONITORING_ARCHIVE_AFTER_DAYS)")
+        parser.add_argument('--kind', choices=sorted(archive.ARCHIVE_MODELS), action='append', dest='kinds',
+                            help="대상 종류 (기본: 전체, 여러 번 지정 가능)")
+        parser.add_argument('--tank', type=int, action='append', dest='tank_ids', help="특정 어항만 (여러 번 지정 가능)")
+        parser.add_argument('--dry-run', action='store_true', help="대상 월만 출력")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        kinds  = options['kinds'] or list(archive.ARCHIVE_MODELS)
+
+        total = 0
+        for kind in kinds:
+            for tank_id, month in archive.pending_months(kind, cutoff, options['tank_ids']):
+                if options['dry_run']:
+                    self.stdout.write(f"- {kind} tank={tank_id} {month:%Y-%m}")
+                    continue
+                segment = archive.archive_month(kind, tank_id, month)
+                total  += 1
+                self.stdout.write(f"- {segment.path}: {segment.row_count}행, {segment.size:,} bytes")
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"✅ 아카이브 완료: {total}개 월"))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from monitoring import rollups
+
+
+class Command(BaseCommand):
+    help = "SensorReading 원본으로 분/시/일 롤업(SensorRollup)을 백필·재계산합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help="최근 N일만 재계산 (기본: 전체 기간)")
+        parser.add_argument('--tank', type=int, action='append', dest='tank_ids', help="특정 어항만 재계산 (여러 번 지정 가능)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = None
+        if options['days'] is not None:
+            start = timezone.now() - timedelta(days=options['days'])
+
+        count = rollups.rebuild(start=start, tank_ids=options['tank_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ 롤업 재계산 완료: {count}개 구간"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import auth
+from monitoring.models import Tank
+
+
+class Command(BaseCommand):
+    help = "Pi 게이트웨이용 API Key 를 발급합니다. 원문 키는 이때 한 번만 출력됩니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help="게이트웨이 이름")
+        parser.add_argument('--tank', type=int, action='append', dest='tank_ids', required=True,
+                            help="이 키로 접근할 어항 (여러 번 지정 가능)")
+
+    def handle(self, *args, **options):
+        tanks   = Tank.objects.filter(id__in=options['tank_ids'])
+        missing = set(options['tank_ids']) - set(tanks.values_list('id', flat=True))
+        if missing:
+            raise CommandError(f"없는 어항: {', '.join(map(str, sorted(missing)))}")
+
+        key, raw = auth.create_key(options['name'], tanks)
+        self.stdout.write(f"- 이름: {key.name}")
+        self.stdout.write(f"- 어항: {', '.join(map(str, sorted(options['tank_ids'])))}")
+        self.stdout.write(self.style.SUCCESS(f"✅ API Key: {raw}"))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from monitoring import partitions
+
+
+class Command(BaseCommand):
+    help = ("센서/행동 히스토리 월 파티션을 미리 만들고, 보관 기간(MONITORING_RETENTION)이 지난 월을 삭제합니다. "
+            "삭제된 어항에 남은 히스토리도 정리합니다.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(partitions.PARTITIONED_MODELS), action='append', dest='kinds',
+                            help="대상 종류 (기본: 전체, 여러 번 지정 가능)")
+        parser.add_argument('--dry-run', action='store_true', help="삭제 대상만 출력")
+
+    def handle(self, *args, **options):
+        kinds   = options['kinds'] or list(partitions.PARTITIONED_MODELS)
+        dry_run = options['dry_run']
+
+        if not dry_run:
+            for name in partitions.ensure():
+                self.stdout.write(f"- 파티션 생성: {name}")
+
+        for kind in kinds:
+            days = partitions.retention_days(kind)
+            if days is not None:
+                result = partitions.expire(kind, timezone.now() - timedelta(days=days), dry_run=dry_run)
+                for name in result['partitions']:
+                    self.stdout.write(f"- {kind}: 파티션 삭제 {name}")
+                self.stdout.write(f"- {kind}: {days}일 지난 행 {result['rows']}건 삭제")
+            orphans = partitions.purge_orphans(kind, dry_run=dry_run)
+            self.stdout.write(f"- {kind}: 삭제된 어항의 행 {orphans}건 정리")
+
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS("✅ 보관 정책 적용 완료"))
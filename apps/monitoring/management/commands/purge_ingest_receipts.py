@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from monitoring import idempotency
+
+
+class Command(BaseCommand):
+    help = "재전송 판별용 수신 영수증(IngestReceipt) 중 오래된 것을 삭제합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.MONITORING_IDEMPOTENCY_DAYS,
+                            help="이 일수보다 오래된 영수증 삭제 (기본: MONITORING_IDEMPOTENCY_DAYS)")
+
+    def handle(self, *args, **options):
+        deleted = idempotency.purge(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"✅ 영수증 {deleted}건 삭제"))
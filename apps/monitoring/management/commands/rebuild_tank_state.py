@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from monitoring import context, state
+from monitoring.models import Tank
+
+
+class Command(BaseCommand):
+    help = "히스토리 테이블로부터 어항별 TankState 스냅샷(챗봇 요약 블록 포함)을 재구성합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tank', type=int, action='append', dest='tank_ids', help="특정 어항만 재구성 (여러 번 지정 가능)")
+        parser.add_argument('--missing', action='store_true',
+                            help="스냅샷이 없는 어항만 생성 (배포 시 — 운영 중인 스냅샷은 덮어쓰지 않음)")
+
+    def handle(self, *args, **options):
+        tanks = Tank.objects.all()
+        if options['tank_ids']:
+            tanks = tanks.filter(id__in=options['tank_ids'])
+        if options['missing']:
+            tanks = tanks.filter(state__isnull=True)
+
+        tanks = list(tanks)
+        count = state.rebuild(Tank.objects.filter(id__in=[t.id for t in tanks]), missing_only=options['missing'])
+        for tank in tanks:
+            context.refresh(tank)
+        self.stdout.write(self.style.SUCCESS(f"✅ TankState 재구성 완료: {count}개 어항"))
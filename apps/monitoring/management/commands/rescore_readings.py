@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from monitoring import rollups, scoring, standards, state
+from monitoring.models import SensorReading, Tank
+
+
+class Command(BaseCommand):
+    help = "저장된 센서 측정값의 수질 점수를 어항별 현재 기준으로 다시 계산합니다 (NumPy 일괄 채점)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tank', type=int, action='append', dest='tank_ids', help="특정 어항만 (여러 번 지정 가능)")
+        parser.add_argument('--chunk-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        tank_ids = options['tank_ids']
+        readings = SensorReading.objects.all()
+        tanks    = Tank.objects.all()
+        if tank_ids:
+            tanks = tanks.filter(id__in=tank_ids)
+
+        count = 0
+        for tank in tanks:
+            rules  = standards.for_tank(tank)
+            count += scoring.rescore(readings.filter(tank=tank), rules.standards, chunk_size=options['chunk_size'])
+        if count:
+            # 점수 롤업과 스냅샷도 새 점수로
+            rollups.rebuild(tank_ids=tank_ids)
+            state.rebuild(tanks)
+        self.stdout.write(self.style.SUCCESS(f"✅ 재채점 완료: {count}건 변경"))
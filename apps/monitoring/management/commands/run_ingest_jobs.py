@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from monitoring import jobs
+
+
+class Command(BaseCommand):
+    help = "수신 후처리 작업(IngestJob)을 처리합니다. MONITORING_JOB_QUEUE=DatabaseQueue 배포의 전용 워커."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="지금 처리할 수 있는 작업만 처리하고 종료")
+        parser.add_argument('--interval', type=float, default=1.0, help="대기 작업이 없을 때 재확인 주기(초)")
+        parser.add_argument('--stats', action='store_true', help="큐 지표만 출력")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in jobs.metrics().items():
+                self.stdout.write(f"- {key}: {value}")
+            return
+
+        if options['once']:
+            done = jobs.run_pending()
+            self.stdout.write(self.style.SUCCESS(f"✅ 처리 완료: {done}건"))
+            return
+
+        self.stdout.write(f"작업 워커 시작 (재확인 {options['interval']}초)")
+        while True:
+            close_old_connections()
+            if not jobs.run_pending():
+                time.sleep(options['interval'])
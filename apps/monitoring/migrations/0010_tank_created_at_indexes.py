@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0009_add_feeding_growth_activity_models'),
+    ]
+
+    operations = [
+        # 어항별 최신 데이터 조회용 (tank, -created_at) 복합 인덱스
+        migrations.AddIndex(
+            model_name='sensorreading',
+            index=models.Index(fields=['tank', '-created_at'], name='mon_reading_tank_created'),
+        ),
+        migrations.AddIndex(
+            model_name='fishbehavior',
+            index=models.Index(fields=['tank', '-created_at'], name='mon_behavior_tank_created'),
+        ),
+        migrations.AddIndex(
+            model_name='feedingevent',
+            index=models.Index(fields=['tank', '-created_at'], name='mon_feeding_tank_created'),
+        ),
+        migrations.AddIndex(
+            model_name='growthrecord',
+            index=models.Index(fields=['tank', '-created_at'], name='mon_growth_tank_created'),
+        ),
+        migrations.AddIndex(
+            model_name='activitypattern',
+            index=models.Index(fields=['tank', '-created_at'], name='mon_pattern_tank_created'),
+        ),
+        migrations.AddIndex(
+            model_name='eventlog',
+            index=models.Index(fields=['tank', '-created_at'], name='mon_eventlog_tank_created'),
+        ),
+    ]
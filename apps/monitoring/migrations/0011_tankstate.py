@@ -0,0 +1,40 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0010_tank_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TankState',
+            fields=[
+                ('tank', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='state', serialize=False, to='monitoring.tank')),
+                ('temperature',         models.FloatField(blank=True, null=True, help_text='수온(°C)')),
+                ('ph',                  models.FloatField(blank=True, null=True, help_text='pH')),
+                ('dissolved_oxygen',    models.FloatField(blank=True, null=True, help_text='용존산소량(mg/L)')),
+                ('turbidity',           models.FloatField(blank=True, null=True, help_text='탁도(NTU)')),
+                ('water_level',         models.FloatField(blank=True, null=True, help_text='수위(%)')),
+                ('water_quality_score', models.IntegerField(blank=True, null=True, help_text='수질 종합 점수(0~100)')),
+                ('reading_id',          models.BigIntegerField(blank=True, null=True)),
+                ('reading_at',          models.DateTimeField(blank=True, null=True)),
+                ('behavior_status',     models.CharField(blank=True, max_length=10, choices=[('EXCELLENT', '매우 좋음'), ('GOOD', '좋음'), ('NORMAL', '보통'), ('WARNING', '주의'), ('POOR', '나쁨')])),
+                ('fish_count',          models.IntegerField(default=0)),
+                ('activity_level',      models.FloatField(default=0.0)),
+                ('feeding_score',       models.IntegerField(default=0)),
+                ('is_anomaly',          models.BooleanField(default=False)),
+                ('behavior_note',       models.TextField(blank=True)),
+                ('behavior_at',         models.DateTimeField(blank=True, null=True)),
+                ('last_feeding_at',     models.DateTimeField(blank=True, null=True)),
+                ('last_frs_score',      models.IntegerField(blank=True, null=True)),
+                ('is_overfeeding',      models.BooleanField(default=False)),
+                ('device_states',       models.JSONField(default=dict, help_text='장치별 ON/OFF {type: is_on}')),
+                ('next_water_change',   models.DateField(blank=True, null=True, help_text='다음 환수 예정일')),
+                ('updated_at',          models.DateTimeField(auto_now=True)),
+            ],
+            options={'app_label': 'monitoring'},
+        ),
+    ]
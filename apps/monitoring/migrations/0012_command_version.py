@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0011_tankstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tank',
+            name='command_version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='devicecontrol',
+            name='version',
+            field=models.BigIntegerField(default=0, help_text='마지막으로 바뀐 시점의 Tank.command_version'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0012_command_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity',  models.CharField(max_length=10, choices=[('MINUTE', '1분'), ('HOUR', '1시간'), ('DAY', '1일')])),
+                ('bucket_start', models.DateTimeField(help_text='집계 구간 시작 시각 (TIME_ZONE 기준 정렬)')),
+                ('count',        models.IntegerField(default=0)),
+                ('temperature_min',         models.FloatField(null=True)),
+                ('temperature_max',         models.FloatField(null=True)),
+                ('temperature_sum',         models.FloatField(default=0.0)),
+                ('ph_min',                  models.FloatField(null=True)),
+                ('ph_max',                  models.FloatField(null=True)),
+                ('ph_sum',                  models.FloatField(default=0.0)),
+                ('dissolved_oxygen_min',    models.FloatField(null=True)),
+                ('dissolved_oxygen_max',    models.FloatField(null=True)),
+                ('dissolved_oxygen_sum',    models.FloatField(default=0.0)),
+                ('turbidity_min',           models.FloatField(null=True)),
+                ('turbidity_max',           models.FloatField(null=True)),
+                ('turbidity_sum',           models.FloatField(default=0.0)),
+                ('water_level_min',         models.FloatField(null=True)),
+                ('water_level_max',         models.FloatField(null=True)),
+                ('water_level_sum',         models.FloatField(default=0.0)),
+                ('water_quality_score_min', models.FloatField(null=True)),
+                ('water_quality_score_max', models.FloatField(null=True)),
+                ('water_quality_score_sum', models.FloatField(default=0.0)),
+                ('tank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='monitoring.tank')),
+            ],
+            options={'app_label': 'monitoring', 'ordering': ['-bucket_start']},
+        ),
+        migrations.AddConstraint(
+            model_name='sensorrollup',
+            constraint=models.UniqueConstraint(fields=['tank', 'granularity', 'bucket_start'], name='mon_rollup_unique_bucket'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0013_sensorrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind',      models.CharField(max_length=20, choices=[('readings', '센서 측정값'), ('behaviors', '행동 분석')])),
+                ('month',     models.DateField(help_text='대상 월의 1일 (TIME_ZONE 기준)')),
+                ('path',      models.CharField(max_length=500, help_text='MONITORING_ARCHIVE_DIR 기준 상대 경로')),
+                ('row_count', models.IntegerField(default=0)),
+                ('size',      models.BigIntegerField(default=0, help_text='파일 크기(byte)')),
+                ('first_at',  models.DateTimeField(null=True)),
+                ('last_at',   models.DateTimeField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_segments', to='monitoring.tank')),
+            ],
+            options={'app_label': 'monitoring', 'ordering': ['tank', 'kind', 'month']},
+        ),
+        migrations.AddConstraint(
+            model_name='archivesegment',
+            constraint=models.UniqueConstraint(fields=['tank', 'kind', 'month'], name='mon_archive_unique_month'),
+        ),
+    ]
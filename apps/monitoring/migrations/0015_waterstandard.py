@@ -0,0 +1,39 @@
+# Generated by Django 5.1 on 2026-10-17 18:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0014_archivesegment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaterStandard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('species', models.CharField(blank=True, help_text='어종명 — Tank.fish_species 와 대소문자 무시 일치', max_length=100, null=True, unique=True)),
+                ('temp_min', models.FloatField(blank=True, help_text='수온 하한(°C)', null=True)),
+                ('temp_max', models.FloatField(blank=True, help_text='수온 상한(°C)', null=True)),
+                ('temp_optimal', models.FloatField(blank=True, help_text='최적 수온(°C)', null=True)),
+                ('ph_min', models.FloatField(blank=True, null=True)),
+                ('ph_max', models.FloatField(blank=True, null=True)),
+                ('ph_optimal_lo', models.FloatField(blank=True, null=True)),
+                ('ph_optimal_hi', models.FloatField(blank=True, null=True)),
+                ('do_min', models.FloatField(blank=True, help_text='DO 하한(mg/L)', null=True)),
+                ('do_danger', models.FloatField(blank=True, help_text='DO 위험(mg/L)', null=True)),
+                ('turbidity_max', models.FloatField(blank=True, help_text='탁도 상한(NTU)', null=True)),
+                ('turbidity_ok', models.FloatField(blank=True, help_text='탁도 정상(NTU)', null=True)),
+                ('turbidity_warn', models.FloatField(blank=True, help_text='탁도 경고(NTU)', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tank', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='water_standard', to='monitoring.tank')),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('species__isnull', False), ('tank__isnull', True)), models.Q(('species__isnull', True), ('tank__isnull', False)), _connector='OR'), name='mon_waterstandard_species_xor_tank')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0015_waterstandard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind',         models.CharField(max_length=20)),
+                ('payload',      models.JSONField(default=dict)),
+                ('status',       models.CharField(max_length=10, default='PENDING',
+                                                  choices=[('PENDING', '대기'), ('RUNNING', '처리 중'), ('FAILED', '실패')])),
+                ('attempts',     models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(help_text='이 시각 이후 처리 (재시도 대기)')),
+                ('locked_until', models.DateTimeField(null=True, blank=True, help_text='처리 중 임대 만료 시각')),
+                ('last_error',   models.TextField(blank=True)),
+                ('created_at',   models.DateTimeField()),
+                ('tank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingest_jobs', to='monitoring.tank')),
+            ],
+            options={'app_label': 'monitoring', 'ordering': ['id']},
+        ),
+        migrations.AddIndex(
+            model_name='ingestjob',
+            index=models.Index(fields=['tank', 'id'], name='mon_job_tank_id'),
+        ),
+        migrations.AddIndex(
+            model_name='ingestjob',
+            index=models.Index(fields=['status', 'available_at'], name='mon_job_status_available'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0016_ingestjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GatewayKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name',         models.CharField(max_length=100)),
+                ('prefix',       models.CharField(max_length=16, unique=True)),
+                ('key_hash',     models.CharField(max_length=64)),
+                ('is_active',    models.BooleanField(default=True, help_text='끄면 폐기 (MONITORING_API_KEY_TTL 초 안에 모든 워커 반영)')),
+                ('last_used_at', models.DateTimeField(null=True, blank=True)),
+                ('created_at',   models.DateTimeField(auto_now_add=True)),
+                ('tanks', models.ManyToManyField(blank=True, related_name='gateway_keys', to='monitoring.tank',
+                                                 help_text='이 키로 데이터를 보내고 명령을 받을 수 있는 어항')),
+            ],
+            options={'app_label': 'monitoring', 'ordering': ['name']},
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0017_gatewaykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gateway',    models.CharField(max_length=64, help_text='key:<GatewayKey id> 또는 gw:<gateway_id>')),
+                ('kind',       models.CharField(max_length=20)),
+                ('key',        models.CharField(max_length=100, help_text='seq:<번호> 또는 key:<idempotency_key>')),
+                ('response',   models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={'app_label': 'monitoring'},
+        ),
+        migrations.AddConstraint(
+            model_name='ingestreceipt',
+            constraint=models.UniqueConstraint(fields=['gateway', 'kind', 'key'], name='mon_receipt_unique_key'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+# 게이트웨이 측정 시각을 받는 시계열 모델 → 인덱스 이름 접두사
+MODELS = {
+    'sensorreading': 'reading',
+    'fishbehavior':  'behavior',
+    'feedingevent':  'feeding',
+    'growthrecord':  'growth',
+}
+
+
+def backfill_measured_at(apps, schema_editor):
+    """기존 행은 수신 시각을 측정 시각으로"""
+    for name in MODELS:
+        apps.get_model('monitoring', name).objects.update(measured_at=F('created_at'))
+
+
+def _operations():
+    ops = [
+        migrations.AddField(model_name=name, name='measured_at', field=models.DateTimeField(null=True))
+        for name in MODELS
+    ]
+    ops.append(migrations.RunPython(backfill_measured_at, migrations.RunPython.noop))
+    for name, short in MODELS.items():
+        ops += [
+            migrations.AlterField(
+                model_name=name,
+                name='measured_at',
+                field=models.DateTimeField(default=django.utils.timezone.now,
+                                           help_text='측정 시각 (게이트웨이 기준, 생략 시 수신 시각)'),
+            ),
+            migrations.AlterField(
+                model_name=name,
+                name='created_at',
+                field=models.DateTimeField(auto_now_add=True, help_text='서버 수신 시각'),
+            ),
+            migrations.AlterModelOptions(
+                name=name,
+                options={'ordering': ['-measured_at'], 'get_latest_by': 'measured_at'},
+            ),
+            migrations.RemoveIndex(model_name=name, name=f'mon_{short}_tank_created'),
+            migrations.AddIndex(
+                model_name=name,
+                index=models.Index(fields=['tank', '-measured_at'], name=f'mon_{short}_tank_measured'),
+            ),
+        ]
+    return ops
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0018_ingestreceipt'),
+    ]
+
+    operations = _operations()
@@ -0,0 +1,98 @@
+from datetime import date, datetime, time, timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# measured_at 월 RANGE 파티션으로 바꾸는 테이블 (PostgreSQL 전용, 그 외 DB 는 그대로)
+TABLES = ['monitoring_sensorreading', 'monitoring_fishbehavior']
+
+# 전환 시 현재 월 이후로 미리 만들어 둘 파티션 수 (이후는 enforce_retention 이 유지)
+PREMAKE = 2
+
+
+def _month_starts(first, last):
+    month = date(first.year, first.month, 1)
+    while month <= last:
+        nxt = date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+        yield month, nxt
+        month = nxt
+
+
+def _aware(d: date):
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+
+def _rebuild(cursor, qn, table: str, partitioned: bool):
+    """테이블을 같은 컬럼의 (파티션 / 일반) 테이블로 다시 만들고 행·인덱스·id 시퀀스를 옮김"""
+    old = f'{table}_old'
+    cursor.execute("SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s", [table, f'{table}_pkey'])
+    indexes = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+    cursor.execute(f"ALTER TABLE {qn(old)} RENAME CONSTRAINT {qn(table + '_pkey')} TO {qn(old + '_pkey')}")
+    if partitioned:
+        # 파티션 키는 기본 키에 포함되어야 함 → (id, measured_at)
+        cursor.execute(f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+                       f"PARTITION BY RANGE (measured_at)")
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_pkey')} PRIMARY KEY (id, measured_at)")
+        cursor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+
+        cursor.execute(f"SELECT MIN(measured_at) FROM {qn(old)}")
+        first = timezone.localtime(cursor.fetchone()[0] or timezone.now())
+        last  = timezone.localtime(timezone.now() + timedelta(days=31 * PREMAKE))
+        for month, nxt in _month_starts(first, last.date()):
+            cursor.execute(f"CREATE TABLE {qn(f'{table}_p{month:%Y%m}')} PARTITION OF {qn(table)} "
+                           f"FOR VALUES FROM (%s) TO (%s)", [_aware(month), _aware(nxt)])
+    else:
+        cursor.execute(f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING IDENTITY)")
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_pkey')} PRIMARY KEY (id)")
+
+    cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old)}")
+    cursor.execute(f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {qn(table)}",
+                   [table])
+    cursor.execute(f"DROP TABLE {qn(old)} CASCADE")
+    for indexdef in indexes:
+        # 파티션 테이블에 만든 인덱스는 모든 파티션에 자동으로 생김
+        cursor.execute(indexdef)
+
+
+def partition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            _rebuild(cursor, schema_editor.quote_name, table, partitioned=True)
+
+
+def unpartition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            _rebuild(cursor, schema_editor.quote_name, table, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0019_measured_at'),
+    ]
+
+    operations = [
+        # 어항 삭제가 히스토리 전체를 연쇄 삭제하지 않도록 (파티션 테이블에 FK 도 두지 않음)
+        migrations.AlterField(
+            model_name='sensorreading',
+            name='tank',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING,
+                                    related_name='readings', to='monitoring.tank'),
+        ),
+        migrations.AlterField(
+            model_name='fishbehavior',
+            name='tank',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING,
+                                    related_name='behaviors', to='monitoring.tank'),
+        ),
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0020_partition_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tankstate',
+            name='context',
+            field=models.TextField(blank=True, help_text='최신값·24시간 추이·경고·급이·성장 요약'),
+        ),
+        migrations.AddField(
+            model_name='tankstate',
+            name='context_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    기존 어항은 False — target_temp 는 항상 값이 있어 명시적으로 정한 것인지 알 수 없으므로
+    수질 기준은 어종·기본 기준 그대로 두고, 목표값 기준은 어항 수정 화면에서 켬
+    """
+
+    dependencies = [
+        ('monitoring', '0021_tankstate_context'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tank',
+            name='use_target_standards',
+            field=models.BooleanField(default=False, help_text='목표 수온/pH 를 수질 기준 중심으로 사용 (끄면 어종·기본 기준 그대로)'),
+        ),
+    ]
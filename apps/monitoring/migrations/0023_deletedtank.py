@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+def remember_orphans(apps, schema_editor):
+    """이미 삭제된 어항(히스토리만 남은 tank_id)을 한 번 훑어 기록 — 이후는 어항 삭제 시 signals 가 기록"""
+    db          = schema_editor.connection.alias
+    Tank        = apps.get_model('monitoring', 'Tank')
+    DeletedTank = apps.get_model('monitoring', 'DeletedTank')
+    existing    = Tank.objects.using(db).values('id')
+
+    orphans = set()
+    for name in ('SensorReading', 'FishBehavior'):
+        model = apps.get_model('monitoring', name)
+        orphans.update(model.objects.using(db).exclude(tank_id__in=existing)
+                       .values_list('tank_id', flat=True).distinct())
+    DeletedTank.objects.using(db).bulk_create([DeletedTank(tank_id=tank_id) for tank_id in orphans])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0022_tank_use_target_standards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedTank',
+            fields=[
+                ('tank_id',    models.BigIntegerField(primary_key=True, serialize=False)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={'app_label': 'monitoring'},
+        ),
+        migrations.RunPython(remember_orphans, migrations.RunPython.noop),
+    ]
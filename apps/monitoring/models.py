@@ -1,11 +1,69 @@
-from django.db import models
+from django.db import models, connections
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
 from django.conf import settings
+from django.utils import timezone
+
+
+# ──────────────────────────────────────────────
+# 시계열 공통 쿼리셋
+# ──────────────────────────────────────────────
+
+def time_field(model) -> str:
+    """시계열 모델의 기준 시각 필드 — Meta.get_latest_by (측정 시각), 없으면 created_at"""
+    return model._meta.get_latest_by or 'created_at'
+
+
+class TankSeriesQuerySet(models.QuerySet):
+    """(tank, -기준 시각) 인덱스를 가진 시계열 모델 공통 쿼리"""
+
+    def latest_for_tanks(self, tank_ids) -> dict:
+        """어항별 최신 1건을 한 번의 쿼리로 조회 → {tank_id: row}. 같은 시각이면 나중에 저장된 행 (-id)"""
+        tank_ids = list(tank_ids)
+        if not tank_ids:
+            return {}
+
+        at = time_field(self.model)
+        qs = self.filter(tank_id__in=tank_ids)
+        if connections[self.db].features.can_distinct_on_fields:
+            # PostgreSQL: DISTINCT ON (tank_id) — 인덱스 순서 그대로 읽음
+            qs = qs.order_by('tank_id', f'-{at}', '-id').distinct('tank_id')
+        else:
+            qs = qs.annotate(
+                _rank=Window(
+                    expression=RowNumber(),
+                    partition_by=[F('tank_id')],
+                    order_by=[F(at).desc(), F('id').desc()],
+                ),
+            ).filter(_rank=1)
+        return {row.tank_id: row for row in qs}
+
+    def of_existing_tanks(self):
+        """삭제된 어항의 히스토리 제외 (SensorReading · FishBehavior 는 어항 삭제 시 남음 — monitoring.partitions)"""
+        return self.filter(tank_id__in=Tank.objects.values('id'))
 
 
 # ──────────────────────────────────────────────
 # 어항
 # ──────────────────────────────────────────────
 
+# with_latest_reading() 이 함께 가져오는 최신 센서값 필드
+LATEST_READING_FIELDS = [
+    'id', 'temperature', 'ph', 'dissolved_oxygen',
+    'turbidity', 'water_level', 'water_quality_score', 'measured_at',
+]
+
+
+class TankQuerySet(models.QuerySet):
+
+    def with_latest_reading(self):
+        """최신 센서값을 상관 서브쿼리로 붙여 한 번의 쿼리로 조회 (N+1 방지)"""
+        latest = SensorReading.objects.filter(tank=OuterRef('pk')).order_by('-measured_at', '-id')
+        return self.annotate(**{
+            f'latest_{f}': Subquery(latest.values(f)[:1]) for f in LATEST_READING_FIELDS
+        })
+
+
 class Tank(models.Model):
     """어항 기본 정보 및 제어 설정"""
 
@@ -26,6 +84,9 @@ class Tank(models.Model):
     # 목표 수질
     target_temp = models.FloatField(default=22.0, help_text="권장 수온(°C)")
     target_ph   = models.FloatField(default=7.4,  help_text="권장 pH")
+    use_target_standards = models.BooleanField(
+        default=False, help_text="목표 수온/pH 를 수질 기준 중심으로 사용 (끄면 어종·기본 기준 그대로)",
+    )
 
     # 환수 관리
     last_water_change   = models.DateField(null=True, blank=True, help_text="마지막 환수일")
@@ -35,8 +96,13 @@ class Tank(models.Model):
     filter_mode  = models.CharField(max_length=10, choices=FILTER_MODES, default='MANUAL')
     filter_is_on = models.BooleanField(default=False)
 
+    # 장치 명령 버전 (장치 상태가 바뀔 때마다 +1)
+    command_version = models.BigIntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TankQuerySet.as_manager()
+
     class Meta:
         app_label = 'monitoring'
         ordering  = ['-created_at']
@@ -44,6 +110,23 @@ class Tank(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def latest_reading(self):
+        """최신 센서값 — with_latest_reading() / select_related('state') 로 조회했다면 추가 쿼리 없음"""
+        if hasattr(self, 'latest_id'):
+            if self.latest_id is None:
+                return None
+            return SensorReading(
+                tank=self,
+                **{f: getattr(self, f'latest_{f}') for f in LATEST_READING_FIELDS},
+            )
+        if Tank.state.is_cached(self):
+            try:
+                return self.state.latest_reading
+            except TankState.DoesNotExist:
+                return None
+        return self.readings.order_by('-measured_at').first()
+
 
 # ──────────────────────────────────────────────
 # 센서 데이터
@@ -52,7 +135,8 @@ class Tank(models.Model):
 class SensorReading(models.Model):
     """ESP32 → Raspberry Pi → 서버로 전송되는 수질 센서 데이터"""
 
-    tank = models.ForeignKey(Tank, on_delete=models.CASCADE, related_name='readings')
+    # 어항 삭제 시 연쇄 삭제하지 않음 (수백만 행 DELETE 방지) — enforce_retention 이 배치로 정리
+    tank = models.ForeignKey(Tank, on_delete=models.DO_NOTHING, db_constraint=False, related_name='readings')
 
     temperature         = models.FloatField(help_text="수온(°C)")
     ph                  = models.FloatField(help_text="pH")
@@ -61,14 +145,19 @@ class SensorReading(models.Model):
     water_level         = models.FloatField(default=100.0, help_text="수위(%)")
     water_quality_score = models.IntegerField(default=100, help_text="수질 종합 점수(0~100)")
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    measured_at = models.DateTimeField(default=timezone.now, help_text="측정 시각 (게이트웨이 기준, 생략 시 수신 시각)")
+    created_at  = models.DateTimeField(auto_now_add=True, help_text="서버 수신 시각")
+
+    objects = TankSeriesQuerySet.as_manager()
 
     class Meta:
         app_label = 'monitoring'
-        ordering  = ['-created_at']
+        ordering      = ['-measured_at']
+        get_latest_by = 'measured_at'
+        indexes       = [models.Index(fields=['tank', '-measured_at'], name='mon_reading_tank_measured')]
 
     def __str__(self):
-        return f"[{self.tank.name}] {self.created_at:%Y-%m-%d %H:%M}"
+        return f"[{self.tank.name}] {self.measured_at:%Y-%m-%d %H:%M}"
 
 
 # 하위 호환 별칭
@@ -96,7 +185,8 @@ class FishBehavior(models.Model):
         ('POOR',      '나쁨'),
     ]
 
-    tank = models.ForeignKey(Tank, on_delete=models.CASCADE, related_name='behaviors')
+    # 어항 삭제 시 연쇄 삭제하지 않음 (SensorReading 과 같음)
+    tank = models.ForeignKey(Tank, on_delete=models.DO_NOTHING, db_constraint=False, related_name='behaviors')
 
     # 탐지 기본 정보
     fish_count     = models.IntegerField(default=0, help_text="탐지된 개체 수")
@@ -121,15 +211,20 @@ class FishBehavior(models.Model):
     is_anomaly = models.BooleanField(default=False, help_text="이상 행동 감지 여부")
     note       = models.TextField(blank=True, help_text="AI 권장사항 또는 이상 내용")
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    measured_at = models.DateTimeField(default=timezone.now, help_text="측정 시각 (게이트웨이 기준, 생략 시 수신 시각)")
+    created_at  = models.DateTimeField(auto_now_add=True, help_text="서버 수신 시각")
+
+    objects = TankSeriesQuerySet.as_manager()
 
     class Meta:
         app_label = 'monitoring'
-        ordering  = ['-created_at']
+        ordering      = ['-measured_at']
+        get_latest_by = 'measured_at'
+        indexes       = [models.Index(fields=['tank', '-measured_at'], name='mon_behavior_tank_measured')]
 
     def __str__(self):
         flag = " ⚠️" if self.is_anomaly else ""
-        return f"[{self.tank.name}] {self.status}{flag} — {self.created_at:%Y-%m-%d %H:%M}"
+        return f"[{self.tank.name}] {self.status}{flag} — {self.measured_at:%Y-%m-%d %H:%M}"
 
 
 # ──────────────────────────────────────────────
@@ -163,15 +258,20 @@ class FeedingEvent(models.Model):
     delta_ntu        = models.FloatField(default=0.0, help_text="탁도 변화량(NTU)")
     is_overfeeding   = models.BooleanField(default=False, help_text="과급여 플래그")
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    measured_at = models.DateTimeField(default=timezone.now, help_text="측정 시각 (게이트웨이 기준, 생략 시 수신 시각)")
+    created_at  = models.DateTimeField(auto_now_add=True, help_text="서버 수신 시각")
+
+    objects = TankSeriesQuerySet.as_manager()
 
     class Meta:
         app_label = 'monitoring'
-        ordering  = ['-created_at']
+        ordering      = ['-measured_at']
+        get_latest_by = 'measured_at'
+        indexes       = [models.Index(fields=['tank', '-measured_at'], name='mon_feeding_tank_measured')]
 
     def __str__(self):
         flag = " ⚠️과급여" if self.is_overfeeding else ""
-        return f"[{self.tank.name}] {self.amount_g}g {self.get_trigger_display()}{flag} — {self.created_at:%Y-%m-%d %H:%M}"
+        return f"[{self.tank.name}] {self.amount_g}g {self.get_trigger_display()}{flag} — {self.measured_at:%Y-%m-%d %H:%M}"
 
 
 # ──────────────────────────────────────────────
@@ -235,14 +335,19 @@ class GrowthRecord(models.Model):
     # 급이량 자동 조정
     recommended_feed_g = models.FloatField(default=0.0, help_text="권장 1회 급이량(g)")
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    measured_at = models.DateTimeField(default=timezone.now, help_text="측정 시각 (게이트웨이 기준, 생략 시 수신 시각)")
+    created_at  = models.DateTimeField(auto_now_add=True, help_text="서버 수신 시각")
+
+    objects = TankSeriesQuerySet.as_manager()
 
     class Meta:
         app_label = 'monitoring'
-        ordering  = ['-created_at']
+        ordering      = ['-measured_at']
+        get_latest_by = 'measured_at'
+        indexes       = [models.Index(fields=['tank', '-measured_at'], name='mon_growth_tank_measured')]
 
     def __str__(self):
-        return f"[{self.tank.name}] ID:{self.fish_id} {self.estimated_length}cm — {self.created_at:%Y-%m-%d %H:%M}"
+        return f"[{self.tank.name}] ID:{self.fish_id} {self.estimated_length}cm — {self.measured_at:%Y-%m-%d %H:%M}"
 
 
 # ──────────────────────────────────────────────
@@ -277,9 +382,12 @@ class ActivityPattern(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TankSeriesQuerySet.as_manager()
+
     class Meta:
         app_label = 'monitoring'
         ordering  = ['-created_at']
+        indexes   = [models.Index(fields=['tank', '-created_at'], name='mon_pattern_tank_created')]
 
     def __str__(self):
         return f"[{self.tank.name}] 패턴분석 {self.period_start:%m/%d} — {self.created_at:%Y-%m-%d %H:%M}"
@@ -306,6 +414,7 @@ class DeviceControl(models.Model):
     is_on          = models.BooleanField(default=False)
     is_auto        = models.BooleanField(default=True, help_text="True: 자동 제어 / False: 수동 제어")
     last_action_at = models.DateTimeField(auto_now=True)
+    version        = models.BigIntegerField(default=0, help_text="마지막으로 바뀐 시점의 Tank.command_version")
 
     class Meta:
         app_label = 'monitoring'
@@ -335,9 +444,373 @@ class EventLog(models.Model):
     message    = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TankSeriesQuerySet.as_manager()
+
     class Meta:
         app_label = 'monitoring'
         ordering  = ['-created_at']
+        indexes   = [models.Index(fields=['tank', '-created_at'], name='mon_eventlog_tank_created')]
+
+    def __str__(self):
+        return f"[{self.level}] {self.tank.name} — {self.created_at:%Y-%m-%d %H:%M}"
+
+
+# ──────────────────────────────────────────────
+# 현재 상태 스냅샷
+# ──────────────────────────────────────────────
+
+class TankState(models.Model):
+    """어항별 "지금 상태" 비정규화 스냅샷 — 수신 API 가 갱신, 대시보드/목록이 읽음"""
+
+    tank = models.OneToOneField(Tank, on_delete=models.CASCADE, primary_key=True, related_name='state')
+
+    # 최신 센서값
+    temperature         = models.FloatField(null=True, blank=True, help_text="수온(°C)")
+    ph                  = models.FloatField(null=True, blank=True, help_text="pH")
+    dissolved_oxygen    = models.FloatField(null=True, blank=True, help_text="용존산소량(mg/L)")
+    turbidity           = models.FloatField(null=True, blank=True, help_text="탁도(NTU)")
+    water_level         = models.FloatField(null=True, blank=True, help_text="수위(%)")
+    water_quality_score = models.IntegerField(null=True, blank=True, help_text="수질 종합 점수(0~100)")
+    reading_id          = models.BigIntegerField(null=True, blank=True)
+    reading_at          = models.DateTimeField(null=True, blank=True)
+
+    # 최신 AI 행동 분석
+    behavior_status = models.CharField(max_length=10, choices=FishBehavior.STATUS_CHOICES, blank=True)
+    fish_count      = models.IntegerField(default=0)
+    activity_level  = models.FloatField(default=0.0)
+    feeding_score   = models.IntegerField(default=0)
+    is_anomaly      = models.BooleanField(default=False)
+    behavior_note   = models.TextField(blank=True)
+    behavior_at     = models.DateTimeField(null=True, blank=True)
+
+    # 최신 급이
+    last_feeding_at = models.DateTimeField(null=True, blank=True)
+    last_frs_score  = models.IntegerField(null=True, blank=True)
+    is_overfeeding  = models.BooleanField(default=False)
+
+    # 장치 / 환수
+    device_states     = models.JSONField(default=dict, help_text="장치별 ON/OFF {type: is_on}")
+    next_water_change = models.DateField(null=True, blank=True, help_text="다음 환수 예정일")
+
+    # 챗봇 프롬프트용 요약 블록 (monitoring.context)
+    context    = models.TextField(blank=True, help_text="최신값·24시간 추이·경고·급이·성장 요약")
+    context_at = models.DateTimeField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'monitoring'
+
+    def __str__(self):
+        return f"[{self.tank.name}] 상태 스냅샷 — {self.updated_at:%Y-%m-%d %H:%M}"
+
+    @property
+    def latest_reading(self):
+        """템플릿 호환용 SensorReading (저장하지 않음)"""
+        if self.reading_at is None:
+            return None
+        return SensorReading(
+            id=self.reading_id, tank=self.tank,
+            temperature=self.temperature, ph=self.ph,
+            dissolved_oxygen=self.dissolved_oxygen, turbidity=self.turbidity,
+            water_level=self.water_level, water_quality_score=self.water_quality_score,
+            measured_at=self.reading_at,
+        )
+
+    @property
+    def latest_behavior(self):
+        """템플릿 호환용 FishBehavior (저장하지 않음)"""
+        if self.behavior_at is None:
+            return None
+        return FishBehavior(
+            tank=self.tank, status=self.behavior_status,
+            fish_count=self.fish_count, activity_level=self.activity_level,
+            feeding_score=self.feeding_score, is_anomaly=self.is_anomaly,
+            note=self.behavior_note, measured_at=self.behavior_at,
+        )
+
+
+# ──────────────────────────────────────────────
+# 센서 집계 (롤업)
+# ──────────────────────────────────────────────
+
+# 롤업 대상 센서 필드
+ROLLUP_METRICS = [
+    'temperature', 'ph', 'dissolved_oxygen',
+    'turbidity', 'water_level', 'water_quality_score',
+]
+
+
+class SensorRollup(models.Model):
+    """SensorReading 의 분/시/일 단위 min·max·sum·count 집계 — 장기 조회용"""
+
+    GRANULARITY_CHOICES = [
+        ('MINUTE', '1분'),
+        ('HOUR',   '1시간'),
+        ('DAY',    '1일'),
+    ]
+
+    tank         = models.ForeignKey(Tank, on_delete=models.CASCADE, related_name='rollups')
+    granularity  = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField(help_text="집계 구간 시작 시각 (TIME_ZONE 기준 정렬)")
+    count        = models.IntegerField(default=0)
+
+    temperature_min         = models.FloatField(null=True)
+    temperature_max         = models.FloatField(null=True)
+    temperature_sum         = models.FloatField(default=0.0)
+    ph_min                  = models.FloatField(null=True)
+    ph_max                  = models.FloatField(null=True)
+    ph_sum                  = models.FloatField(default=0.0)
+    dissolved_oxygen_min    = models.FloatField(null=True)
+    dissolved_oxygen_max    = models.FloatField(null=True)
+    dissolved_oxygen_sum    = models.FloatField(default=0.0)
+    turbidity_min           = models.FloatField(null=True)
+    turbidity_max           = models.FloatField(null=True)
+    turbidity_sum           = models.FloatField(default=0.0)
+    water_level_min         = models.FloatField(null=True)
+    water_level_max         = models.FloatField(null=True)
+    water_level_sum         = models.FloatField(default=0.0)
+    water_quality_score_min = models.FloatField(null=True)
+    water_quality_score_max = models.FloatField(null=True)
+    water_quality_score_sum = models.FloatField(default=0.0)
+
+    class Meta:
+        app_label = 'monitoring'
+        ordering  = ['-bucket_start']
+        constraints = [
+            models.UniqueConstraint(fields=['tank', 'granularity', 'bucket_start'], name='mon_rollup_unique_bucket'),
+        ]
+
+    def __str__(self):
+        return f"[{self.tank.name}] {self.granularity} {self.bucket_start:%Y-%m-%d %H:%M} (n={self.count})"
+
+    def avg(self, metric: str):
+        if not self.count:
+            return None
+        return getattr(self, f'{metric}_sum') / self.count
+
+    # SensorReading 과 같은 이름으로 평균값 노출 (리포트 템플릿 공용)
+    @property
+    def measured_at(self):
+        return self.bucket_start
+
+    @property
+    def temperature(self):
+        return round(self.avg('temperature'), 2)
+
+    @property
+    def ph(self):
+        return round(self.avg('ph'), 2)
+
+    @property
+    def dissolved_oxygen(self):
+        return round(self.avg('dissolved_oxygen'), 2)
+
+    @property
+    def turbidity(self):
+        return round(self.avg('turbidity'), 2)
+
+    @property
+    def water_level(self):
+        return round(self.avg('water_level'), 2)
+
+    @property
+    def water_quality_score(self):
+        return round(self.avg('water_quality_score'))
+
+
+# ──────────────────────────────────────────────
+# 히스토리 아카이브 매니페스트
+# ──────────────────────────────────────────────
+
+class ArchiveSegment(models.Model):
+    """Parquet 로 옮긴 어항·월 단위 히스토리 조각 (archive_history 명령이 기록)"""
+
+    KIND_CHOICES = [
+        ('readings',  '센서 측정값'),
+        ('behaviors', '행동 분석'),
+    ]
+
+    tank      = models.ForeignKey(Tank, on_delete=models.CASCADE, related_name='archive_segments')
+    kind      = models.CharField(max_length=20, choices=KIND_CHOICES)
+    month     = models.DateField(help_text="대상 월의 1일 (TIME_ZONE 기준)")
+    path      = models.CharField(max_length=500, help_text="MONITORING_ARCHIVE_DIR 기준 상대 경로")
+    row_count = models.IntegerField(default=0)
+    size      = models.BigIntegerField(default=0, help_text="파일 크기(byte)")
+    first_at  = models.DateTimeField(null=True)
+    last_at   = models.DateTimeField(null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'monitoring'
+        ordering  = ['tank', 'kind', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['tank', 'kind', 'month'], name='mon_archive_unique_month'),
+        ]
+
+    def __str__(self):
+        return f"[{self.tank.name}] {self.kind} {self.month:%Y-%m} ({self.row_count}행)"
+
+
+# ──────────────────────────────────────────────
+# 수질 기준 프로필
+# ──────────────────────────────────────────────
+
+class WaterStandard(models.Model):
+    """
+    어종별 또는 어항별 수질 기준. 비워 둔 항목은 상위 기준(기본값 → 어종 → 어항)을 따름.
+    적용 순서는 monitoring.standards 참고.
+    """
+
+    name    = models.CharField(max_length=100)
+    species = models.CharField(max_length=100, unique=True, null=True, blank=True,
+                               help_text="어종명 — Tank.fish_species 와 대소문자 무시 일치")
+    tank    = models.OneToOneField(Tank, on_delete=models.CASCADE, null=True, blank=True, related_name='water_standard')
+
+    temp_min       = models.FloatField(null=True, blank=True, help_text="수온 하한(°C)")
+    temp_max       = models.FloatField(null=True, blank=True, help_text="수온 상한(°C)")
+    temp_optimal   = models.FloatField(null=True, blank=True, help_text="최적 수온(°C)")
+    ph_min         = models.FloatField(null=True, blank=True)
+    ph_max         = models.FloatField(null=True, blank=True)
+    ph_optimal_lo  = models.FloatField(null=True, blank=True)
+    ph_optimal_hi  = models.FloatField(null=True, blank=True)
+    do_min         = models.FloatField(null=True, blank=True, help_text="DO 하한(mg/L)")
+    do_danger      = models.FloatField(null=True, blank=True, help_text="DO 위험(mg/L)")
+    turbidity_max  = models.FloatField(null=True, blank=True, help_text="탁도 상한(NTU)")
+    turbidity_ok   = models.FloatField(null=True, blank=True, help_text="탁도 정상(NTU)")
+    turbidity_warn = models.FloatField(null=True, blank=True, help_text="탁도 경고(NTU)")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'monitoring'
+        constraints = [
+            models.CheckConstraint(
+                condition=(models.Q(species__isnull=False, tank__isnull=True) |
+                           models.Q(species__isnull=True, tank__isnull=False)),
+                name='mon_waterstandard_species_xor_tank',
+            ),
+        ]
+
+    def __str__(self):
+        target = f"어항 {self.tank_id}" if self.tank_id else self.species
+        return f"{self.name} ({target})"
+
+    def overrides(self) -> dict:
+        """값이 지정된 기준 항목만"""
+        keys = [f.name for f in self._meta.concrete_fields if isinstance(f, models.FloatField)]
+        return {k: getattr(self, k) for k in keys if getattr(self, k) is not None}
+
+
+# ──────────────────────────────────────────────
+# 수신 후처리 작업 큐
+# ──────────────────────────────────────────────
+
+class IngestJob(models.Model):
+    """
+    수신 API 가 원본 행과 같은 트랜잭션으로 남기는 후처리 작업 (monitoring.jobs 가 처리).
+    성공하면 삭제, 재시도 한도를 넘기면 FAILED 로 남음.
+    """
+
+    STATUS_CHOICES = [
+        ('PENDING', '대기'),
+        ('RUNNING', '처리 중'),
+        ('FAILED',  '실패'),
+    ]
+
+    tank         = models.ForeignKey(Tank, on_delete=models.CASCADE, related_name='ingest_jobs')
+    kind         = models.CharField(max_length=20)
+    payload      = models.JSONField(default=dict)
+    status       = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts     = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(help_text="이 시각 이후 처리 (재시도 대기)")
+    locked_until = models.DateTimeField(null=True, blank=True, help_text="처리 중 임대 만료 시각")
+    last_error   = models.TextField(blank=True)
+    created_at   = models.DateTimeField()
+
+    class Meta:
+        app_label = 'monitoring'
+        ordering  = ['id']
+        indexes   = [
+            # 어항별 선두 작업 조회 (순서 보장)
+            models.Index(fields=['tank', 'id'], name='mon_job_tank_id'),
+            models.Index(fields=['status', 'available_at'], name='mon_job_status_available'),
+        ]
+
+    def __str__(self):
+        return f"[{self.tank_id}] {self.kind} #{self.id} ({self.status}, {self.attempts}회)"
+
+
+# ──────────────────────────────────────────────
+# Pi 게이트웨이 API 키
+# ──────────────────────────────────────────────
+
+class GatewayKey(models.Model):
+    """
+    게이트웨이(Pi)별 API 키. 원문은 발급 시 한 번만 보여주고 SHA-256 해시만 저장.
+    키 형식: '<prefix>.<secret>' — prefix 로 행을 찾고 해시를 상수 시간 비교 (monitoring.auth)
+    """
+
+    name       = models.CharField(max_length=100)
+    prefix     = models.CharField(max_length=16, unique=True)
+    key_hash   = models.CharField(max_length=64)
+    tanks      = models.ManyToManyField(Tank, blank=True, related_name='gateway_keys',
+                                        help_text="이 키로 데이터를 보내고 명령을 받을 수 있는 어항")
+    is_active  = models.BooleanField(default=True, help_text="끄면 폐기 (MONITORING_API_KEY_TTL 초 안에 모든 워커 반영)")
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    created_at   = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'monitoring'
+        ordering  = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix}…)"
+
+
+# ──────────────────────────────────────────────
+# 수신 멱등성 영수증
+# ──────────────────────────────────────────────
+
+class IngestReceipt(models.Model):
+    """
+    seq / idempotency_key 를 붙여 보낸 레코드의 처리 결과 (monitoring.idempotency).
+    같은 (게이트웨이, 종류, 키) 재전송은 이 행의 응답을 그대로 돌려주고 아무것도 다시 쓰지 않음.
+    """
+
+    gateway    = models.CharField(max_length=64, help_text="key:<GatewayKey id> 또는 gw:<gateway_id>")
+    kind       = models.CharField(max_length=20)
+    key        = models.CharField(max_length=100, help_text="seq:<번호> 또는 key:<idempotency_key>")
+    response   = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        app_label = 'monitoring'
+        constraints = [
+            models.UniqueConstraint(fields=['gateway', 'kind', 'key'], name='mon_receipt_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.gateway} {self.kind} {self.key}"
+
+
+# ──────────────────────────────────────────────
+# 삭제된 어항 (히스토리 정리 대기)
+# ──────────────────────────────────────────────
+
+class DeletedTank(models.Model):
+    """
+    삭제된 어항 id. SensorReading · FishBehavior 는 어항 삭제 시 남으므로
+    partitions.purge_orphans() 가 이 id 들의 행만 (tank, 시각) 인덱스로 찾아 지우고, 다 지우면 행도 삭제.
+    """
+
+    tank_id    = models.BigIntegerField(primary_key=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'monitoring'
 
     def __str__(self):
-        return f"[{self.level}] {self.tank.name} — {self.created_at:%Y-%m-%d %H:%M}"
\ No newline at end of file
+        return f"[{self.tank_id}] {self.deleted_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,209 @@
+"""
+apps/monitoring/partitions.py
+
+고용량 시계열 테이블(SensorReading · FishBehavior)의 월 파티션과 보관 정책
+- PostgreSQL: measured_at RANGE 파티션 테이블 (migration 0020 에서 전환)
+  · 월마다 <테이블>_pYYYYMM, 파티션이 없는 월의 행은 <테이블>_default 가 받음
+  · ensure() 가 이번 달부터 MONITORING_PARTITION_PREMAKE 개월 뒤까지 미리 만들고,
+    default 에 쌓인 월(늦게 재전송된 과거 측정값 등)도 파티션으로 분리
+  · 보관 기간이 완전히 지난 월은 DROP TABLE 한 번 — 행 단위 DELETE 없음
+- SQLite 등: 일반 테이블 그대로, 보관 기간이 지난 행을 배치 DELETE
+- 어항 삭제는 히스토리를 건드리지 않음 (FK on_delete=DO_NOTHING) → 삭제된 어항 id 를 DeletedTank 에 남기고
+  purge_orphans() 가 그 어항들의 행만 배치로 정리
+- 보관 기간: settings.MONITORING_RETENTION {'readings': 일수, 'behaviors': 일수} (None: 무기한, 롤업은 유지)
+- 주기 실행: python manage.py enforce_retention
+"""
+
+import re
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import DeletedTank, FishBehavior, SensorReading
+
+# 파티션 대상 종류 → 모델 (archive.ARCHIVE_MODELS 와 같은 키)
+PARTITIONED_MODELS = {
+    'readings':  SensorReading,
+    'behaviors': FishBehavior,
+}
+PARTITION_FIELD = 'measured_at'
+
+BATCH_SIZE = 5000
+
+_MONTH_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def supported(using: str = 'default') -> bool:
+    return connections[using].vendor == 'postgresql'
+
+
+def retention_days(kind: str):
+    return getattr(settings, 'MONITORING_RETENTION', {}).get(kind)
+
+
+def _premake() -> int:
+    return getattr(settings, 'MONITORING_PARTITION_PREMAKE', 2)
+
+
+# ──────────────────────────────────────────────
+# 월 계산
+# ──────────────────────────────────────────────
+
+def month_of(dt) -> date:
+    local = timezone.localtime(dt)
+    return date(local.year, local.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    idx = month.year * 12 + month.month - 1 + n
+    return date(idx // 12, idx % 12 + 1, 1)
+
+
+def month_bounds(month: date):
+    """월 1일 → (해당 월 시작, 다음 월 시작) aware datetime — TIME_ZONE 기준"""
+    return (timezone.make_aware(datetime.combine(month, time.min)),
+            timezone.make_aware(datetime.combine(add_months(month, 1), time.min)))
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+# ──────────────────────────────────────────────
+# 파티션 관리 (PostgreSQL)
+# ──────────────────────────────────────────────
+
+def partitions(model, using: str = 'default') -> dict:
+    """{월: 파티션 이름} (default 파티션 제외)"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [model._meta.db_table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    found = {}
+    for name in names:
+        m = _MONTH_SUFFIX.search(name)
+        if m:
+            found[date(int(m.group(1)), int(m.group(2)), 1)] = name
+    return found
+
+
+def _default_months(model, using: str) -> list:
+    """default 파티션에 행이 있는 월 (보통 비어 있음)"""
+    conn  = connections[using]
+    table = conn.ops.quote_name(f"{model._meta.db_table}_default")
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({PARTITION_FIELD}), MAX({PARTITION_FIELD}) FROM {table}")
+        first, last = cursor.fetchone()
+    if first is None:
+        return []
+    months, month = [], month_of(first)
+    while month <= month_of(last):
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def _create_partition(model, month: date, using: str) -> str:
+    """월 파티션 생성. default 파티션에 그 달 행이 있으면 옮긴 뒤 붙임 (한 트랜잭션)."""
+    conn  = connections[using]
+    qn    = conn.ops.quote_name
+    table = model._meta.db_table
+    name  = partition_name(table, month)
+    start, end = month_bounds(month)
+    with transaction.atomic(using=using), conn.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(table + '_default')} "
+            f"WHERE {PARTITION_FIELD} >= %s AND {PARTITION_FIELD} < %s RETURNING *) "
+            f"INSERT INTO {qn(name)} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)", [start, end])
+    return name
+
+
+def ensure(using: str = 'default', ahead: int = None) -> list:
+    """이번 달 ~ ahead 개월 뒤 + default 에 쌓인 월의 파티션 생성. 반환: 새로 만든 파티션 이름."""
+    if not supported(using):
+        return []
+    ahead = _premake() if ahead is None else ahead
+    first = month_of(timezone.now())
+
+    created = []
+    for model in PARTITIONED_MODELS.values():
+        existing = partitions(model, using)
+        wanted   = [add_months(first, n) for n in range(ahead + 1)] + _default_months(model, using)
+        for month in sorted(set(wanted) - set(existing)):
+            created.append(_create_partition(model, month, using))
+    return created
+
+
+# ──────────────────────────────────────────────
+# 보관 정책
+# ──────────────────────────────────────────────
+
+def _delete_in_batches(qs, batch_size: int = BATCH_SIZE) -> int:
+    """id 배치 단위 DELETE — 한 트랜잭션이 너무 커지지 않도록"""
+    total = 0
+    while True:
+        ids = list(qs.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        deleted, _ = qs.model.objects.filter(id__in=ids).delete()
+        total += deleted
+
+
+def expire(kind: str, cutoff, using: str = 'default', dry_run: bool = False) -> dict:
+    """
+    cutoff 이전 히스토리 삭제.
+    PostgreSQL 은 끝이 cutoff 이하인 월 파티션을 통째로 DROP (걸친 달은 다음 달에), 그 외는 행 배치 DELETE.
+    반환: {'partitions': [삭제한 파티션], 'rows': 삭제한 행 수}
+    """
+    model  = PARTITIONED_MODELS[kind]
+    result = {'partitions': [], 'rows': 0}
+    if supported(using):
+        qn = connections[using].ops.quote_name
+        for month, name in sorted(partitions(model, using).items()):
+            if month_bounds(month)[1] > cutoff:
+                continue
+            result['partitions'].append(name)
+            if not dry_run:
+                with connections[using].cursor() as cursor:
+                    cursor.execute(f"DROP TABLE {qn(name)}")
+        # default 파티션에 남은 오래된 행 (ensure() 전에 들어온 것)
+        with connections[using].cursor() as cursor:
+            verb = "SELECT COUNT(*)" if dry_run else "DELETE"
+            cursor.execute(f"{verb} FROM {qn(model._meta.db_table + '_default')} WHERE {PARTITION_FIELD} < %s", [cutoff])
+            result['rows'] = cursor.fetchone()[0] if dry_run else cursor.rowcount
+        return result
+
+    qs = model.objects.using(using).filter(**{f'{PARTITION_FIELD}__lt': cutoff})
+    result['rows'] = qs.count() if dry_run else _delete_in_batches(qs)
+    return result
+
+
+def purge_orphans(kind: str, using: str = 'default', dry_run: bool = False) -> int:
+    """
+    삭제된 어항(DeletedTank)에 남은 히스토리를 배치로 정리 — 전체 테이블이 아니라 그 어항들의 행만 인덱스로 찾음.
+    어느 종류에도 행이 남지 않은 어항은 DeletedTank 에서 뺌.
+    """
+    tank_ids = list(DeletedTank.objects.using(using).values_list('tank_id', flat=True))
+    if not tank_ids:
+        return 0
+    qs = PARTITIONED_MODELS[kind].objects.using(using).filter(tank_id__in=tank_ids)
+    if dry_run:
+        return qs.count()
+
+    deleted = _delete_in_batches(qs)
+    remaining = set()
+    for model in PARTITIONED_MODELS.values():
+        remaining.update(model.objects.using(using).filter(tank_id__in=tank_ids)
+                         .values_list('tank_id', flat=True).distinct())
+    DeletedTank.objects.using(using).filter(tank_id__in=set(tank_ids) - remaining).delete()
+    return deleted
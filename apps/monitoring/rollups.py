@@ -0,0 +1,236 @@
+"""
+apps/monitoring/rollups.py
+
+SensorReading 분/시/일 롤업 (SensorRollup)
+- 수신 API 에서 apply_readings() 로 증분 갱신 (버킷당 UPDATE 1회)
+  · 구간은 측정 시각(measured_at) 기준 — 늦게/순서 없이 도착한 측정값도 해당 과거 구간에 그대로 합산
+    (count·sum 은 더하고 min·max 는 LEAST/GREATEST 라 도착 순서와 무관, 재계산 불필요)
+- MONITORING_ROLLUP_ON_INGEST=False 이면 주기 실행으로 대체:
+  python manage.py build_rollups --days 1
+- 차트·리포트는 series() 로 조회 구간에 맞는 단위(점 수 상한 내)를 골라 읽음
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDay, TruncHour, TruncMinute
+from django.utils import timezone
+
+from . import archive
+from .models import ROLLUP_METRICS, SensorReading, SensorRollup
+
+
+# 세밀한 단위부터
+GRANULARITIES = [
+    ('MINUTE', timedelta(minutes=1), TruncMinute),
+    ('HOUR',   timedelta(hours=1),   TruncHour),
+    ('DAY',    timedelta(days=1),    TruncDay),
+]
+
+# 차트/표 1개에 그릴 최대 점 수
+DEFAULT_MAX_POINTS = 500
+
+
+def enabled() -> bool:
+    return getattr(settings, 'MONITORING_ROLLUP_ON_INGEST', True)
+
+
+def bucket_start(dt, granularity: str):
+    """DB 의 Trunc* 와 같은 기준(현재 TIME_ZONE)으로 구간 시작 시각 계산"""
+    local = timezone.localtime(dt).replace(second=0, microsecond=0)
+    if granularity in ('HOUR', 'DAY'):
+        local = local.replace(minute=0)
+    if granularity == 'DAY':
+        local = local.replace(hour=0)
+    return local
+
+
+# ──────────────────────────────────────────────
+# 증분 갱신 (수신 시)
+# ──────────────────────────────────────────────
+
+def _aggregate(readings) -> dict:
+    """(tank_id, 단위, 구간) → {count, <m>_min, <m>_max, <m>_sum}"""
+    buckets = {}
+    for r in readings:
+        for granularity, _, _ in GRANULARITIES:
+            key = (r.tank_id, granularity, bucket_start(r.measured_at, granularity))
+            agg = buckets.get(key)
+            if agg is None:
+                agg = buckets[key] = {'count': 0}
+                for m in ROLLUP_METRICS:
+                    agg[f'{m}_min'] = agg[f'{m}_max'] = None
+                    agg[f'{m}_sum'] = 0.0
+            agg['count'] += 1
+            for m in ROLLUP_METRICS:
+                value = getattr(r, m)
+                if value is None:
+                    continue
+                value = float(value)
+                agg[f'{m}_sum'] += value
+                if agg[f'{m}_min'] is None or value < agg[f'{m}_min']:
+                    agg[f'{m}_min'] = value
+                if agg[f'{m}_max'] is None or value > agg[f'{m}_max']:
+                    agg[f'{m}_max'] = value
+    return buckets
+
+
+def _merge(tank_id, granularity, start, agg: dict):
+    updates = {'count': F('count') + agg['count']}
+    for m in ROLLUP_METRICS:
+        updates[f'{m}_sum'] = F(f'{m}_sum') + agg[f'{m}_sum']
+        if agg[f'{m}_min'] is not None:
+            # SQLite 의 스칼라 MIN/MAX 는 NULL 이 하나라도 있으면 NULL — 처음 들어온 항목이면 새 값
+            updates[f'{m}_min'] = Least(Coalesce(F(f'{m}_min'), Value(agg[f'{m}_min'])), Value(agg[f'{m}_min']))
+            updates[f'{m}_max'] = Greatest(Coalesce(F(f'{m}_max'), Value(agg[f'{m}_max'])), Value(agg[f'{m}_max']))
+
+    rows = SensorRollup.objects.filter(tank_id=tank_id, granularity=granularity, bucket_start=start)
+    if not rows.update(**updates):
+        try:
+            with transaction.atomic():
+                SensorRollup.objects.create(tank_id=tank_id, granularity=granularity, bucket_start=start, **agg)
+        except IntegrityError:
+            # 동시 수신으로 먼저 생성된 경우
+            rows.update(**updates)
+
+
+def apply_readings(readings):
+    """새로 저장된 SensorReading 들을 롤업에 합산. 구간당 쿼리 1~2회."""
+    if not enabled():
+        return
+    for (tank_id, granularity, start), agg in _aggregate(readings).items():
+        _merge(tank_id, granularity, start, agg)
+
+
+# ──────────────────────────────────────────────
+# 백필 / 재계산
+# ──────────────────────────────────────────────
+
+def rebuild(start=None, end=None, tank_ids=None, batch_size: int = 1000) -> int:
+    """원본 SensorReading 에서 [start, end) 구간 롤업을 DB 집계로 재계산.
+
+    start 는 일 단위 경계로 내림 — 모든 단위의 구간이 잘리지 않도록.
+    아카이브로 원본이 옮겨진 구간은 기존 롤업을 유지 (start 를 아카이브 끝으로 올림).
+    """
+    floor = archive.archived_until(tank_ids)
+    if floor is not None and (start is None or start < floor):
+        start = floor
+
+    readings = SensorReading.objects.of_existing_tanks()
+    if start is not None:
+        start    = bucket_start(start, 'DAY')
+        readings = readings.filter(measured_at__gte=start)
+    if end is not None:
+        readings = readings.filter(measured_at__lt=end)
+    if tank_ids is not None:
+        readings = readings.filter(tank_id__in=tank_ids)
+
+    aggregates = {'count': Count('id')}
+    for m in ROLLUP_METRICS:
+        aggregates[f'{m}_min'] = Min(m)
+        aggregates[f'{m}_max'] = Max(m)
+        aggregates[f'{m}_sum'] = Sum(m)
+
+    total = 0
+    for granularity, _, trunc in GRANULARITIES:
+        rows = (readings
+                .annotate(bucket=trunc('measured_at'))
+                .values('tank_id', 'bucket')
+                .annotate(**aggregates)
+                .order_by())
+
+        existing = SensorRollup.objects.filter(granularity=granularity)
+        if start is not None:
+            existing = existing.filter(bucket_start__gte=start)
+        if end is not None:
+            existing = existing.filter(bucket_start__lt=end)
+        if tank_ids is not None:
+            existing = existing.filter(tank_id__in=tank_ids)
+
+        with transaction.atomic():
+            existing.delete()
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                fields = {k: v for k, v in row.items() if k not in ('tank_id', 'bucket')}
+                for m in ROLLUP_METRICS:
+                    fields[f'{m}_sum'] = float(fields[f'{m}_sum'] or 0.0)
+                batch.append(SensorRollup(tank_id=row['tank_id'], granularity=granularity,
+                                          bucket_start=row['bucket'], **fields))
+                if len(batch) >= batch_size:
+                    SensorRollup.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                SensorRollup.objects.bulk_create(batch)
+                total += len(batch)
+    return total
+
+
+# ──────────────────────────────────────────────
+# 조회
+# ──────────────────────────────────────────────
+
+def pick_granularity(start, end=None, max_points: int = DEFAULT_MAX_POINTS) -> str:
+    """구간 길이를 max_points 이하로 나누는 가장 세밀한 단위. 없으면 DAY."""
+    span = (end or timezone.now()) - start
+    for granularity, step, _ in GRANULARITIES:
+        if span / step <= max_points:
+            return granularity
+    return GRANULARITIES[-1][0]
+
+
+def series(tank, start, end=None, max_points: int = DEFAULT_MAX_POINTS, granularity: str = None):
+    """tank 의 [start, end) 롤업 행 (최신순). granularity 미지정 시 자동 선택."""
+    granularity = granularity or pick_granularity(start, end, max_points)
+    rows = SensorRollup.objects.filter(tank=tank, granularity=granularity,
+                                       bucket_start__gte=bucket_start(start, granularity))
+    if end is not None:
+        rows = rows.filter(bucket_start__lt=end)
+    return rows
+
+
+# ──────────────────────────────────────────────
+# 리포트 화면용
+# ──────────────────────────────────────────────
+
+# 리포트 조회 범위 → 기간 (None 이면 전체, 'recent' 는 원본 최근 N건)
+REPORT_RANGES = {
+    'recent': None,
+    '1d':     timedelta(days=1),
+    '7d':     timedelta(days=7),
+    '30d':    timedelta(days=30),
+    'all':    None,
+}
+RECENT_LIMIT = 100
+REPORT_RANGE_CHOICES = [
+    ('recent', f'최근 {RECENT_LIMIT}건'),
+    ('1d',     '1일'),
+    ('7d',     '7일'),
+    ('30d',    '30일'),
+    ('all',    '전체'),
+]
+
+
+def report_rows(tank, range_key: str = 'recent', sort_order: str = 'desc'):
+    """리포트 표에 쓸 행과 롤업 단위 (원본이면 None). 어느 범위든 행 수는 유한."""
+    if range_key not in REPORT_RANGES:
+        range_key = 'recent'
+
+    if range_key == 'recent':
+        rows = list(tank.readings.order_by('-measured_at')[:RECENT_LIMIT])
+        if sort_order == 'asc':
+            rows.reverse()
+        return rows, None
+
+    if range_key == 'all':
+        granularity = 'DAY'
+        rows        = SensorRollup.objects.filter(tank=tank, granularity=granularity)
+    else:
+        start       = timezone.now() - REPORT_RANGES[range_key]
+        granularity = pick_granularity(start, max_points=DEFAULT_MAX_POINTS)
+        rows        = series(tank, start, granularity=granularity)
+
+    order_by = '-bucket_start' if sort_order == 'desc' else 'bucket_start'
+    return list(rows.order_by(order_by)[:DEFAULT_MAX_POINTS]), granularity
@@ -0,0 +1,184 @@
+"""
+apps/monitoring/scoring.py
+
+수질 점수 · 기준치 판정 엔진
+- score_one():  측정값 1건 (수신 API) — 기존 스칼라 계산
+- score_many(): 측정값 배열을 NumPy 로 한 번에 (배치 수신, 기준 변경 후 재채점)
+- thresholds(): 자동 제어/경보 기준 판정. 스칼라·배열 모두 같은 식으로 평가
+- rescore():    저장된 히스토리 재채점 (python manage.py rescore_readings)
+두 경로는 같은 입력에 대해 같은 결과를 내야 함 (monitoring.tests 참고)
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+
+# ──────────────────────────────────────────────
+# 수질 기준값 (코멧 금붕어 치어 — 설계 문서 v2.0)
+# ──────────────────────────────────────────────
+
+WATER_STANDARDS = {
+    'temp_min':       21.0,
+    'temp_max':       24.0,
+    'temp_optimal':   22.0,
+    'ph_min':         6.5,
+    'ph_max':         8.0,
+    'ph_optimal_lo':  7.4,
+    'ph_optimal_hi':  7.5,
+    'do_min':         5.0,
+    'do_danger':      4.0,
+    'turbidity_max':  50.0,
+    'turbidity_ok':   20.0,
+    'turbidity_warn': 100.0,
+}
+
+# 기준과 무관한 고정 경계
+PH_DANGER_LO   = 6.0
+PH_DANGER_HI   = 8.5
+DO_AIR_OFF     = 6.0
+TURBIDITY_SOFT = 30.0
+
+
+# ──────────────────────────────────────────────
+# 수질 점수 (스칼라)
+# ──────────────────────────────────────────────
+
+def score_one(temp, ph, do_val, turbidity, standards: dict = None) -> int:
+    score = 100
+    s = standards or WATER_STANDARDS
+
+    # 수온
+    if temp < s['temp_min'] or temp > s['temp_max']:
+        score -= 30
+    else:
+        score -= min(int(abs(temp - s['temp_optimal']) / 1.0) * 5, 15)
+
+    # pH
+    if ph < PH_DANGER_LO or ph > PH_DANGER_HI:
+        score -= 30
+    elif ph < s['ph_min'] or ph > s['ph_max']:
+        score -= 15
+    elif not (s['ph_optimal_lo'] <= ph <= s['ph_optimal_hi']):
+        score -= 5
+
+    # DO
+    if do_val < s['do_danger']:
+        score -= 30
+    elif do_val < s['do_min']:
+        score -= 15
+
+    # 탁도
+    if turbidity > s['turbidity_warn']:
+        score -= 30
+    elif turbidity > s['turbidity_max']:
+        score -= 15
+    elif turbidity > TURBIDITY_SOFT:
+        score -= 5
+
+    return max(score, 0)
+
+
+# ──────────────────────────────────────────────
+# 수질 점수 (배열)
+# ──────────────────────────────────────────────
+
+def penalties(temp, ph, do_val, turbidity, standards: dict = None) -> dict:
+    """지표별 감점 배열 {'temperature', 'ph', 'dissolved_oxygen', 'turbidity'} (int64)"""
+    s    = standards or WATER_STANDARDS
+    temp = np.asarray(temp, dtype=np.float64)
+    ph   = np.asarray(ph, dtype=np.float64)
+    do_v = np.asarray(do_val, dtype=np.float64)
+    turb = np.asarray(turbidity, dtype=np.float64)
+
+    temp_out = (temp < s['temp_min']) | (temp > s['temp_max'])
+    temp_dev = np.minimum(np.floor(np.abs(temp - s['temp_optimal']) / 1.0) * 5, 15)
+
+    ph_danger  = (ph < PH_DANGER_LO) | (ph > PH_DANGER_HI)
+    ph_out     = (ph < s['ph_min']) | (ph > s['ph_max'])
+    ph_optimal = (s['ph_optimal_lo'] <= ph) & (ph <= s['ph_optimal_hi'])
+
+    return {
+        'temperature':      np.where(temp_out, 30, temp_dev).astype(np.int64),
+        'ph':               np.select([ph_danger, ph_out, ~ph_optimal], [30, 15, 5], 0).astype(np.int64),
+        'dissolved_oxygen': np.select([do_v < s['do_danger'], do_v < s['do_min']], [30, 15], 0).astype(np.int64),
+        'turbidity':        np.select([turb > s['turbidity_warn'], turb > s['turbidity_max'], turb > TURBIDITY_SOFT],
+                                      [30, 15, 5], 0).astype(np.int64),
+    }
+
+
+def score_many(temp, ph, do_val, turbidity, standards: dict = None):
+    """수질 점수 배열 (score_one 과 같은 규칙)"""
+    total = sum(penalties(temp, ph, do_val, turbidity, standards).values())
+    return np.maximum(100 - total, 0)
+
+
+# ──────────────────────────────────────────────
+# 기준치 판정 (자동 제어 · 경보)
+# ──────────────────────────────────────────────
+
+def thresholds(temp, ph, do_val, turbidity, standards: dict = None) -> dict:
+    """
+    판정 플래그 dict. 스칼라를 넣으면 bool, 배열을 넣으면 bool 배열.
+    *_on / *_off 는 장치 켜기/끄기 조건 (둘 다 거짓이면 현 상태 유지)
+    """
+    s = standards or WATER_STANDARDS
+    if not np.isscalar(temp):
+        temp, ph, do_val, turbidity = (np.asarray(v, dtype=np.float64) for v in (temp, ph, do_val, turbidity))
+
+    return {
+        # 히터: 21°C 미만 ON / 22°C 초과 OFF
+        'heater_on':       temp < s['temp_min'],
+        'heater_off':      temp > s['temp_optimal'],
+        # 냉각팬: 24°C 초과 ON / 23°C 이하 OFF
+        'cooling_on':      temp > s['temp_max'],
+        'cooling_off':     temp <= s['temp_max'] - 1,
+        # 여과기: 50 NTU 초과 ON / 20 NTU 이하 OFF
+        'filter_on':       turbidity > s['turbidity_max'],
+        'filter_off':      turbidity <= s['turbidity_ok'],
+        # 에어펌프: DO 4mg/L 미만 즉각 ON / 6mg/L 이상 OFF
+        'air_pump_on':     do_val < s['do_danger'],
+        'air_pump_off':    do_val >= DO_AIR_OFF,
+        # 경보
+        'ph_danger':       (ph < PH_DANGER_LO) | (ph > PH_DANGER_HI),
+        'turbidity_alert': turbidity > s['turbidity_warn'],
+    }
+
+
+# ──────────────────────────────────────────────
+# 히스토리 재채점
+# ──────────────────────────────────────────────
+
+def rescore(readings, standards: dict = None, chunk_size: int = 10_000) -> int:
+    """
+    SensorReading 쿼리셋의 water_quality_score 를 다시 계산해 바뀐 행만 갱신.
+    청크마다 NumPy 1회 채점 + 점수별 UPDATE (점수는 0~100 이라 청크당 최대 101회).
+    반환: 갱신된 행 수
+    """
+    rows = readings.order_by().values_list(
+        'id', 'temperature', 'ph', 'dissolved_oxygen', 'turbidity', 'water_quality_score',
+    ).iterator(chunk_size=chunk_size)
+
+    updated = 0
+    chunk   = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            updated += _rescore_chunk(readings.model, chunk, standards)
+            chunk    = []
+    if chunk:
+        updated += _rescore_chunk(readings.model, chunk, standards)
+    return updated
+
+
+def _rescore_chunk(model, chunk: list, standards: dict) -> int:
+    data   = np.array([row[1:5] for row in chunk], dtype=np.float64)
+    scores = score_many(data[:, 0], data[:, 1], data[:, 2], data[:, 3], standards)
+    old    = np.array([row[5] for row in chunk], dtype=np.int64)
+
+    by_score = defaultdict(list)
+    for i in np.nonzero(scores != old)[0].tolist():
+        by_score[int(scores[i])].append(chunk[i][0])
+    for score, ids in by_score.items():
+        model.objects.filter(id__in=ids).update(water_quality_score=score)
+    return sum(len(ids) for ids in by_score.values())
@@ -0,0 +1,49 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import archive, auth, context, events, standards, tank_cache
+from .models import ArchiveSegment, DeletedTank, EventLog, GatewayKey, Tank, WaterStandard
+
+
+@receiver(post_save, sender=EventLog)
+def publish_event_log(sender, instance, created, **kwargs):
+    """새 EventLog → 대시보드 스트림"""
+    if created:
+        events.publish_log(instance)
+
+
+@receiver([post_save, post_delete], sender=WaterStandard)
+def invalidate_standards(sender, instance, **kwargs):
+    """어종 프로필은 여러 어항에 걸리므로 전체 무효화"""
+    standards.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Tank)
+def invalidate_tank_caches(sender, instance, **kwargs):
+    standards.invalidate(instance.id)
+    tank_cache.invalidate(instance.id)
+
+
+@receiver(post_save, sender=Tank)
+def refresh_tank_context(sender, instance, created, **kwargs):
+    """이름·목표값 등을 바꾸면 챗봇 요약 블록도 바로 — 다음 수신을 기다리지 않음"""
+    context.refresh(instance, create=created)
+
+
+@receiver(post_delete, sender=Tank)
+def remember_deleted_tank(sender, instance, **kwargs):
+    """남은 히스토리는 enforce_retention 이 정리 (monitoring.partitions.purge_orphans)"""
+    DeletedTank.objects.get_or_create(tank_id=instance.id)
+
+
+@receiver(post_delete, sender=ArchiveSegment)
+def remove_archive_file(sender, instance, **kwargs):
+    """어항 삭제로 연쇄 삭제된 조각의 Parquet 파일 — 남겨 두면 아무도 읽지 않는 삭제된 어항의 히스토리"""
+    archive.discard(instance)
+
+
+@receiver([post_save, post_delete], sender=GatewayKey)
+@receiver(m2m_changed, sender=GatewayKey.tanks.through)
+def invalidate_gateway_keys(sender, **kwargs):
+    """키 폐기·허용 어항 변경 → 인증 캐시 비움"""
+    auth.invalidate()
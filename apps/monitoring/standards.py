@@ -0,0 +1,136 @@
+"""
+apps/monitoring/standards.py
+
+어항별 수질 기준 (RuleSet)
+- 적용 순서: 기본값(scoring.WATER_STANDARDS) → 어종 프로필 → 어항 target_temp/target_ph → 어항 프로필
+  · target_temp 는 수온 범위 전체를, target_ph 는 pH 최적 구간을 같은 폭으로 평행 이동
+  · 단, Tank.use_target_standards 를 켠 어항만 — target_temp 는 항상 값이 있어(모델 기본 22, 등록 폼 기본 26)
+    켜지 않은 어항은 어종·기본 기준을 그대로 씀
+- 컴파일 결과는 프로세스 메모리에 캐시 — 수신 API 는 측정값마다 DB 를 다시 읽지 않음
+  · Tank 의 관련 필드가 바뀌면 캐시 키가 달라져 자동 무효화
+  · WaterStandard 저장/삭제 시 signals 에서 invalidate() (다른 워커는 MONITORING_RULES_TTL 초 안에 반영)
+"""
+
+import threading
+import time
+
+from django.conf import settings
+
+from . import scoring
+from .models import Tank, WaterStandard
+
+
+class RuleSet:
+    """컴파일된 기준 1세트 — 채점·판정 함수에 standards 로 전달"""
+
+    __slots__ = ('standards', 'source')
+
+    def __init__(self, standards: dict, source: str = 'default'):
+        self.standards = standards
+        self.source    = source
+
+    def score(self, temp, ph, do_val, turbidity) -> int:
+        return scoring.score_one(temp, ph, do_val, turbidity, self.standards)
+
+    def score_many(self, temp, ph, do_val, turbidity):
+        return scoring.score_many(temp, ph, do_val, turbidity, self.standards)
+
+    def thresholds(self, temp, ph, do_val, turbidity) -> dict:
+        return scoring.thresholds(temp, ph, do_val, turbidity, self.standards)
+
+    def ranges(self) -> dict:
+        """지표별 허용 범위 (하한, 상한) — None 은 제한 없음"""
+        s = self.standards
+        return {
+            'temperature':      (s['temp_min'], s['temp_max']),
+            'ph':               (s['ph_min'], s['ph_max']),
+            'dissolved_oxygen': (s['do_min'], None),
+            'turbidity':        (None, s['turbidity_max']),
+        }
+
+
+# ──────────────────────────────────────────────
+# 컴파일
+# ──────────────────────────────────────────────
+
+def _species_keys(fish_species: str) -> list:
+    """'구피, 네온테트라' → ['구피, 네온테트라', '구피', '네온테트라'] (소문자)"""
+    if not fish_species:
+        return []
+    whole = fish_species.strip().lower()
+    parts = [p.strip() for p in whole.replace('/', ',').split(',') if p.strip()]
+    return list(dict.fromkeys([whole] + parts))
+
+
+def compile_rules(tank: Tank) -> RuleSet:
+    s       = dict(scoring.WATER_STANDARDS)
+    sources = []
+
+    keys = _species_keys(tank.fish_species)
+    if keys:
+        profiles = {p.species.strip().lower(): p for p in WaterStandard.objects.filter(species__isnull=False)
+                    if p.species.strip().lower() in keys}
+        for key in keys:
+            if key in profiles:
+                s.update(profiles[key].overrides())
+                sources.append(f"species:{profiles[key].species}")
+                break
+
+    if tank.use_target_standards and tank.target_temp is not None:
+        delta = float(tank.target_temp) - s['temp_optimal']
+        for k in ('temp_min', 'temp_max', 'temp_optimal'):
+            s[k] += delta
+        if delta:
+            sources.append('target_temp')
+    if tank.use_target_standards and tank.target_ph is not None:
+        delta = float(tank.target_ph) - s['ph_optimal_lo']
+        for k in ('ph_optimal_lo', 'ph_optimal_hi'):
+            s[k] += delta
+        if delta:
+            sources.append('target_ph')
+
+    profile = WaterStandard.objects.filter(tank_id=tank.id).first()
+    if profile is not None:
+        s.update(profile.overrides())
+        sources.append('tank')
+
+    return RuleSet(s, '+'.join(sources) or 'default')
+
+
+# ──────────────────────────────────────────────
+# 프로세스 캐시
+# ──────────────────────────────────────────────
+
+_cache      = {}
+_cache_lock = threading.Lock()
+
+
+def _ttl() -> float:
+    return getattr(settings, 'MONITORING_RULES_TTL', 60)
+
+
+def _key(tank: Tank) -> tuple:
+    return (tank.fish_species, tank.use_target_standards, tank.target_temp, tank.target_ph)
+
+
+def for_tank(tank: Tank) -> RuleSet:
+    """어항 기준. 캐시 적중 시 DB 조회 없음."""
+    now   = time.monotonic()
+    entry = _cache.get(tank.id)
+    if entry is not None:
+        key, rules, expires = entry
+        if key == _key(tank) and now < expires:
+            return rules
+
+    rules = compile_rules(tank)
+    with _cache_lock:
+        _cache[tank.id] = (_key(tank), rules, now + _ttl())
+    return rules
+
+
+def invalidate(tank_id=None):
+    with _cache_lock:
+        if tank_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(tank_id, None)
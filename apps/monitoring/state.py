@@ -0,0 +1,165 @@
+"""
+apps/monitoring/state.py
+
+TankState 스냅샷 갱신 헬퍼
+- 수신 API(센서/행동/급이)와 수동 제어/환수 시 호출
+- 대시보드·목록은 히스토리 테이블 대신 TankState 1행만 읽음
+- 갱신된 필드는 events 로 발행 → 대시보드 SSE 스트림
+- "최신" 은 측정 시각(measured_at) 기준 — 늦게 도착한 과거 레코드는 is_newer() 로 걸러 스냅샷을 되돌리지 않음
+- 복구: python manage.py rebuild_tank_state
+"""
+
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import events
+from .models import Tank, TankState, FishBehavior, FeedingEvent, DeviceControl
+
+
+# ──────────────────────────────────────────────
+# 필드 변환
+# ──────────────────────────────────────────────
+
+def _next_water_change(tank: Tank):
+    if not tank.last_water_change:
+        return None
+    return tank.last_water_change + timedelta(days=int(tank.water_change_period or 7))
+
+
+def _reading_fields(reading) -> dict:
+    return {
+        'temperature':         reading.temperature,
+        'ph':                  reading.ph,
+        'dissolved_oxygen':    reading.dissolved_oxygen,
+        'turbidity':           reading.turbidity,
+        'water_level':         reading.water_level,
+        'water_quality_score': reading.water_quality_score,
+        'reading_id':          reading.id,
+        'reading_at':          reading.measured_at,
+    }
+
+
+def _behavior_fields(behavior: FishBehavior) -> dict:
+    return {
+        'behavior_status': behavior.status,
+        'fish_count':      behavior.fish_count,
+        'activity_level':  behavior.activity_level,
+        'feeding_score':   behavior.feeding_score,
+        'is_anomaly':      behavior.is_anomaly,
+        'behavior_note':   behavior.note,
+        'behavior_at':     behavior.measured_at,
+    }
+
+
+def _feeding_fields(feeding: FeedingEvent, frs_score) -> dict:
+    return {
+        'last_feeding_at': feeding.measured_at,
+        'last_frs_score':  frs_score,
+        'is_overfeeding':  feeding.is_overfeeding,
+    }
+
+
+def _device_states(tank_id) -> dict:
+    return dict(DeviceControl.objects.filter(tank_id=tank_id).values_list('type', 'is_on'))
+
+
+# ──────────────────────────────────────────────
+# upsert
+# ──────────────────────────────────────────────
+
+def _write(tank_id, fields: dict, overwrite: bool = True) -> bool:
+    """
+    UPDATE 1회로 끝나는 것이 보통, 스냅샷이 없을 때만 INSERT.
+    overwrite=False 면 스냅샷이 없을 때만 생성 (이미 있으면 그대로 두고 False).
+    """
+    if overwrite and TankState.objects.filter(tank_id=tank_id).update(**fields):
+        return True
+    try:
+        with transaction.atomic():
+            TankState.objects.create(tank_id=tank_id, **fields)
+        return True
+    except IntegrityError:
+        # 동시 수신으로 먼저 생성된 경우
+        return bool(overwrite and TankState.objects.filter(tank_id=tank_id).update(**fields))
+
+
+def _upsert(tank: Tank, **fields):
+    fields['next_water_change'] = _next_water_change(tank)
+    fields['updated_at']        = timezone.now()
+    _write(tank.id, fields)
+
+    # 대시보드 스트림에는 바뀐 필드만 전달
+    events.publish(tank.id, 'state', fields)
+
+
+def is_newer(tank: Tank, field: str, at) -> bool:
+    """스냅샷의 field 시각보다 at 이 늦거나 같으면 True (스냅샷이 없어도 True)"""
+    return not TankState.objects.filter(tank_id=tank.id, **{f'{field}__gt': at}).exists()
+
+
+def apply_reading(tank: Tank, reading, devices_changed: bool = False):
+    fields = _reading_fields(reading)
+    if devices_changed:
+        fields['device_states'] = _device_states(tank.id)
+    _upsert(tank, **fields)
+
+
+def apply_behavior(tank: Tank, behavior: FishBehavior):
+    _upsert(tank, **_behavior_fields(behavior))
+
+
+def apply_feeding(tank: Tank, feeding: FeedingEvent, frs_score):
+    _upsert(tank, **_feeding_fields(feeding, frs_score))
+
+
+def apply_devices(tank: Tank):
+    _upsert(tank, device_states=_device_states(tank.id))
+
+
+def apply_water_change(tank: Tank):
+    _upsert(tank)
+
+
+# ──────────────────────────────────────────────
+# 복구 (히스토리 → 스냅샷 재구성)
+# ──────────────────────────────────────────────
+
+def rebuild(tanks=None, missing_only: bool = False) -> int:
+    """
+    히스토리 테이블에서 스냅샷 재구성. 어항 수와 무관하게 모델별 1쿼리로 읽고 어항마다 upsert
+    (전체 삭제 후 재생성하지 않음 — 동시 수신이 갱신한 스냅샷·챗봇 요약 블록이 사라지지 않음).
+    missing_only=True 면 스냅샷이 없는 어항만 생성 (배포 스크립트용 — 운영 중인 스냅샷은 건드리지 않음).
+    """
+    tanks = tanks if tanks is not None else Tank.objects.all()
+    if missing_only:
+        tanks = tanks.filter(state__isnull=True)
+    tanks    = list(tanks.with_latest_reading())
+    tank_ids = [t.id for t in tanks]
+
+    behaviors = FishBehavior.objects.latest_for_tanks(tank_ids)
+    feedings  = FeedingEvent.objects.select_related('response').latest_for_tanks(tank_ids)
+
+    devices = {}
+    for tank_id, dtype, is_on in DeviceControl.objects.filter(tank_id__in=tank_ids).values_list('tank_id', 'type', 'is_on'):
+        devices.setdefault(tank_id, {})[dtype] = is_on
+
+    count = 0
+    for tank in tanks:
+        fields = {
+            'device_states':     devices.get(tank.id, {}),
+            'next_water_change': _next_water_change(tank),
+            'updated_at':        timezone.now(),
+        }
+        reading = tank.latest_reading
+        if reading is not None:
+            fields.update(_reading_fields(reading))
+        if tank.id in behaviors:
+            fields.update(_behavior_fields(behaviors[tank.id]))
+        if tank.id in feedings:
+            feeding  = feedings[tank.id]
+            response = getattr(feeding, 'response', None)
+            fields.update(_feeding_fields(feeding, response.frs_score if response else None))
+        count += _write(tank.id, fields, overwrite=not missing_only)
+    return count
@@ -0,0 +1,57 @@
+"""
+apps/monitoring/stream_views.py
+
+대시보드 실시간 스트림 (Server-Sent Events)
+- GET /monitoring/dashboard/<tank_id>/stream/
+- 변경된 필드만 push: state(센서/행동/급이/장치), log(EventLog)
+- ASGI(fish.asgi) 에서만 스트리밍. WSGI 에서는 204 → 클라이언트가 새로고침 방식으로 전환
+"""
+
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+
+from .events import get_broker, tank_channel
+from .models import Tank
+
+
+def _sse(event: dict) -> str:
+    payload = json.dumps(event['data'], cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"event: {event['type']}\ndata: {payload}\n\n"
+
+
+async def _event_stream(tank_id):
+    keepalive = getattr(settings, 'MONITORING_STREAM_KEEPALIVE', 15)
+    max_age   = getattr(settings, 'MONITORING_STREAM_MAX_AGE', 300)
+    loop      = asyncio.get_running_loop()
+
+    # max_age 가 지나면 연결을 끊고 EventSource 가 재접속하게 함 (retry: ms)
+    yield "retry: 3000\n\n"
+    deadline = loop.time() + max_age
+    async with get_broker().subscribe(tank_channel(tank_id)) as sub:
+        while loop.time() < deadline:
+            event = await sub.get(timeout=keepalive)
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield _sse(event)
+
+
+@login_required
+async def dashboard_stream(request, tank_id):
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    if not await Tank.objects.filter(id=tank_id, user=user).aexists():
+        raise Http404
+
+    response = StreamingHttpResponse(_event_stream(tank_id), content_type='text/event-stream')
+    response['Cache-Control']     = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,91 @@
+"""
+apps/monitoring/tank_cache.py
+
+Pi REST API 용 어항 메타데이터 캐시 (Django 캐시 프레임워크)
+- 키: tank:<id>, 값: Tank 필드 dict → 요청마다 Tank.objects.get 을 하지 않음
+- command_version 은 제어 때마다 QuerySet.update 로 바뀌므로 캐시하지 않음 (접근하면 지연 로딩)
+  · 명령 버전은 device_commands / DeviceControl.version 에서 직접 읽음
+- Tank 저장/삭제 시 signals 에서 invalidate()
+- 백엔드는 settings.MONITORING_TANK_CACHE 별칭 (기본 'default' — LocMem, 다중 워커는 CACHES 로 Redis 등 지정)
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Tank
+
+# 캐시하지 않는 필드 (자주 바뀌고 signal 없이 갱신됨)
+EXCLUDED_FIELDS = ('command_version',)
+
+_MISSING = 'missing'   # 없는 어항도 캐시 (잘못된 tank_id 반복 요청 대비)
+
+
+def _cache():
+    return caches[getattr(settings, 'MONITORING_TANK_CACHE', 'default')]
+
+
+def _ttl() -> int:
+    return getattr(settings, 'MONITORING_TANK_CACHE_TTL', 300)
+
+
+def _key(tank_id) -> str:
+    return f"tank:{tank_id}"
+
+
+def _fields() -> list:
+    return [f.attname for f in Tank._meta.concrete_fields if f.attname not in EXCLUDED_FIELDS]
+
+
+def _dump(tank: Tank) -> dict:
+    return {name: getattr(tank, name) for name in _fields()}
+
+
+def _load(data: dict) -> Tank:
+    """캐시 값 → Tank (제외 필드는 지연 로딩)"""
+    names = list(data)
+    return Tank.from_db('default', names, [data[n] for n in names])
+
+
+def _query(tank_ids) -> dict:
+    return {t.id: t for t in Tank.objects.filter(id__in=tank_ids).only(*_fields())}
+
+
+def get(tank_id):
+    """어항 1개. 없으면 None."""
+    return get_many([tank_id]).get(tank_id)
+
+
+def get_many(tank_ids) -> dict:
+    """{id: Tank} — 캐시에 없는 것만 쿼리 1회"""
+    tank_ids = [t for t in dict.fromkeys(tank_ids) if t is not None]
+    cache    = _cache()
+    cached   = cache.get_many([_key(t) for t in tank_ids])
+
+    tanks, missing = {}, []
+    for tank_id in tank_ids:
+        data = cached.get(_key(tank_id))
+        if data is None:
+            missing.append(tank_id)
+        elif data != _MISSING:
+            tanks[tank_id] = _load(data)
+
+    if missing:
+        found = _query(missing)
+        cache.set_many({_key(t): _dump(found[t]) if t in found else _MISSING for t in missing}, _ttl())
+        tanks.update(found)
+    return tanks
+
+
+async def aget(tank_id):
+    """async 뷰용 get()"""
+    cache = _cache()
+    data  = await cache.aget(_key(tank_id))
+    if data is None:
+        tank = await Tank.objects.filter(id=tank_id).only(*_fields()).afirst()
+        await cache.aset(_key(tank_id), _dump(tank) if tank else _MISSING, _ttl())
+        return tank
+    return None if data == _MISSING else _load(data)
+
+
+def invalidate(tank_id):
+    _cache().delete(_key(tank_id))
@@ -1,3 +1,1026 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Sum
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from fish.middleware import AsyncWhiteNoiseMiddleware
+
+from monitoring import (
+    archive, auth, codecs, context, control, device_commands, events, jobs, partitions, rollups, scoring, standards,
+    state, tank_cache,
+)
+from monitoring.models import (
+    Tank, SensorReading, SensorRollup, EventLog, ArchiveSegment, WaterStandard, DeviceControl, IngestJob, TankState,
+    GatewayKey, IngestReceipt, DeletedTank,
+)
+
+
+class SensorBatchTest(TestCase):
+    """일괄 수신은 전부 검증한 뒤 한 번에 저장하고, 하나라도 틀리면 아무것도 저장하지 않아야 함"""
+
+    def setUp(self):
+        user       = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank  = Tank.objects.create(user=user, name='어항')
+        self.other = Tank.objects.create(user=user, name='다른 어항')
+
+    def _post(self, body):
+        return self.client.post('/monitoring/api/sensor/batch/', json.dumps(body),
+                                content_type='application/json', secure=True)
+
+    def test_bulk_insert(self):
+        response = self._post({'readings': [
+            {'tank_id': self.tank.id, 'temperature': 22.0, 'ph': 7.4},
+            {'tank_id': self.other.id, 'temperature': 23.0, 'ph': 7.0},
+            {'tank_id': self.tank.id, 'temperature': 22.5, 'ph': 7.2},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['count'], 3)
+        self.assertEqual(body['reading_ids'], list(SensorReading.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(IngestJob.objects.count(), 2)
+
+        # 배열 그대로 보내도 됨
+        self.assertEqual(self._post([{'tank_id': self.tank.id, 'temperature': 22.0, 'ph': 7.4}]).json()['count'], 1)
+
+    def test_partial_invalid_rejects_all(self):
+        response = self._post([
+            {'tank_id': self.tank.id, 'temperature': 22.0, 'ph': 7.4},
+            {'tank_id': self.tank.id, 'temperature': 'hot', 'ph': 7.4},
+            {'tank_id': self.tank.id, 'ph': 7.4},
+            'reading',
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['index'] for e in response.json()['errors']], [1, 2, 3])
+        self.assertFalse(SensorReading.objects.exists())
+        self.assertFalse(IngestJob.objects.exists())
+
+    def test_bad_tank_ids(self):
+        response = self._post([
+            {'tank_id': self.tank.id, 'temperature': 22.0, 'ph': 7.4},
+            {'tank_id': 'abc', 'temperature': 22.0, 'ph': 7.4},
+            {'tank_id': [self.tank.id], 'temperature': 22.0, 'ph': 7.4},
+            {'tank_id': 999_999, 'temperature': 22.0, 'ph': 7.4},
+            {'temperature': 22.0, 'ph': 7.4},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['index'] for e in response.json()['errors']], [1, 2, 3, 4])
+        self.assertFalse(SensorReading.objects.exists())
+
+    def test_empty_and_oversized(self):
+        self.assertEqual(self._post([]).status_code, 400)
+        self.assertEqual(self._post({'readings': 'x'}).status_code, 400)
+        too_many = [{'tank_id': self.tank.id, 'temperature': 22.0, 'ph': 7.4}] * 1001
+        self.assertEqual(self._post(too_many).status_code, 413)
+
+
+class LatestForTanksTest(TestCase):
+    """어항별 최신 1건은 한 번의 쿼리로, 측정 시각이 같으면 나중에 저장된 행이어야 함"""
+
+    def setUp(self):
+        user       = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank  = Tank.objects.create(user=user, name='어항')
+        self.other = Tank.objects.create(user=user, name='다른 어항')
+
+    def test_latest_per_tank(self):
+        now = timezone.now()
+        SensorReading.objects.create(tank=self.tank, temperature=20.0, ph=7.0, measured_at=now - timedelta(hours=1))
+        # 늦게 도착했지만 측정은 더 이른 값
+        SensorReading.objects.create(tank=self.tank, temperature=21.0, ph=7.0, measured_at=now - timedelta(hours=2))
+        latest = SensorReading.objects.create(tank=self.other, temperature=23.0, ph=7.0, measured_at=now)
+
+        with self.assertNumQueries(1):
+            rows = SensorReading.objects.latest_for_tanks([self.tank.id, self.other.id, 999_999])
+        self.assertEqual({t: r.temperature for t, r in rows.items()}, {self.tank.id: 20.0, self.other.id: 23.0})
+        self.assertEqual(rows[self.other.id].id, latest.id)
+        self.assertEqual(SensorReading.objects.latest_for_tanks([]), {})
+
+    def test_ties_prefer_last_saved(self):
+        at  = timezone.now()
+        ids = [SensorReading.objects.create(tank=self.tank, temperature=t, ph=7.0, measured_at=at).id
+               for t in (20.0, 21.0, 22.0)]
+        self.assertEqual(SensorReading.objects.latest_for_tanks([self.tank.id])[self.tank.id].id, ids[-1])
+        self.assertEqual(Tank.objects.with_latest_reading().get(id=self.tank.id).latest_id, ids[-1])
+
+
+class TankStateTest(TestCase):
+    """스냅샷은 수신 후처리로 갱신되고, 재구성은 어항마다 upsert 해서 운영 중인 값을 지우지 않아야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항')
+
+    def _post(self, url, body):
+        response = self.client.post(url, json.dumps({'tank_id': self.tank.id, **body}),
+                                    content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 200)
+
+    def test_ingest_updates_snapshot(self):
+        published = []
+        # 커밋 콜백 중 발행만 확인 — 작업 큐 알림은 막고 run_pending() 으로 처리
+        with patch.object(events.get_broker(), 'publish', lambda channel, event: published.append((channel, event))), \
+                patch.object(jobs, '_notify', lambda tank_ids: None), self.captureOnCommitCallbacks(execute=True):
+            self._post('/monitoring/api/sensor/', {'temperature': 23.5, 'ph': 7.1})
+            self._post('/monitoring/api/behavior/', {'status': 'GOOD', 'fish_count': 5, 'activity_level': 0.8})
+            jobs.run_pending()
+
+        snapshot = TankState.objects.get(tank=self.tank)
+        self.assertEqual((snapshot.temperature, snapshot.ph), (23.5, 7.1))
+        self.assertEqual((snapshot.behavior_status, snapshot.fish_count), ('GOOD', 5))
+
+        states = [event['data'] for channel, event in published if event['type'] == 'state']
+        self.assertEqual({channel for channel, _ in published}, {events.tank_channel(self.tank.id)})
+        self.assertEqual(states[0]['temperature'], 23.5)
+        self.assertNotIn('temperature', states[-1])   # 바뀐 필드만
+
+    def test_rebuild_upserts(self):
+        self._post('/monitoring/api/sensor/', {'temperature': 23.5, 'ph': 7.1})
+        jobs.run_pending()
+        TankState.objects.filter(tank=self.tank).update(temperature=99.0, context='[어항]')
+
+        self.assertEqual(state.rebuild(missing_only=True), 0)
+        self.assertEqual(TankState.objects.get(tank=self.tank).temperature, 99.0)
+
+        self.assertEqual(state.rebuild(), 1)
+        snapshot = TankState.objects.get(tank=self.tank)
+        self.assertEqual(snapshot.temperature, 23.5)
+        self.assertEqual(snapshot.context, '[어항]')
+
+        other = Tank.objects.create(user=self.tank.user, name='새 어항')
+        call_command('rebuild_tank_state', '--missing', stdout=StringIO())
+        self.assertTrue(TankState.objects.filter(tank=other).exists())
+        self.assertEqual(TankState.objects.get(tank=self.tank).temperature, 23.5)
+
+
+@override_settings(MONITORING_STREAM_KEEPALIVE=0.05, MONITORING_STREAM_MAX_AGE=5)
+class DashboardStreamTest(TestCase):
+    """대시보드 SSE 는 ASGI 에서 어항 채널 이벤트를 push 하고, WSGI 에서는 204 로 새로고침 방식으로 넘겨야 함"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=self.user, name='어항')
+        self.url  = f'/monitoring/dashboard/{self.tank.id}/stream/'
+
+    async def test_pushes_tank_events(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url, secure=True)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        chunks  = aiter(response.streaming_content)
+        channel = events.tank_channel(self.tank.id)
+        self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+        asyncio.get_running_loop().call_later(
+            0.01, events.get_broker().publish, channel, {'type': 'state', 'data': {'temperature': 23.5}},
+        )
+        self.assertEqual(await anext(chunks), b'event: state\ndata: {"temperature": 23.5}\n\n')
+        self.assertEqual(events.get_broker().subscriber_count(channel), 1)
+        self.assertEqual(await anext(chunks), b': keepalive\n\n')
+
+    async def test_subscription_is_removed(self):
+        broker = events.LocalBroker()
+        async with broker.subscribe('tank:1') as sub:
+            broker.publish('tank:1', {'type': 'log', 'data': {}})
+            broker.publish('tank:2', {'type': 'log', 'data': {}})
+            self.assertEqual(await sub.get(timeout=1), {'type': 'log', 'data': {}})
+            self.assertIsNone(await sub.get(timeout=0.01))
+        self.assertEqual(broker.subscriber_count('tank:1'), 0)
+
+    def test_wsgi_falls_back(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, 204)
+
+    async def test_other_users_tank(self):
+        other = await get_user_model().objects.acreate(username='other')
+        await self.async_client.aforce_login(other)
+        self.assertEqual((await self.async_client.get(self.url, secure=True)).status_code, 404)
+
+
+class DeviceCommandTest(TestCase):
+    """장치 명령은 버전으로 변경분만 주고, 변경이 없으면 304, 클라이언트 버전이 앞서 있으면 전체 목록"""
+
+    def setUp(self):
+        self.user   = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank   = Tank.objects.create(user=self.user, name='어항')
+        self.heater = DeviceControl.objects.create(tank=self.tank, type='HEATER')
+        self.pump   = DeviceControl.objects.create(tank=self.tank, type='AIR_PUMP')
+        self.url    = f'/monitoring/api/commands/{self.tank.id}/'
+
+    def _toggle(self, device_type):
+        self.client.force_login(self.user)
+        self.client.post(f'/monitoring/toggle-device/{self.tank.id}/', {'device_type': device_type}, secure=True)
+
+    def test_versions_and_not_modified(self):
+        self.assertEqual(self.client.get(self.url, secure=True).json()['version'], 0)
+        self._toggle('HEATER')
+        self._toggle('AIR_PUMP')
+
+        body = self.client.get(self.url, {'since': 1}, secure=True).json()
+        self.assertEqual(body['version'], 2)
+        self.assertEqual(body['devices'], [{'type': 'AIR_PUMP', 'is_on': True, 'is_auto': True}])
+
+        # WSGI 에서는 대기하지 않고 바로 304
+        started  = time.monotonic()
+        response = self.client.get(self.url, {'since': 2, 'timeout': 30}, secure=True)
+        self.assertEqual(response.status_code, 304)
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_client_ahead_gets_full_list(self):
+        self._toggle('HEATER')
+        body = self.client.get(self.url, {'since': 7}, secure=True).json()
+        self.assertEqual(body['version'], 1)
+        self.assertEqual(len(body['devices']), 2)
+
+    def test_tank_saves_keep_command_version(self):
+        # 제어 직전에 읽은 어항을 수정·환수 저장해도 명령 버전이 되돌아가지 않아야 함
+        stale = Tank.objects.get(id=self.tank.id)
+        device_commands.bump_version(self.tank.id, [self.heater.id])
+        self.client.force_login(self.user)
+        with patch('monitoring.views.get_object_or_404', return_value=stale):
+            self.client.post(f'/monitoring/edit/{self.tank.id}/', {'name': '새 이름', 'target_temp': '25'}, secure=True)
+            self.client.post(f'/monitoring/water-change/{self.tank.id}/', secure=True)
+        self.assertEqual(Tank.objects.get(id=self.tank.id).name, '새 이름')
+        self.assertEqual(Tank.objects.values_list('command_version', flat=True).get(id=self.tank.id), 1)
+        # 다음 변경은 Pi 가 아직 못 본 버전이어야 함 (되돌아갔으면 since=1 에 304)
+        self._toggle('AIR_PUMP')
+        self.assertEqual(self.client.get(self.url, {'since': 1}, secure=True).json()['version'], 2)
+
+    async def test_long_poll_wakes_on_change(self):
+        channel = device_commands.command_channel(self.tank.id)
+        request = asyncio.create_task(self.async_client.get(self.url, {'since': 0, 'timeout': 10}, secure=True))
+        await asyncio.sleep(0.2)
+        self.assertFalse(request.done())
+
+        version = await sync_to_async(device_commands.bump_version)(self.tank.id, [self.heater.id])
+        events.get_broker().publish(channel, {'version': version})
+        response = await asyncio.wait_for(request, 2)
+        self.assertEqual(response.json()['devices'], [{'type': 'HEATER', 'is_on': False, 'is_auto': True}])
+
+        started = asyncio.get_running_loop().time()
+        response = await self.async_client.get(self.url, {'since': version, 'timeout': 0.1}, secure=True)
+        self.assertEqual(response.status_code, 304)
+        self.assertGreaterEqual(asyncio.get_running_loop().time() - started, 0.1)
+
+    async def test_static_middleware_stays_async(self):
+        async def view(request):
+            return 'async'
+
+        middleware = AsyncWhiteNoiseMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(await middleware(RequestFactory().get('/monitoring/api/commands/1/')), 'async')
+        self.assertFalse(iscoroutinefunction(AsyncWhiteNoiseMiddleware(lambda request: 'sync')))
+
+
+class SensorRollupTest(TestCase):
+    """수신 시 증분 갱신한 롤업은 원본으로 백필한 결과와 같아야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항')
+
+    def _post(self, url, body):
+        response = self.client.post(url, json.dumps(body), content_type='application/json', secure=True)
+        jobs.run_pending()
+        return response
+
+    def _snapshot(self):
+        return sorted(
+            (r.granularity, r.bucket_start, r.count, r.temperature_min, r.temperature_max, r.temperature_sum, r.ph_sum)
+            for r in SensorRollup.objects.filter(tank=self.tank)
+        )
+
+    def test_incremental_matches_backfill(self):
+        self._post('/monitoring/api/sensor/', {'tank_id': self.tank.id, 'temperature': 20.0, 'ph': 7.0})
+        self._post('/monitoring/api/sensor/batch/', [
+            {'tank_id': self.tank.id, 'temperature': 24.0, 'ph': 7.4},
+            {'tank_id': self.tank.id, 'temperature': 22.0, 'ph': 6.8},
+        ])
+
+        incremental = self._snapshot()
+        self.assertEqual({row[0] for row in incremental}, {'MINUTE', 'HOUR', 'DAY'})
+
+        day = SensorRollup.objects.get(tank=self.tank, granularity='DAY')
+        self.assertEqual(day.count, 3)
+        self.assertEqual((day.temperature_min, day.temperature_max), (20.0, 24.0))
+        self.assertEqual(day.temperature, 22.0)
+
+        call_command('build_rollups', stdout=StringIO())
+        self.assertEqual(self._snapshot(), incremental)
+
+    def test_metric_arriving_after_bucket_created(self):
+        at = timezone.now()
+        rollups.apply_readings([SensorReading(tank=self.tank, temperature=22.0, ph=7.0, dissolved_oxygen=None,
+                                              measured_at=at)])
+        rollups.apply_readings([SensorReading(tank=self.tank, temperature=23.0, ph=7.0, dissolved_oxygen=6.5,
+                                              measured_at=at)])
+        minute = SensorRollup.objects.get(tank=self.tank, granularity='MINUTE')
+        self.assertEqual((minute.dissolved_oxygen_min, minute.dissolved_oxygen_max), (6.5, 6.5))
+        self.assertEqual((minute.temperature_min, minute.temperature_max), (22.0, 23.0))
+
+    def test_late_readings_use_measured_at(self):
+        now = timezone.now()
+        self._post('/monitoring/api/sensor/', {'tank_id': self.tank.id, 'temperature': 20.0, 'ph': 7.0})
+        # 장애 뒤 재전송 — 측정 시각이 과거이고 순서도 뒤섞임
+        self._post('/monitoring/api/sensor/batch/', [
+            {'tank_id': self.tank.id, 'temperature': 24.0, 'ph': 7.4,
+             'measured_at': (now - timedelta(hours=3)).isoformat()},
+            {'tank_id': self.tank.id, 'temperature': 22.0, 'ph': 6.8,
+             'measured_at': (now - timedelta(hours=5)).timestamp()},
+        ])
+
+        incremental = self._snapshot()
+        self.assertEqual(len([row for row in incremental if row[0] == 'MINUTE']), 3)
+        call_command('build_rollups', stdout=StringIO())
+        self.assertEqual(self._snapshot(), incremental)
+
+        # 스냅샷은 가장 늦게 측정된 값 그대로
+        self.assertEqual(TankState.objects.get(tank=self.tank).temperature, 20.0)
+        self.assertEqual(self.tank.readings.first().temperature, 20.0)
+
+        future = {'tank_id': self.tank.id, 'temperature': 20.0, 'ph': 7.0,
+                  'measured_at': (now + timedelta(hours=1)).isoformat()}
+        self.assertEqual(self._post('/monitoring/api/sensor/', future).status_code, 400)
+
+
+class ExportTest(TestCase):
+    """내보내기는 스트리밍 응답으로 필드·기간 선택을 지원해야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항')
+        self.client.force_login(user)
+        for temp in (21.0, 22.0, 23.0):
+            SensorReading.objects.create(tank=self.tank, temperature=temp, ph=7.4)
+        EventLog.objects.create(tank=self.tank, level='WARNING', message='수온 경고')
+
+    def _get(self, **params):
+        return self.client.get(f'/monitoring/reports/export/{self.tank.id}/', params, secure=True)
+
+    def test_csv_field_selection(self):
+        response = self._get(type='readings', fields='temperature,ph')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines, ['temperature,ph', '21.0,7.4', '22.0,7.4', '23.0,7.4'])
+
+    def test_ndjson_and_date_range(self):
+        response = self._get(type='logs', format='ndjson', start=str(timezone.localdate()))
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(r['level'], r['message']) for r in rows], [('WARNING', '수온 경고')])
+
+        response = self._get(type='logs', format='ndjson', end=str(timezone.localdate() - timedelta(days=1)))
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_invalid_params(self):
+        self.assertEqual(self._get(type='tanks').status_code, 400)
+        self.assertEqual(self._get(fields='password').status_code, 400)
+        self.assertEqual(self._get(start='어제').status_code, 400)
+        self.assertEqual(self._get(start='2024-02-30').status_code, 400)
+        self.assertEqual(self._get(end='2024-05-01T25:00').status_code, 400)
+
+
+@skipUnless(archive.pa is not None, "pyarrow 미설치")
+class ArchiveTest(TestCase):
+    """아카이브로 옮긴 월은 원본에서 빠지고 내보내기에서는 그대로 보여야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항')
+        self.client.force_login(user)
+        now = timezone.now()
+        for days, temp in ((200, 20.0), (180, 21.0), (1, 22.0)):
+            SensorReading.objects.create(tank=self.tank, temperature=temp, ph=7.4, measured_at=now - timedelta(days=days))
+
+    def _export(self):
+        response = self.client.get(f'/monitoring/reports/export/{self.tank.id}/',
+                                   {'format': 'ndjson', 'fields': 'id,temperature,measured_at'}, secure=True)
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_archive_round_trip(self):
+        before = self._export()
+        with TemporaryDirectory() as tmp, self.settings(MONITORING_ARCHIVE_DIR=tmp):
+            call_command('archive_history', stdout=StringIO())
+
+            self.assertEqual(list(SensorReading.objects.values_list('temperature', flat=True)), [22.0])
+            self.assertEqual(sum(s.row_count for s in ArchiveSegment.objects.filter(kind='readings')), 2)
+            self.assertEqual(self._export(), before)
+
+    def test_failed_merge_keeps_live_segment(self):
+        kind, (tank_id, month) = 'readings', archive.pending_months('readings', timezone.now())[0]
+        with TemporaryDirectory() as tmp, self.settings(MONITORING_ARCHIVE_DIR=tmp):
+            segment = archive.archive_month(kind, tank_id, month)
+            SensorReading.objects.create(tank=self.tank, temperature=19.0, ph=7.4, measured_at=segment.first_at)
+
+            def files():
+                return sorted(os.path.relpath(os.path.join(d, f), tmp) for d, _, fs in os.walk(tmp) for f in fs)
+
+            # 원본 삭제 중 DB 오류 → 매니페스트·기존 파일 그대로, 새 파일은 치움
+            with patch('django.db.models.query.QuerySet.delete', side_effect=DatabaseError('boom')), \
+                    self.assertRaises(DatabaseError):
+                archive.archive_month(kind, tank_id, month)
+            self.assertEqual(files(), [segment.path])
+            self.assertEqual(ArchiveSegment.objects.get().path, segment.path)
+            self.assertTrue(SensorReading.objects.filter(temperature=19.0).exists())
+
+            with self.captureOnCommitCallbacks(execute=True):
+                merged = archive.archive_month(kind, tank_id, month)
+            self.assertEqual(files(), [merged.path])
+            self.assertEqual(merged.row_count, segment.row_count + 1)
+            self.assertFalse(SensorReading.objects.filter(temperature=19.0).exists())
+            temps = [row[0] for row in archive.iter_rows(kind, self.tank, ['temperature'])]
+            self.assertEqual(len(temps), ArchiveSegment.objects.aggregate(n=Sum('row_count'))['n'])
+            self.assertEqual(temps.count(19.0), 1)
+
+    def test_tank_delete_removes_segment_files(self):
+        with TemporaryDirectory() as tmp, self.settings(MONITORING_ARCHIVE_DIR=tmp):
+            call_command('archive_history', stdout=StringIO())
+            self.assertTrue(ArchiveSegment.objects.exists())
+            with self.captureOnCommitCallbacks(execute=True):
+                self.tank.delete()
+            self.assertFalse(ArchiveSegment.objects.exists())
+            self.assertEqual([f for _, _, fs in os.walk(tmp) for f in fs], [])
+
+
+class RetentionTest(TestCase):
+    """보관 기간이 지난 히스토리와 삭제된 어항의 히스토리는 enforce_retention 이 정리해야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항')
+        now = timezone.now()
+        for days, temp in ((100, 20.0), (40, 21.0), (1, 22.0)):
+            SensorReading.objects.create(tank=self.tank, temperature=temp, ph=7.4, measured_at=now - timedelta(days=days))
+
+    def test_expires_old_rows(self):
+        call_command('build_rollups', stdout=StringIO())
+        rollups_before = SensorRollup.objects.count()
+
+        with self.settings(MONITORING_RETENTION={'readings': 30}):
+            call_command('enforce_retention', stdout=StringIO())
+        self.assertEqual(list(SensorReading.objects.values_list('temperature', flat=True)), [22.0])
+        self.assertEqual(SensorRollup.objects.count(), rollups_before)
+
+    def test_tank_delete_leaves_history_for_purge(self):
+        other = Tank.objects.create(user=self.tank.user, name='다른 어항')
+        SensorReading.objects.create(tank=other, temperature=23.0, ph=7.0)
+
+        tank_id = self.tank.id
+        with CaptureQueriesContext(connection) as ctx:
+            self.tank.delete()
+        self.assertFalse([q for q in ctx.captured_queries if 'monitoring_sensorreading' in q['sql']])
+        self.assertEqual(SensorReading.objects.count(), 4)
+        self.assertEqual(SensorReading.objects.of_existing_tanks().count(), 1)
+
+        self.assertEqual(list(DeletedTank.objects.values_list('tank_id', flat=True)), [tank_id])
+
+        # 전체 테이블을 훑지 않고 삭제된 어항의 행만 찾음
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(partitions.purge_orphans('readings', dry_run=True), 3)
+        self.assertFalse([q for q in ctx.captured_queries if 'NOT' in q['sql']])
+        call_command('enforce_retention', stdout=StringIO())
+        self.assertEqual(list(SensorReading.objects.values_list('tank_id', flat=True)), [other.id])
+        self.assertFalse(DeletedTank.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', "PostgreSQL 전용 (월 파티션)")
+class PartitionTest(TestCase):
+    """PostgreSQL 에서는 히스토리가 월 파티션에 들어가고, 파티션 단위로 만들고 지워야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항')
+
+    def _table_of(self, reading):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tableoid::regclass::text FROM monitoring_sensorreading WHERE id = %s", [reading.id])
+            return cursor.fetchone()[0]
+
+    def test_migration_partitions_history(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relname, relkind FROM pg_class WHERE relname = ANY(%s)",
+                           [['monitoring_sensorreading', 'monitoring_fishbehavior']])
+            self.assertEqual(dict(cursor.fetchall()), {'monitoring_sensorreading': 'p', 'monitoring_fishbehavior': 'p'})
+
+        month = partitions.month_of(timezone.now())
+        self.assertIn(month, partitions.partitions(SensorReading))
+        reading = SensorReading.objects.create(tank=self.tank, temperature=22.0, ph=7.4)
+        self.assertEqual(self._table_of(reading), partitions.partition_name('monitoring_sensorreading', month))
+
+    def test_create_attach_drop_cycle(self):
+        # 파티션이 없는 과거 월 → default 가 받았다가 ensure() 가 파티션으로 옮겨 붙임
+        old = SensorReading.objects.create(tank=self.tank, temperature=20.0, ph=7.0,
+                                           measured_at=timezone.now() - timedelta(days=365 * 3))
+        name = partitions.partition_name('monitoring_sensorreading', partitions.month_of(old.measured_at))
+        self.assertEqual(self._table_of(old), 'monitoring_sensorreading_default')
+
+        self.assertIn(name, partitions.ensure())
+        self.assertEqual(self._table_of(old), name)
+        self.assertEqual(partitions.ensure(), [])
+
+        result = partitions.expire('readings', timezone.now() - timedelta(days=365))
+        self.assertEqual(result['partitions'], [name])
+        self.assertNotIn(name, partitions.partitions(SensorReading).values())
+        self.assertFalse(SensorReading.objects.filter(id=old.id).exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', "PostgreSQL 전용 (월 파티션)")
+class PartitionMigrationTest(TransactionTestCase):
+    """0020 되돌리기/다시 적용 시 행이 그대로 옮겨져야 함"""
+
+    def _relkind(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [table])
+            return cursor.fetchone()[0]
+
+    def _count(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM monitoring_sensorreading")
+            return cursor.fetchone()[0]
+
+    def test_round_trip(self):
+        user = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        tank = Tank.objects.create(user=user, name='어항')
+        now  = timezone.now()
+        for days in (400, 30, 0):
+            SensorReading.objects.create(tank=tank, temperature=22.0, ph=7.4, measured_at=now - timedelta(days=days))
+
+        executor = MigrationExecutor(connection)
+        leaf     = executor.loader.graph.leaf_nodes('monitoring')
+        try:
+            executor.migrate([('monitoring', '0019_measured_at')])
+            self.assertEqual(self._relkind('monitoring_sensorreading'), 'r')
+            self.assertEqual(self._count(), 3)
+        finally:
+            executor.loader.build_graph()
+            executor.migrate(leaf)
+        self.assertEqual(self._relkind('monitoring_sensorreading'), 'p')
+        self.assertEqual(self._count(), 3)
+        # 가장 오래된 측정값의 월부터 파티션이 만들어짐 → default 는 비어 있음
+        self.assertIn(partitions.month_of(now - timedelta(days=400)), partitions.partitions(SensorReading))
+        self.assertEqual(partitions._default_months(SensorReading, 'default'), [])
+
+
+class ScoringTest(TestCase):
+    """NumPy 일괄 채점은 스칼라 채점과 같은 결과를 내야 함"""
+
+    def _samples(self):
+        # 기준값 경계 포함
+        temps = [15.0, 20.99, 21.0, 22.0, 22.5, 23.0, 23.99, 24.0, 24.01, 30.0]
+        phs   = [5.9, 6.0, 6.4, 6.5, 7.4, 7.45, 7.5, 7.9, 8.0, 8.6]
+        dos   = [0.0, 3.99, 4.0, 4.5, 5.0, 7.0]
+        turbs = [0.0, 20.0, 30.0, 30.1, 50.0, 50.1, 100.0, 100.1]
+        return [(t, p, d, u) for t in temps for p in phs for d in dos for u in turbs]
+
+    def test_score_many_matches_score_one(self):
+        samples = self._samples()
+        expected = [scoring.score_one(*s) for s in samples]
+        self.assertEqual(scoring.score_many(*zip(*samples)).tolist(), expected)
+
+    def test_thresholds_match(self):
+        samples = self._samples()
+        flags   = scoring.thresholds(*zip(*samples))
+        for i, s in enumerate(samples[::37]):
+            one = scoring.thresholds(*s)
+            for name, value in one.items():
+                self.assertEqual(bool(flags[name][i * 37]), bool(value), (name, s))
+
+    def test_rescore(self):
+        user = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        tank = Tank.objects.create(user=user, name='어항')
+        SensorReading.objects.create(tank=tank, temperature=22.0, ph=7.4, dissolved_oxygen=7.0, water_quality_score=0)
+        SensorReading.objects.create(tank=tank, temperature=30.0, ph=7.4, dissolved_oxygen=7.0, water_quality_score=70)
+
+        self.assertEqual(scoring.rescore(SensorReading.objects.all()), 1)
+        self.assertEqual(sorted(SensorReading.objects.values_list('water_quality_score', flat=True)), [70, 100])
+
+
+class WaterStandardTest(TestCase):
+    """어항별 기준은 어종 → target(켠 어항만) → 어항 프로필 순으로 적용되고 저장 시 캐시가 갱신되어야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항', fish_species='구피, 네온테트라', target_temp=22.0)
+        standards.invalidate()
+
+    def test_layering_and_cache(self):
+        self.assertEqual(standards.for_tank(self.tank).standards, scoring.WATER_STANDARDS)
+
+        WaterStandard.objects.create(name='구피', species='구피', temp_min=24.0, temp_max=28.0, temp_optimal=26.0)
+        # target_temp 는 항상 값이 있음 — 켜지 않으면 어종 범위 그대로
+        self.assertEqual(standards.for_tank(self.tank).standards['temp_min'], 24.0)
+
+        self.tank.use_target_standards = True
+        rules = standards.for_tank(self.tank)
+        # target_temp 22 → 구피 범위(24~28, 최적 26)를 4도 내림
+        self.assertEqual((rules.standards['temp_min'], rules.standards['temp_max']), (20.0, 24.0))
+
+        with self.assertNumQueries(0):
+            self.assertIs(standards.for_tank(self.tank), rules)
+
+        WaterStandard.objects.create(name='어항 전용', tank=self.tank, temp_max=23.0)
+        self.assertEqual(standards.for_tank(self.tank).standards['temp_max'], 23.0)
+
+    def test_ingest_uses_tank_rules(self):
+        self.tank.target_temp          = 26.0
+        self.tank.use_target_standards = True
+        self.tank.save()
+        self.client.post('/monitoring/api/sensor/', json.dumps({
+            'tank_id': self.tank.id, 'temperature': 26.0, 'ph': 7.4, 'dissolved_oxygen': 7.0,
+        }), content_type='application/json', secure=True)
+        self.assertEqual(SensorReading.objects.get().water_quality_score, 100)
+
+
+class AutoControlTest(TestCase):
+    """자동 제어는 연속 확인·최소 유지 시간을 지키고 전환을 한 번에 기록해야 함"""
+
+    def setUp(self):
+        cache.clear()
+        user        = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank   = Tank.objects.create(user=user, name='어항', target_temp=22.0)
+        self.heater = DeviceControl.objects.create(tank=self.tank, type='HEATER')
+        DeviceControl.objects.create(tank=self.tank, type='AIR_PUMP')
+
+    def _reading(self, temp, do_val=7.0):
+        return SensorReading(tank=self.tank, temperature=temp, ph=7.4, dissolved_oxygen=do_val)
+
+    def test_confirm_and_dwell(self):
+        self.assertEqual(control.apply(self.tank, self._reading(19.0)), [])
+        self.assertEqual(control.apply(self.tank, self._reading(19.0)), ['HEATER:ON'])
+        self.heater.refresh_from_db()
+        self.assertTrue(self.heater.is_on)
+
+        # 최소 유지 시간 안에서는 끄기 조건이 이어져도 유지
+        for _ in range(3):
+            self.assertEqual(control.apply(self.tank, self._reading(23.0)), [])
+
+        with patch('monitoring.control.time.time', return_value=time.time() + 600):
+            self.assertEqual(control.apply(self.tank, self._reading(23.0)), ['HEATER:OFF'])
+
+    def test_band_resets_pending(self):
+        control.apply(self.tank, self._reading(19.0))
+        control.apply(self.tank, self._reading(21.5))   # 히스테리시스 구간
+        self.assertEqual(control.apply(self.tank, self._reading(19.0)), [])
+
+    def test_safety_is_immediate(self):
+        self.assertEqual(control.apply(self.tank, self._reading(22.0, do_val=3.0)), ['AIR_PUMP:ON'])
+
+    @override_settings(MONITORING_CONTROL={'HEATER': {'confirm': 1}})
+    def test_transitions_are_batched(self):
+        with CaptureQueriesContext(connection) as ctx:
+            actions = control.apply(self.tank, self._reading(19.0, do_val=3.0))
+        self.assertEqual(sorted(actions), ['AIR_PUMP:ON', 'HEATER:ON'])
+
+        sqls = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual(len([q for q in sqls if q.startswith('INSERT INTO "monitoring_eventlog"')]), 1)
+        self.assertEqual(len([q for q in sqls if q.startswith('UPDATE "monitoring_devicecontrol" SET "is_on"')]), 1)
+        self.assertEqual(EventLog.objects.filter(tank=self.tank).count(), 2)
+
+
+class IngestJobTest(TestCase):
+    """수신 후처리는 작업 큐에서 어항별 순서대로, 실패하면 재시도해야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항')
+        self.ran  = []
+
+    def _job(self, kind):
+        return jobs.enqueue(self.tank.id, kind, {})
+
+    def _record(self, tank, payload):
+        self.ran.append('ok')
+
+    def _fail(self, tank, payload):
+        self.ran.append('fail')
+        raise RuntimeError('boom')
+
+    def test_ingest_defers_follow_up(self):
+        response = self.client.post('/monitoring/api/behavior/', json.dumps({
+            'tank_id': self.tank.id, 'is_anomaly': True, 'note': '바닥에 가라앉음', 'feeding_score': 80,
+        }), content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(EventLog.objects.exists())
+        self.assertEqual(jobs.metrics()['depth'], 1)
+
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(EventLog.objects.get().message, '[AI 이상 감지] 바닥에 가라앉음')
+        self.assertTrue(TankState.objects.get(tank=self.tank).is_anomaly)
+        self.assertFalse(IngestJob.objects.exists())
+
+    def test_retry_keeps_tank_order(self):
+        with patch.dict(jobs.HANDLERS, {'first': self._fail, 'second': self._record}):
+            self._job('first')
+            self._job('second')
+            jobs.run_pending()
+            # 선두 작업이 재시도 대기 중이면 뒤 작업도 대기
+            self.assertEqual(self.ran, ['fail'])
+            metrics = jobs.metrics()
+            self.assertEqual((metrics['depth'], metrics['depth_by_kind']), (2, {'first': 1, 'second': 1}))
+            self.assertIn('RuntimeError', IngestJob.objects.get(kind='first').last_error)
+
+            jobs.HANDLERS['first'] = self._record
+            IngestJob.objects.update(available_at=timezone.now())
+            self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(self.ran, ['fail', 'ok', 'ok'])
+        self.assertEqual(jobs.metrics()['depth'], 0)
+
+    @override_settings(MONITORING_JOBS={'MAX_ATTEMPTS': 1})
+    def test_gives_up_after_max_attempts(self):
+        with patch.dict(jobs.HANDLERS, {'first': self._fail, 'second': self._record}):
+            self._job('first')
+            self._job('second')
+            jobs.run_pending()
+        self.assertEqual(self.ran, ['fail', 'ok'])
+        self.assertEqual(list(IngestJob.objects.values_list('kind', 'status')), [('first', 'FAILED')])
+        self.assertEqual(jobs.metrics()['failed'], 1)
+
+    def test_local_queue_sweeps_stranded_jobs(self):
+        # 알림 없이 남은 작업(재시작 전 대기 · 임대 만료) 은 훑기로 다시 깨움, 아직 때가 안 된 재시도는 제외
+        other   = Tank.objects.create(user=self.tank.user, name='어항2')
+        waiting = Tank.objects.create(user=self.tank.user, name='어항3')
+        now     = timezone.now()
+        IngestJob.objects.create(tank=self.tank, kind='first', payload={}, available_at=now, created_at=now)
+        IngestJob.objects.create(tank=other, kind='first', payload={}, status='RUNNING', available_at=now,
+                                 locked_until=now - timedelta(seconds=1), created_at=now)
+        IngestJob.objects.create(tank=waiting, kind='first', payload={}, available_at=now + timedelta(minutes=5),
+                                 created_at=now)
+
+        with patch.object(jobs.threading, 'Thread'):
+            queue = jobs.LocalQueue(workers=1)
+        with patch.object(queue, 'notify') as notify:
+            queue.sweep()
+        self.assertEqual(sorted(c.args[0] for c in notify.call_args_list), [self.tank.id, other.id])
+
+
+class GatewayKeyTest(TestCase):
+    """게이트웨이 키는 지정된 어항에만 쓸 수 있고, 캐시된 인증도 폐기 즉시 막혀야 함"""
+
+    def setUp(self):
+        auth.invalidate()
+        self.addCleanup(auth.invalidate)
+        user          = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank     = Tank.objects.create(user=user, name='어항')
+        self.other    = Tank.objects.create(user=user, name='다른 어항')
+        self.key, self.raw = auth.create_key('pi-1', [self.tank])
+
+    def _post(self, tank, key=None):
+        headers = {'X-API-KEY': key} if key else {}
+        return self.client.post('/monitoring/api/sensor/', json.dumps({
+            'tank_id': tank.id, 'temperature': 22.0, 'ph': 7.4,
+        }), content_type='application/json', secure=True, headers=headers)
+
+    def test_key_is_scoped_to_tanks(self):
+        self.assertEqual(self._post(self.tank, self.raw).status_code, 200)
+        self.assertEqual(self._post(self.other, self.raw).status_code, 403)
+        self.assertEqual(self._post(self.tank).status_code, 401)
+        self.assertEqual(self._post(self.tank, f"{self.key.prefix}.wrong").status_code, 401)
+
+        response = self.client.get(f'/monitoring/api/commands/{self.other.id}/', secure=True,
+                                   headers={'X-API-KEY': self.raw})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(GatewayKey.objects.get().key_hash, auth.hash_key(self.raw))
+
+    def test_cached_until_revoked(self):
+        self.assertEqual(auth.authenticate(self.raw).tank_ids, {self.tank.id})
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(auth.authenticate(self.raw))
+
+        self.key.is_active = False
+        self.key.save()
+        self.assertIsNone(auth.authenticate(self.raw))
+
+
+class TankCacheTest(TestCase):
+    """Pi API 는 캐시된 어항 정보를 쓰고, 어항 저장·삭제 시 캐시가 갱신되어야 함"""
+
+    def setUp(self):
+        cache.clear()
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항', target_temp=22.0)
+
+    def _post(self):
+        return self.client.post('/monitoring/api/sensor/', json.dumps({
+            'tank_id': self.tank.id, 'temperature': 22.0, 'ph': 7.4,
+        }), content_type='application/json', secure=True)
+
+    def test_ingest_skips_tank_query(self):
+        self._post()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._post().status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "monitoring_tank"' in q['sql']])
+
+    def test_invalidated_by_signals(self):
+        self.assertEqual(tank_cache.get(self.tank.id).target_temp, 22.0)
+        self.tank.target_temp = 25.0
+        self.tank.save()
+        self.assertEqual(tank_cache.get(self.tank.id).target_temp, 25.0)
+
+        tank_id = self.tank.id
+        self.tank.delete()
+        self.assertIsNone(tank_cache.get(tank_id))
+
+    def test_commands_version_without_tank_row(self):
+        heater = DeviceControl.objects.create(tank=self.tank, type='HEATER')
+        device_commands.bump_version(self.tank.id, [heater.id])
+        response = self.client.get(f'/monitoring/api/commands/{self.tank.id}/', secure=True)
+        self.assertEqual(response.json()['version'], 1)
+        self.assertEqual(response.json()['devices'], [{'type': 'HEATER', 'is_on': False, 'is_auto': True}])
+
+
+@skipUnless(None not in (codecs.msgpack, codecs.cbor2, codecs.zstandard), "msgpack/cbor2/zstandard 미설치")
+class BodyCodecTest(TestCase):
+    """MessagePack/CBOR 바디와 gzip/zstd 압축, 컬럼 배치를 JSON 과 같게 받아야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항', target_temp=22.0)
+
+    def _post(self, url, body, content_type, encoding=None):
+        headers = {'Content-Encoding': encoding} if encoding else {}
+        return self.client.post(url, body, content_type=content_type, secure=True, headers=headers)
+
+    def test_columnar_msgpack_zstd(self):
+        body = codecs.msgpack.packb({
+            'tank_id': self.tank.id,
+            'fields':  ['temperature', 'ph', 'dissolved_oxygen'],
+            'columns': [[22.0, 19.0, 23.0], [7.4, 7.4, 7.0], [7.0, 7.0, 3.0]],
+        })
+        response = self._post('/monitoring/api/sensor/batch/', codecs.zstandard.ZstdCompressor().compress(body),
+                              'application/msgpack', 'zstd')
+        self.assertEqual(response.json()['count'], 3)
+
+        readings = list(SensorReading.objects.order_by('id'))
+        self.assertEqual([r.temperature for r in readings], [22.0, 19.0, 23.0])
+        self.assertEqual([r.water_level for r in readings], [100.0] * 3)
+        self.assertEqual([r.water_quality_score for r in readings],
+                         [scoring.score_one(r.temperature, r.ph, r.dissolved_oxygen, r.turbidity) for r in readings])
+
+    def test_zstd_multiple_frames(self):
+        body   = json.dumps({'tank_id': self.tank.id, 'temperature': 22.0, 'ph': 7.4}).encode()
+        zstd   = codecs.zstandard.ZstdCompressor()
+        frames = zstd.compress(body[:10]) + zstd.compress(body[10:])
+        response = self._post('/monitoring/api/sensor/', frames, 'application/json', 'zstd')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(SensorReading.objects.get().ph, 7.4)
+
+    def test_cbor_gzip_single(self):
+        body = gzip.compress(codecs.cbor2.dumps({'tank_id': self.tank.id, 'temperature': 22.0, 'ph': 7.4}))
+        response = self._post('/monitoring/api/sensor/', body, 'application/cbor', 'gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(SensorReading.objects.get().ph, 7.4)
+
+    @override_settings(MONITORING_MAX_BODY_SIZE=1024)
+    def test_rejects_bad_bodies(self):
+        bomb = gzip.compress(json.dumps({'tank_id': self.tank.id, 'note': 'x' * 10_000}).encode())
+        self.assertEqual(self._post('/monitoring/api/behavior/', bomb, 'application/json', 'gzip').status_code, 413)
+        self.assertEqual(self._post('/monitoring/api/sensor/', b'{}', 'application/json', 'br').status_code, 415)
+
+        ragged = json.dumps({'tank_id': self.tank.id, 'fields': ['temperature', 'ph'], 'columns': [[22.0], []]})
+        self.assertEqual(self._post('/monitoring/api/sensor/batch/', ragged, 'application/json').status_code, 400)
+        self.assertFalse(SensorReading.objects.exists())
+
+
+class IdempotencyTest(TestCase):
+    """같은 seq 로 재전송하면 새로 저장하지 않고 처음 응답을 그대로 돌려줘야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='어항', target_temp=22.0)
+
+    def _post(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type='application/json', secure=True)
+
+    def test_single_retry_replays_first_response(self):
+        body  = {'tank_id': self.tank.id, 'gateway_id': 'pi-1', 'seq': 41, 'temperature': 22.0, 'ph': 7.4}
+        first = self._post('/monitoring/api/sensor/', body).json()
+
+        with CaptureQueriesContext(connection) as ctx:
+            again = self._post('/monitoring/api/sensor/', body).json()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertTrue(again.pop('duplicate'))
+        self.assertEqual(again, first)
+        self.assertEqual(SensorReading.objects.count(), 1)
+        self.assertEqual(IngestJob.objects.count(), 1)
+
+        # 다른 게이트웨이의 같은 seq 는 별개
+        other = self._post('/monitoring/api/sensor/', {**body, 'gateway_id': 'pi-2'}).json()
+        self.assertNotIn('duplicate', other)
+        self.assertEqual(SensorReading.objects.count(), 2)
+
+    def test_seq_without_gateway_is_per_tank(self):
+        # 공용 키 · 게이트웨이 id 없음 → 어항마다 seq 를 따로 셈
+        other = Tank.objects.create(user=self.tank.user, name='어항2', target_temp=22.0)
+        self._post('/monitoring/api/sensor/', {'tank_id': self.tank.id, 'seq': 1, 'temperature': 22.0, 'ph': 7.4})
+        second = self._post('/monitoring/api/sensor/', {'tank_id': other.id, 'seq': 1, 'temperature': 23.0, 'ph': 7.2})
+        self.assertNotIn('duplicate', second.json())
+        self.assertEqual(SensorReading.objects.get(tank=other).temperature, 23.0)
+
+        again = self._post('/monitoring/api/sensor/', {'tank_id': other.id, 'seq': 1, 'temperature': 23.0, 'ph': 7.2})
+        self.assertTrue(again.json()['duplicate'])
+
+        batch = self._post('/monitoring/api/sensor/batch/', {'readings': [
+            {'tank_id': self.tank.id, 'seq': 2, 'temperature': 22.1, 'ph': 7.4},
+            {'tank_id': other.id,     'seq': 2, 'temperature': 23.1, 'ph': 7.2},
+        ]}).json()
+        self.assertEqual(batch['duplicates'], 0)
+        self.assertEqual(SensorReading.objects.count(), 4)
+
+    def test_batch_skips_seen_records(self):
+        def item(seq, temp):
+            return {'tank_id': self.tank.id, 'seq': seq, 'temperature': temp, 'ph': 7.4}
+
+        first = self._post('/monitoring/api/sensor/batch/',
+                           {'gateway_id': 'pi-1', 'readings': [item(1, 22.0), item(2, 22.5)]}).json()
+        again = self._post('/monitoring/api/sensor/batch/',
+                           {'gateway_id': 'pi-1', 'readings': [item(2, 22.5), item(3, 23.0), item(3, 23.0)]}).json()
+
+        self.assertEqual((again['count'], again['duplicates']), (1, 2))
+        self.assertEqual(again['reading_ids'][0], first['reading_ids'][1])
+        self.assertEqual(again['reading_ids'][1], again['reading_ids'][2])
+        self.assertEqual(list(SensorReading.objects.order_by('id').values_list('temperature', flat=True)),
+                         [22.0, 22.5, 23.0])
+
+    def test_purge_command(self):
+        self._post('/monitoring/api/behavior/', {'tank_id': self.tank.id, 'gateway_id': 'pi-1', 'seq': 1})
+        IngestReceipt.objects.update(created_at=timezone.now() - timedelta(days=30))
+        call_command('purge_ingest_receipts', days=7, stdout=StringIO())
+        self.assertFalse(IngestReceipt.objects.exists())
+
+
+class TankContextTest(TestCase):
+    """챗봇용 어항 요약 블록은 수신 후처리에서 갱신되고, 프롬프트에는 토큰 예산 안에서만 들어가야 함"""
+
+    def setUp(self):
+        user      = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.tank = Tank.objects.create(user=user, name='거실 어항', capacity=60, fish_species='구피', target_temp=26.0)
+
+    def _post(self, url, body):
+        response = self.client.post(url, json.dumps({'tank_id': self.tank.id, **body}),
+                                    content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 200)
+
+    def test_refreshed_on_ingest(self):
+        earlier = (timezone.now() - timedelta(hours=3)).isoformat()
+        self._post('/monitoring/api/sensor/', {'temperature': 24.0, 'ph': 7.0, 'measured_at': earlier})
+        self._post('/monitoring/api/sensor/', {'temperature': 25.0, 'ph': 7.2})
+        self._post('/monitoring/api/feeding/', {'amount_g': 0.4, 'frs_score': 35})
+        self._post('/monitoring/api/growth/', {'fish_id': 1, 'size_index': 4.0, 'estimated_length': 3.5,
+                                               'growth_stage': 'YOUNG'})
+        jobs.run_pending()
+
+        lines = TankState.objects.get(tank=self.tank).context.split('\n')
+        self.assertEqual(lines[0], '[거실 어항] 60L · 구피 · 목표 26.0°C / pH 7.4')
+        self.assertTrue(lines[1].startswith('현재('))
+        self.assertIn('수온 25.0°C, pH 7.20', lines[1])
+        self.assertIn('[FRS 저조] 급이 반응 35점', lines[2])
+        self.assertIn('수온 24.0~25.0°C(평균 24.5, ↑1.0)', lines[3])
+        self.assertIn('급이(24h): 1회 0.4g, 최근 FRS 35점', '\n'.join(lines))
+        self.assertIn('성장(', lines[-1])
+        self.assertIn('유어', lines[-1])
+
+    def test_refreshed_on_tank_save_and_when_stale(self):
+        self.client.force_login(self.tank.user)
+        self.client.post(f'/monitoring/edit/{self.tank.id}/', {'name': '안방 어항', 'target_temp': '25'}, secure=True)
+        self.assertTrue(TankState.objects.get(tank=self.tank).context.startswith('[안방 어항] 60L · 구피 · 목표 25.0°C'))
+
+        # 수신이 멈춘 뒤 오래된 블록은 읽을 때 다시 계산 — 24h 경고가 창 밖으로 빠짐
+        EventLog.objects.create(tank=self.tank, level='WARNING', message='수온 급변')
+        context.refresh(self.tank)
+        self.assertIn('수온 급변', async_to_sync(context.for_user)(self.tank.user)[0])
+        EventLog.objects.update(created_at=timezone.now() - timedelta(days=2))
+        TankState.objects.update(context_at=timezone.now() - timedelta(hours=1))
+        self.assertIn('경고(24h): 없음', async_to_sync(context.for_user)(self.tank.user)[0])
+
+    def test_grounding_only_for_own_tank_questions(self):
+        context.refresh(self.tank)
+        user = self.tank.user
+        self.assertEqual(async_to_sync(context.grounding)(user, '구피 적정 수온은?'), '')
+        self.assertIn('[거실 어항]', async_to_sync(context.grounding)(user, '우리 어항 수온 괜찮아?'))
+        self.assertIn('[거실 어항]', async_to_sync(context.grounding)(user, '거실 어항 물 갈아야 해?'))
+        self.assertIn('[거실 어항]', async_to_sync(context.grounding)(user))
+        # "현재"·"지금" 은 내 어항이 아님, "문제 어항" 의 "제 어항" 도 아님
+        self.assertEqual(async_to_sync(context.grounding)(user, '현재 추천하는 사료는?'), '')
+        self.assertEqual(async_to_sync(context.grounding)(user, '문제 어항 증상 알려줘'), '')
+        self.assertIn('[거실 어항]', async_to_sync(context.grounding)(user, '제 어항 pH 괜찮나요?'))
+
+    def test_prompt_block_budget(self):
+        blocks = ['[A]\n현재: 수온 25.0°C\n24h: 수온 24.0~25.0°C', '[B]\n현재: 수온 22.0°C']
+        self.assertEqual(context.prompt_block(blocks, budget=1000), '\n'.join(blocks))
+        # 예산이 모자라면 어항마다 뒤 줄부터 빠짐
+        cost = sum(context.estimate_tokens(line) for line in ['[A]', '현재: 수온 25.0°C', '[B]', '현재: 수온 22.0°C'])
+        self.assertEqual(context.prompt_block(blocks, budget=cost),
+                         '[A]\n현재: 수온 25.0°C\n[B]\n현재: 수온 22.0°C')
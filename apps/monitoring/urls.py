@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views, api_views
+from . import views, api_views, stream_views
 
 app_name = 'monitoring'
 
@@ -9,6 +9,7 @@ urlpatterns = [
     path('',                         views.index,           name='index'),
     path('dashboard/',               views.dashboard,       name='dashboard_default'),
     path('dashboard/<int:tank_id>/', views.dashboard,       name='dashboard'),
+    path('dashboard/<int:tank_id>/stream/', stream_views.dashboard_stream, name='dashboard_stream'),
 
     # ── [2. 어항 관리 CRUD] ────────────────────────────────────────
     path('tanks/',                   views.tank_list,       name='tank_list'),
@@ -32,13 +33,16 @@ urlpatterns = [
     path('reports/',                             views.ai_report_list,     name='ai_report_list'),
     path('reports/delete/<int:reading_id>/',     views.delete_report_data, name='delete_report_data'),
     path('reports/download/<int:tank_id>/',      views.download_report,    name='download_report'),
+    path('reports/export/<int:tank_id>/',        views.export_data,        name='export_data'),
 
     # ── [7. Raspberry Pi REST API] ─────────────────────────────────
     path('api/sensor/',                     api_views.receive_sensor_data,    name='api_sensor'),
+    path('api/sensor/batch/',               api_views.receive_sensor_batch,   name='api_sensor_batch'),
     path('api/behavior/',                   api_views.receive_fish_behavior,  name='api_behavior'),
     path('api/feeding/',                    api_views.receive_feeding_event,  name='api_feeding'),
     path('api/growth/',                     api_views.receive_growth_record,  name='api_growth'),
     path('api/pattern/',                    api_views.receive_activity_pattern, name='api_pattern'),
     path('api/commands/<int:tank_id>/',     api_views.get_pending_commands,   name='api_commands'),
     path('api/health/',                     api_views.health_check,           name='api_health'),
+    path('api/jobs/',                       api_views.job_metrics,            name='api_jobs'),
 ]
\ No newline at end of file
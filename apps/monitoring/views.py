@@ -1,21 +1,22 @@
 import json
-import os
 import re
-import PIL.Image
-import google.generativeai as genai
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.core.paginator import Paginator
-from django.conf import settings
 from django.views.decorators.http import require_POST
 from django.apps import apps
 from django.db import transaction
 from django.utils import timezone
 from datetime import date, timedelta
 
-from .models import Tank, EventLog, DeviceControl, SensorReading, FishBehavior
+from chatbot import answers, images, streaming
+
+from . import control, device_commands, exports, rollups
+from . import context as tank_context
+from . import state as tank_state
+from .models import Tank, TankState, EventLog, DeviceControl, SensorReading, FishBehavior
 
 
 # ──────────────────────────────────────────────
@@ -25,13 +26,13 @@ from .models import Tank, EventLog, DeviceControl, SensorReading, FishBehavior
 @login_required
 def index(request):
     """메인 페이지: 사용자 어항 목록 및 상태 요약"""
-    all_tanks = Tank.objects.filter(user=request.user).order_by('-id')
+    all_tanks = Tank.objects.filter(user=request.user).select_related('state').order_by('-id')
     paginator = Paginator(all_tanks, 10)
     page_obj  = paginator.get_page(request.GET.get('page'))
 
     tank_data = []
     for tank in page_obj:
-        latest = tank.readings.order_by('-created_at').first()
+        latest = tank.latest_reading
         status = "NORMAL"
         if latest and latest.temperature is not None:
             try:
@@ -56,29 +57,30 @@ def index(request):
     return render(request, 'core/index.html', {
         'tank_data': tank_data,
         'page_obj':  page_obj,
-        'has_tanks': all_tanks.exists(),
+        'has_tanks': paginator.count > 0,
     })
 
 
 @login_required
 def dashboard(request, tank_id=None):
     """특정 어항 상세 대시보드"""
+    tanks = Tank.objects.select_related('state')
     if tank_id:
-        tank = get_object_or_404(Tank, id=tank_id, user=request.user)
+        tank = get_object_or_404(tanks, id=tank_id, user=request.user)
     else:
-        tank = Tank.objects.filter(user=request.user).first()
+        tank = tanks.filter(user=request.user).first()
 
     if not tank:
         return render(request, 'monitoring/dashboard.html', {'tank': None})
 
-    # 최신 센서 데이터
-    latest = tank.readings.order_by('-created_at').first()
-
-    # 최신 AI 행동 분석
-    latest_behavior = tank.behaviors.order_by('-created_at').first() if hasattr(tank, 'behaviors') else None
-
-    # 장치 상태
-    devices = {d.type: d for d in DeviceControl.objects.filter(tank=tank)}
+    # 최신 센서 / AI 행동 분석 / 장치 상태 — TankState 스냅샷 1행에서
+    try:
+        snapshot = tank.state
+    except TankState.DoesNotExist:
+        snapshot = TankState(tank=tank)
+    latest          = snapshot.latest_reading
+    latest_behavior = snapshot.latest_behavior
+    devices         = snapshot.device_states
 
     # 최근 로그 3개
     logs = EventLog.objects.filter(tank=tank).order_by('-created_at')[:3]
@@ -108,13 +110,14 @@ def dashboard(request, tank_id=None):
         'd_day':                 d_day,
         'is_water_changed_today': is_water_changed_today,
         'user_tanks':            user_tanks,
+        'status_labels':         dict(FishBehavior.STATUS_CHOICES),
         # 장치별 ON/OFF 편의 변수
-        'heater_on':   devices.get('HEATER',   None) and devices['HEATER'].is_on,
-        'cooling_on':  devices.get('COOLING',  None) and devices['COOLING'].is_on,
-        'filter_on':   devices.get('FILTER',   None) and devices['FILTER'].is_on,
-        'air_pump_on': devices.get('AIR_PUMP', None) and devices['AIR_PUMP'].is_on,
-        'feeder_on':   devices.get('FEEDER',   None) and devices['FEEDER'].is_on,
-        'light_on':    devices.get('LIGHT',    None) and devices['LIGHT'].is_on,
+        'heater_on':   devices.get('HEATER',   False),
+        'cooling_on':  devices.get('COOLING',  False),
+        'filter_on':   devices.get('FILTER',   False),
+        'air_pump_on': devices.get('AIR_PUMP', False),
+        'feeder_on':   devices.get('FEEDER',   False),
+        'light_on':    devices.get('LIGHT',    False),
     })
 
 
@@ -141,6 +144,7 @@ def add_tank(request):
                     user=request.user,
                     name=request.POST.get('name', '새 어항'),
                     target_temp=float(request.POST.get('target_temp') or 26.0),
+                    use_target_standards=bool(request.POST.get('use_target_standards')),
                     water_change_period=int(request.POST.get('water_change_period') or 7),
                     last_water_change=date.today(),
                 )
@@ -157,7 +161,9 @@ def edit_tank(request, tank_id):
     if request.method == 'POST':
         tank.name        = request.POST.get('name', tank.name)
         tank.target_temp = float(request.POST.get('target_temp') or 26.0)
-        tank.save()
+        tank.use_target_standards = bool(request.POST.get('use_target_standards'))
+        # command_version 은 제어 때마다 F() 로 올라가므로 바꾼 필드만 (덮어쓰면 Pi 가 명령 변경을 놓침)
+        tank.save(update_fields=['name', 'target_temp', 'use_target_standards'])
         messages.success(request, "수정 완료.")
         return redirect('monitoring:tank_list')
     return render(request, 'monitoring/tank_form.html', {'tank': tank, 'title': '어항 수정'})
@@ -222,6 +228,9 @@ def toggle_device(request, tank_id):
     device, _ = DeviceControl.objects.get_or_create(tank=tank, type=request.POST.get('device_type'))
     device.is_on = not device.is_on
     device.save()
+    device_commands.bump_version(tank.id, [device.id])
+    control.note_manual(tank.id, device.type)
+    tank_state.apply_devices(tank)
 
     # 이벤트 로그 기록
     state = "ON" if device.is_on else "OFF"
@@ -238,8 +247,10 @@ def toggle_device(request, tank_id):
 def perform_water_change(request, tank_id):
     tank = get_object_or_404(Tank, id=tank_id, user=request.user)
     tank.last_water_change = date.today()
-    tank.save()
+    tank.save(update_fields=['last_water_change'])
+    tank_state.apply_water_change(tank)
     EventLog.objects.create(tank=tank, level='INFO', message="환수 완료 기록")
+    tank_context.refresh(tank)
     return JsonResponse({'status': 'success'})
 
 
@@ -263,14 +274,16 @@ def ai_report_list(request):
             selected_tank = tanks.first()
 
     sort_order = request.GET.get('sort', 'desc')
-    order_by   = '-created_at' if sort_order == 'desc' else 'created_at'
+    order_by   = '-measured_at' if sort_order == 'desc' else 'measured_at'
+    range_key  = request.GET.get('range', 'recent')
 
     report_data = []
+    granularity = None
     behaviors   = []
     reports     = []
 
     if selected_tank:
-        report_data = selected_tank.readings.all().order_by(order_by)
+        report_data, granularity = rollups.report_rows(selected_tank, range_key, sort_order)
         behaviors   = selected_tank.behaviors.all().order_by(order_by)[:10] if hasattr(selected_tank, 'behaviors') else []
         try:
             ReportModel = apps.get_model('reports', 'Report')
@@ -285,6 +298,9 @@ def ai_report_list(request):
         'behaviors':     behaviors,
         'reports':       reports,
         'sort':          sort_order,
+        'range':         range_key,
+        'range_choices': rollups.REPORT_RANGE_CHOICES,
+        'granularity':   granularity,
         'has_tanks':     has_tanks,
     })
 
@@ -312,36 +328,75 @@ def download_report(request, tank_id):
     else:
         start_date = today - timedelta(days=1)
 
-    readings = tank.readings.filter(created_at__gte=start_date).order_by('-created_at')
+    readings = (tank.readings.filter(measured_at__gte=start_date).order_by('-measured_at')
+                .values_list('measured_at', 'temperature', 'ph', 'dissolved_oxygen', 'turbidity', 'water_quality_score'))
 
-    content = (
-        f"[{tank.name}] {period.upper()} 분석 기록\n"
-        f"기준일: {today.strftime('%Y-%m-%d')}\n"
-        + "=" * 40 + "\n"
-    )
-    if readings.exists():
-        for r in readings:
-            content += (
-                f"{r.created_at.strftime('%Y-%m-%d %H:%M')} | "
-                f"수온:{r.temperature}°C | "
-                f"pH:{r.ph} | "
-                f"DO:{r.dissolved_oxygen}mg/L | "
-                f"탁도:{r.turbidity}NTU | "
-                f"수질점수:{r.water_quality_score}\n"
+    def lines():
+        yield (
+            f"[{tank.name}] {period.upper()} 분석 기록\n"
+            f"기준일: {today.strftime('%Y-%m-%d')}\n"
+            + "=" * 40 + "\n"
+        )
+        empty = True
+        for measured_at, temp, ph, do_val, turbidity, score in readings.iterator(chunk_size=exports.CHUNK_SIZE):
+            empty = False
+            yield (
+                f"{timezone.localtime(measured_at).strftime('%Y-%m-%d %H:%M')} | "
+                f"수온:{temp}°C | "
+                f"pH:{ph} | "
+                f"DO:{do_val}mg/L | "
+                f"탁도:{turbidity}NTU | "
+                f"수질점수:{score}\n"
             )
-    else:
-        content += "데이터가 없습니다."
+        if empty:
+            yield "데이터가 없습니다."
 
-    response = HttpResponse(content, content_type='text/plain; charset=utf-8')
+    response = StreamingHttpResponse(lines(), content_type='text/plain; charset=utf-8')
     response['Content-Disposition'] = f'attachment; filename="{tank.name}_{period}_report.txt"'
     return response
 
 
+@login_required
+def export_data(request, tank_id):
+    """
+    히스토리 원본 내보내기 (스트리밍)
+    GET ?type=readings|behaviors|feedings|growth|logs
+        &format=csv|ndjson
+        &start=2024-05-01&end=2024-05-31   (날짜 또는 ISO datetime, end 날짜는 그날 포함)
+        &fields=measured_at,temperature,ph  (생략 시 전체)
+    """
+    tank  = get_object_or_404(Tank, id=tank_id, user=request.user)
+    kind  = request.GET.get('type', 'readings')
+    fmt   = request.GET.get('format', 'csv')
+    model = exports.EXPORT_MODELS.get(kind)
+    if model is None:
+        return HttpResponseBadRequest(f"type 은 {', '.join(exports.EXPORT_MODELS)} 중 하나여야 합니다.")
+    if fmt not in exports.EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"format 은 {', '.join(exports.EXPORT_FORMATS)} 중 하나여야 합니다.")
+
+    try:
+        fields = exports.parse_fields(model, request.GET.get('fields'))
+        start  = exports.parse_bound(request.GET.get('start'))
+        end    = exports.parse_bound(request.GET.get('end'), end=True)
+    except exports.ExportError as e:
+        return HttpResponseBadRequest(str(e))
+
+    rows     = exports.iter_rows(model, tank, fields, start, end)
+    response = StreamingHttpResponse(exports.stream(fmt, fields, rows), content_type=exports.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="tank{tank.id}_{kind}.{fmt}"'
+    return response
+
+
 # ──────────────────────────────────────────────
 # [5] AI 챗봇
 # ──────────────────────────────────────────────
 
-def _build_prompt(display_name: str, user_message: str) -> str:
+def _build_prompt(display_name: str, user_message: str, tanks: str = '') -> str:
+    """tanks: 사용자 어항 요약 (tank_context.prompt_block) — 있으면 답변 근거로 제공"""
+    grounding = (
+        f"7. 질문이 내 어항 상태와 관련 있으면 아래 [내 어항 현황] 수치를 근거로 답해.\n\n"
+        f"[내 어항 현황]\n{tanks}\n\n"
+    ) if tanks else "\n"
     return (
         f"너는 어항 관리 전문가 챗봇이야.\n\n"
         f"[절대 규칙 - 하나라도 어기면 안 됨]\n"
@@ -350,7 +405,8 @@ def _build_prompt(display_name: str, user_message: str) -> str:
         f"3. 핵심 키워드 + 수치만. 설명 문장 금지.\n"
         f"4. '~입니다' '~합니다' '~세요' '~군요' 문장체 완전 금지.\n"
         f"5. 어항 등록, 어항 정보 없음 언급 완전 금지. 질문에만 답해.\n"
-        f"6. 마지막 줄은 🐠 로 짧게 마무리.\n\n"
+        f"6. 마지막 줄은 🐠 로 짧게 마무리.\n"
+        f"{grounding}"
         f"질문: {user_message}"
     )
 
@@ -385,9 +441,14 @@ def _format_reply(raw: str, display_name: str) -> str:
     return reply
 
 
+LLM_MODEL  = "gemini-1.5-flash-8b"
+LLM_CONFIG = {'max_output_tokens': 150, 'temperature': 0.3}
+
+
 @login_required
 @require_POST
-def chat_api(request):
+async def chat_api(request):
+    """Accept: text/event-stream 이면 토큰 스트리밍 (chatbot.streaming), 아니면 JSON"""
     try:
         if request.content_type == 'application/json':
             user_message = json.loads(request.body).get('message', '').strip()
@@ -396,41 +457,51 @@ def chat_api(request):
             user_message = request.POST.get('message', '').strip()
             image_file   = request.FILES.get('image')
 
-        display_name = getattr(request.user, 'nickname', None) or request.user.username
-        api_key      = os.getenv('GEMINI_API_KEY_1') or getattr(settings, 'GEMINI_API_KEY', None)
-
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name="gemini-1.5-flash-8b")
+        user         = await request.auser()
+        display_name = getattr(user, 'nickname', None) or user.username
 
-        prompt_parts = [_build_prompt(display_name, user_message)]
+        # 내 어항 질문·사진이면 수신 시 미리 만들어 둔 어항 요약 (TankState 1쿼리, 히스토리 조회 없음)
+        tanks        = await tank_context.grounding(user, None if image_file else user_message)
+        prompt_parts = [_build_prompt(display_name, user_message, tanks)]
 
         if image_file:
-            img = PIL.Image.open(image_file)
-            img.thumbnail((512, 512))
-            prompt_parts.append(img)
-
-        response = model.generate_content(
-            prompt_parts,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=150,
-                temperature=0.3,
-            ),
-        )
+            # 축소·EXIF 제거·재인코딩은 풀에서 (같은 사진은 캐시)
+            try:
+                prompt_parts.append(await images.prepare(image_file, max_side=512))
+            except images.ImageError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
-        raw   = response.text if response and response.text else ""
-        reply = _format_reply(raw, display_name)
+        async def save(reply):
+            try:
+                ChatMessage = apps.get_model('chatbot', 'ChatMessage')
+                await ChatMessage.objects.acreate(
+                    user=user,
+                    message=user_message or "사진 분석",
+                    response=reply,
+                )
+            except:
+                pass
 
-        try:
-            ChatMessage = apps.get_model('chatbot', 'ChatMessage')
-            ChatMessage.objects.create(
-                user=request.user,
-                message=user_message or "사진 분석",
-                response=reply,
-            )
-        except:
-            pass
+        # 캐시된 답변도 LLM 원문 — _format_reply 를 그대로 거침
+        def finish(raw):
+            return _format_reply(raw, display_name)
+
+        # 어항 현황을 근거로 한 답변은 측정값마다 달라지므로 캐시하지 않음
+        question = None if image_file or tanks else user_message
+        scope    = 'monitoring'
+
+        if streaming.wants_stream(request):
+            return streaming.response(prompt_parts, finish=finish, save=save,
+                                      clean=lambda chunk: chunk.replace('*', ''),
+                                      scope=scope, question=question,
+                                      model=LLM_MODEL, config=LLM_CONFIG)
+
+        raw   = await answers.agenerate(prompt_parts, scope=scope, question=question,
+                                        model=LLM_MODEL, config=LLM_CONFIG)
+        reply = finish(raw)
+        await save(reply)
 
         return JsonResponse({'status': 'success', 'reply': reply, 'response': reply})
 
     except Exception as e:
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
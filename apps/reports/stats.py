@@ -0,0 +1,158 @@
+"""
+apps/reports/stats.py
+
+통계 리포트 집계
+- 센서 지표별 평균/최소/최대/표준편차 + 기준치 이탈 건수를 SensorReading 집계 쿼리 1회로 계산
+- EventLog 레벨별 건수는 집계 쿼리 1회
+- 행을 Python 으로 가져오지 않으므로 기간이 길어도 (tank, -measured_at) 인덱스 범위 스캔 1번
+- Parquet 아카이브로 옮겨진 월은 monitoring.archive.aggregate 로 컬럼 단위 집계 후 합산
+"""
+
+from django.db.models import Avg, Count, Max, Min, Q, StdDev
+
+from monitoring import archive, standards
+from monitoring.models import EventLog, SensorReading
+
+
+# 지표 → (표시명, 단위)
+METRICS = {
+    'temperature':         ('수온',     '°C'),
+    'ph':                  ('pH',       ''),
+    'dissolved_oxygen':    ('용존산소', 'mg/L'),
+    'turbidity':           ('탁도',     'NTU'),
+    'water_level':         ('수위',     '%'),
+    'water_quality_score': ('수질점수', '점'),
+}
+
+
+def _out_of_range(ranges: dict) -> dict:
+    """지표별 기준치 이탈 조건 (ranges: 어항 기준의 허용 범위)"""
+    conds = {}
+    for m, (lo, hi) in ranges.items():
+        cond = Q()
+        if lo is not None:
+            cond |= Q(**{f'{m}__lt': lo})
+        if hi is not None:
+            cond |= Q(**{f'{m}__gt': hi})
+        conds[m] = cond
+    return conds
+
+
+def _merge_archive(row: dict, archived: dict) -> dict:
+    """원본 집계 결과(row)에 아카이브 집계를 합침. 표준편차는 합·제곱합으로 재계산."""
+    n_hot, n_arch = row['count'], archived['count']
+    n = n_hot + n_arch
+    merged = {'count': n}
+    merged['first_at'] = min(filter(None, [row['first_at'], archived['first_at']]), default=None)
+    merged['last_at']  = max(filter(None, [row['last_at'], archived['last_at']]), default=None)
+
+    for m in METRICS:
+        acc = archived['metrics'][m]
+        avg, std = row[f'{m}__avg'], row[f'{m}__stddev']
+        total = acc['sum'] + (avg * n_hot if n_hot else 0.0)
+        sumsq = acc['sumsq'] + (n_hot * (std ** 2 + avg ** 2) if n_hot else 0.0)
+        mean  = total / n if n else None
+        merged[f'{m}__avg']    = mean
+        merged[f'{m}__stddev'] = max(sumsq / n - mean ** 2, 0.0) ** 0.5 if n else None
+        merged[f'{m}__min']    = min(filter(lambda v: v is not None, [row[f'{m}__min'], acc['min']]), default=None)
+        merged[f'{m}__max']    = max(filter(lambda v: v is not None, [row[f'{m}__max'], acc['max']]), default=None)
+
+    for key, n_out in archived['out'].items():
+        merged[f'{key}__out'] = row[f'{key}__out'] + n_out
+    return merged
+
+
+def compute(tank, start, end=None) -> dict:
+    """
+    [start, end) 구간 통계.
+    반환: {
+        'count', 'first_at', 'last_at',
+        'metrics':  {지표: {'avg', 'min', 'max', 'stddev'}},
+        'out_of_range': {지표: {'count', 'ratio', 'seconds'}, 'any': {...}},
+        'log_levels': {'INFO': n, 'WARNING': n, 'DANGER': n},
+    }
+    이탈 시간은 측정 간격이 고르다는 가정 아래 (이탈 건수 비율 × 측정 구간 길이) 로 추정.
+    아카이브(Parquet)로 옮겨진 월이 구간에 걸치면 그 컬럼 집계를 합산.
+    """
+    readings = SensorReading.objects.filter(tank=tank, measured_at__gte=start)
+    logs     = EventLog.objects.filter(tank=tank, created_at__gte=start)
+    if end is not None:
+        readings = readings.filter(measured_at__lt=end)
+        logs     = logs.filter(created_at__lt=end)
+
+    ranges       = standards.for_tank(tank).ranges()
+    out_of_range = _out_of_range(ranges)
+    aggregates   = {'count': Count('id'), 'first_at': Min('measured_at'), 'last_at': Max('measured_at')}
+    for m in METRICS:
+        aggregates[f'{m}__avg']    = Avg(m)
+        aggregates[f'{m}__min']    = Min(m)
+        aggregates[f'{m}__max']    = Max(m)
+        aggregates[f'{m}__stddev'] = StdDev(m)
+    for m, cond in out_of_range.items():
+        aggregates[f'{m}__out'] = Count('id', filter=cond)
+    any_out = Q()
+    for cond in out_of_range.values():
+        any_out |= cond
+    aggregates['any__out'] = Count('id', filter=any_out)
+
+    row = readings.order_by().aggregate(**aggregates)
+    if archive.segments('readings', tank, start, end).exists():
+        row = _merge_archive(row, archive.aggregate(tank, list(METRICS), ranges, start, end))
+
+    count = row['count']
+    span  = (row['last_at'] - row['first_at']).total_seconds() if count else 0.0
+
+    def _out(key):
+        n     = row[f'{key}__out']
+        ratio = n / count if count else 0.0
+        return {'count': n, 'ratio': ratio, 'seconds': ratio * span}
+
+    levels = logs.order_by().aggregate(**{
+        level: Count('id', filter=Q(level=level)) for level, _ in EventLog.LEVEL_CHOICES
+    })
+
+    return {
+        'count':    count,
+        'first_at': row['first_at'],
+        'last_at':  row['last_at'],
+        'metrics':  {
+            m: {stat: row[f'{m}__{stat}'] for stat in ('avg', 'min', 'max', 'stddev')}
+            for m in METRICS
+        },
+        'out_of_range': {**{m: _out(m) for m in out_of_range}, 'any': _out('any')},
+        'log_levels':   levels,
+    }
+
+
+def _fmt(value, digits=2):
+    return '-' if value is None else f"{value:.{digits}f}"
+
+
+def _fmt_duration(seconds: float) -> str:
+    minutes = int(round(seconds / 60))
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}시간 {minutes}분" if hours else f"{minutes}분"
+
+
+def render_text(stats: dict) -> str:
+    """compute() 결과를 리포트 본문 텍스트로"""
+    lines = [f"📊 분석 데이터 수: {stats['count']}개"]
+
+    lines.append("")
+    lines.append("[센서 지표]  평균 / 최소 / 최대 / 표준편차")
+    for m, (label, unit) in METRICS.items():
+        st = stats['metrics'][m]
+        lines.append(
+            f"- {label}: {_fmt(st['avg'])} / {_fmt(st['min'])} / {_fmt(st['max'])} / {_fmt(st['stddev'])} {unit}".rstrip()
+        )
+
+    lines.append("")
+    lines.append("[기준치 이탈]")
+    for m, out in stats['out_of_range'].items():
+        label = '전체' if m == 'any' else METRICS[m][0]
+        lines.append(f"- {label}: {out['count']}건 ({out['ratio'] * 100:.1f}%, 약 {_fmt_duration(out['seconds'])})")
+
+    lines.append("")
+    levels = stats['log_levels']
+    lines.append(f"[이벤트] 정보 {levels['INFO']}건 / 경고 {levels['WARNING']}건 / 위험 {levels['DANGER']}건")
+    return "\n".join(lines)
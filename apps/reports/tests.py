@@ -1,3 +1,46 @@
+import statistics
+
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from monitoring.models import Tank, SensorReading, EventLog
+from .models import Report
+
+
+class StatReportTest(TestCase):
+    """통계 리포트는 기간 길이와 무관하게 DB 집계로 계산되어야 함"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='tester', password='pw-1234!')
+        self.client.force_login(self.user)
+        self.tank = Tank.objects.create(user=self.user, name='어항')
+
+    def test_aggregates_and_report_fields(self):
+        temps = [22.0, 23.0, 26.0, 19.0]
+        SensorReading.objects.bulk_create([
+            SensorReading(tank=self.tank, temperature=t, ph=7.4, water_quality_score=score)
+            for t, score in zip(temps, [100, 90, 70, 60])
+        ])
+        EventLog.objects.create(tank=self.tank, level='WARNING', message='w')
+        EventLog.objects.create(tank=self.tank, level='DANGER', message='d')
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f'/reports/create-stat/{self.tank.id}/?period=monthly', secure=True)
+        self.assertFalse([q for q in ctx.captured_queries if 'monitoring_sensorreading' in q['sql'] and 'AVG' not in q['sql'].upper()])
+
+        report = Report.objects.get(tank=self.tank)
+        self.assertEqual(report.report_type, 'MONTHLY')
+        self.assertAlmostEqual(report.avg_temp, statistics.mean(temps))
+        self.assertAlmostEqual(report.avg_ph, 7.4)
+        self.assertEqual(report.water_score, 80)
+        self.assertIn("수온: 22.50 / 19.00 / 26.00", report.content)
+        self.assertIn("- 수온: 2건 (50.0%", report.content)
+        self.assertIn("경고 1건 / 위험 1건", report.content)
 
-# Create your tests here.
+    def test_no_readings(self):
+        self.client.get(f'/reports/create-stat/{self.tank.id}/', secure=True)
+        report = Report.objects.get(tank=self.tank)
+        self.assertIsNone(report.avg_temp)
+        self.assertEqual(report.water_score, 100)
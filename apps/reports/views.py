@@ -7,8 +7,10 @@ from django.contrib import messages
 from django.http import HttpResponse
 
 # 모델 임포트: monitoring 앱의 모델을 참조합니다.
-from monitoring.models import Tank, SensorReading
+from monitoring import rollups
+from monitoring.models import Tank
 from .models import Report
+from . import stats
 
 @login_required
 def report_list(request):
@@ -28,15 +30,16 @@ def report_list(request):
 
     # 3. 정렬 및 데이터 가져오기
     sort_order = request.GET.get('sort', 'desc')
-    order_by = '-created_at' if sort_order == 'desc' else 'created_at'
-    
-    # 템플릿 하단 카드 리스트용 (SensorReading)
+    range_key = request.GET.get('range', 'recent')
+
+    # 템플릿 하단 카드 리스트용 (최근 SensorReading 또는 SensorRollup)
     report_data = []
+    granularity = None
     # 생성된 분석 리포트 목록용 (Report)
     reports = []
 
     if selected_tank:
-        report_data = selected_tank.readings.all().order_by(order_by)
+        report_data, granularity = rollups.report_rows(selected_tank, range_key, sort_order)
         reports = Report.objects.filter(tank=selected_tank).order_by('-created_at')
     
     context = {
@@ -46,6 +49,9 @@ def report_list(request):
         'report_data': report_data,     # [중요] 템플릿 하단 센서 카드용
         'reports': reports,             # 생성된 통계 리포트 목록용
         'sort': sort_order,             # 정렬 상태 유지
+        'range': range_key,             # 조회 범위 유지
+        'range_choices': rollups.REPORT_RANGE_CHOICES,
+        'granularity': granularity,     # 롤업 단위 (원본이면 None)
     }
     return render(request, 'reports/report_list.html', context)
 
@@ -58,30 +64,33 @@ def create_stat_report(request, tank_id):
     period = request.GET.get('period', 'daily')
     days = {'weekly': 7, 'monthly': 30}.get(period, 1)
     
-    # 분석 데이터 필터링
+    # 분석 데이터 집계 (DB 집계 쿼리 — 행을 가져오지 않음)
     start_date = timezone.now() - timedelta(days=days)
-    readings = SensorReading.objects.filter(tank=tank, created_at__gte=start_date)
+    result = stats.compute(tank, start_date)
 
     # 리포트 내용 생성
     content = f"[{period.upper()} 리포트] {tank.name}\n"
     content += f"분석 기준일: {start_date.strftime('%Y-%m-%d')} 이후\n"
     content += "-"*30 + "\n"
 
-    if readings.exists():
-        avg_temp = sum(r.temperature for r in readings) / readings.count()
-        content += f"🌡️ 평균 온도: {avg_temp:.2f}°C\n"
-        content += f"📊 분석 데이터 수: {readings.count()}개\n"
-        content += f"🕒 생성 일시: {timezone.now().strftime('%Y-%m-%d %H:%M')}\n\n"
-        content += "현재 수온 데이터 기반 분석이 완료되었습니다."
+    metrics = result['metrics']
+    if result['count']:
+        content += stats.render_text(result) + "\n\n"
+        content += f"🕒 생성 일시: {timezone.now().strftime('%Y-%m-%d %H:%M')}\n"
     else:
         content += "선택하신 기간 내에 기록된 센서 데이터가 부족하여 상세 분석이 어렵습니다."
 
     # DB에 리포트 저장 (Report 모델)
-    Report.objects.create(
-        tank=tank, 
-        report_type=period.upper(), 
-        content=content
+    report = Report(
+        tank=tank,
+        report_type=period.upper(),
+        content=content,
+        avg_ph=metrics['ph']['avg'],
+        avg_temp=metrics['temperature']['avg'],
     )
+    if metrics['water_quality_score']['avg'] is not None:
+        report.water_score = round(metrics['water_quality_score']['avg'])
+    report.save()
     
     messages.success(request, f"{tank.name}의 {period} 분석 리포트가 성공적으로 생성되었습니다.")
     # 생성 후 현재 어항 탭을 유지하며 리다이렉트
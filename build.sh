@@ -7,6 +7,9 @@ python manage.py collectstatic --no-input
 echo "=== DB 마이그레이션 ==="
 python manage.py migrate
 
+echo "=== 어항 상태 스냅샷 생성 (없는 어항만) ==="
+python manage.py rebuild_tank_state --missing
+
 echo "=== 관리자 계정 자동 생성 ==="
 python manage.py shell << 'EOF'
 import os
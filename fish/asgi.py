@@ -3,6 +3,11 @@ ASGI config for fish project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+대시보드 실시간 스트림(SSE)과 챗봇 토큰 스트리밍은 ASGI 에서만 동작합니다.
+챗봇 뷰(core/monitoring/chatbot)는 async — LLM 응답을 await 하는 동안 워커를 점유하지 않음
+(WSGI 에서는 기존처럼 한 번에 JSON 응답). 배포 예:
+    gunicorn fish.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -14,3 +19,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fish.settings')
 
 application = get_asgi_application()
+
+# 수신 후처리 큐 시작 — 재시작 전에 남은 작업도 바로 처리 (monitoring.jobs)
+from monitoring import jobs  # noqa: E402
+
+jobs.start()
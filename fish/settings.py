@@ -50,7 +50,7 @@ INSTALLED_APPS = [
 # 미들웨어 (WhiteNoise는 Security 바로 아래 위치가 최적)
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware', 
+    'fish.middleware.AsyncWhiteNoiseMiddleware',  # WhiteNoise (ASGI 비동기 대응)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -137,6 +137,75 @@ SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 
 # AI API 설정
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY_1') or os.getenv('GEMINI_API_KEY_2') or ""
+CHATBOT_LLM_BACKEND = 'chatbot.llm.GeminiBackend'   # 모델 레지스트리 백엔드 (테스트는 스텁으로 교체)
+CHATBOT_MODEL_TTL = 3600            # 초, 키별 모델 선택(list_models) 캐시 유지 시간
+CHATBOT_KEY_COOLDOWN = 60           # 초, 생성에 실패한 키를 건너뛰는 시간
+CHATBOT_ANSWER_CACHE = {            # 같은/비슷한 질문 답변 캐시 (프로세스 메모리)
+    'ttl':         24 * 3600,       # 초
+    'max_entries': 500,             # 초과 시 가장 오래 안 쓰인 답변부터 버림
+    'similarity':  0.8,             # 글자 3-gram 유사도 기준 (1: 정확히 같은 질문만)
+}
+CHATBOT_CONTEXT_TOKENS = 600        # 프롬프트에 넣는 어항 요약(monitoring.context)의 대략적인 토큰 상한
+CHATBOT_CONTEXT_MAX_AGE = 600       # 초, 이보다 오래된 어항 요약은 챗 요청 때 다시 계산 (수신이 멈춘 어항)
+CHATBOT_IMAGE = {                   # 사진 업로드 전처리 (chatbot.images)
+    'max_side':   1024,             # px, 긴 변 상한 (/monitoring/chat/ 은 512)
+    'max_pixels': 40_000_000,       # 디코딩 전 가로×세로 상한
+    'max_bytes':  300 * 1024,       # byte, 재인코딩 결과 상한
+    'executor':   'thread',         # 'thread' | 'process'
+    'workers':    2,
+    'cache':      'default',        # 원본 해시 → 결과 캐시 (CACHES 별칭)
+}
+
+# --- [캐시] ---
+
+# 기본 LocMem (워커별). 다중 워커 배포는 CACHE_BACKEND/CACHE_LOCATION 으로 Redis 등 공유 캐시 지정
+CACHES = {
+    'default': {
+        'BACKEND':  os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'fish-helper'),
+    },
+}
+
+# --- [모니터링 실시간 스트림] ---
+
+# 대시보드 SSE pub/sub 브로커 (기본: 프로세스 내부 전용)
+MONITORING_EVENT_BROKER = os.getenv('MONITORING_EVENT_BROKER', 'monitoring.events.LocalBroker')
+MONITORING_STREAM_KEEPALIVE = 15   # 초, 이벤트 없을 때 keepalive 주기
+MONITORING_STREAM_MAX_AGE = 300    # 초, 이후 연결 종료 → 브라우저 자동 재접속
+MONITORING_ROLLUP_ON_INGEST = True  # False 면 build_rollups --days 1 을 주기 실행
+MONITORING_RULES_TTL = 60           # 초, 워커별 수질 기준 캐시 유지 시간
+MONITORING_CONTROL = {}             # 장치별 자동 제어 타이밍 덮어쓰기 (monitoring.control.DEFAULT_TIMING 참고)
+
+# 수신 후처리 작업 큐 (기본: 웹 프로세스 내 스레드 풀)
+# 전용 워커를 둘 때는 'monitoring.jobs.DatabaseQueue' + python manage.py run_ingest_jobs
+MONITORING_JOB_QUEUE = os.getenv('MONITORING_JOB_QUEUE', 'monitoring.jobs.LocalQueue')
+MONITORING_JOBS = {}                # WORKERS / MAX_ATTEMPTS / BACKOFF / LEASE / SWEEP 덮어쓰기 (monitoring.jobs.DEFAULT_OPTIONS 참고)
+
+# Pi REST API 인증: 공용 키(선택) + 게이트웨이별 키(GatewayKey, create_gateway_key 명령으로 발급)
+PI_API_KEY = os.getenv('PI_API_KEY', '')
+MONITORING_API_KEY_TTL = 60         # 초, 워커별 인증 결과 캐시 유지 시간 (키 폐기 반영 지연 상한)
+MONITORING_API_KEY_CACHE_SIZE = 1024
+MONITORING_TANK_CACHE = 'default'   # Pi API 어항 메타데이터 캐시 (CACHES 별칭)
+MONITORING_TANK_CACHE_TTL = 300     # 초
+MONITORING_MAX_BODY_SIZE = 10 * 1024 * 1024  # gzip/zstd 요청 바디 압축 해제 상한(byte)
+MONITORING_IDEMPOTENCY_DAYS = 7    # 일, 재전송 판별 영수증 보관 기간 (purge_ingest_receipts)
+MONITORING_MAX_CLOCK_SKEW = 300    # 초, 게이트웨이 measured_at 이 서버 시각보다 이만큼 넘게 미래면 거부
+
+# --- [센서 히스토리 아카이브] ---
+
+# archive_history 명령이 오래된 월 단위 데이터를 Parquet 파일로 옮기는 위치
+MONITORING_ARCHIVE_DIR = Path(os.getenv('MONITORING_ARCHIVE_DIR', BASE_DIR / 'archive'))
+MONITORING_ARCHIVE_AFTER_DAYS = 90
+
+# --- [히스토리 파티션 / 보관 정책] ---
+
+# PostgreSQL 은 센서/행동 히스토리를 measured_at 월 파티션으로 저장 (SQLite 는 일반 테이블)
+# python manage.py enforce_retention 을 주기 실행 → 다음 달 파티션 생성 + 보관 기간 지난 월 DROP
+MONITORING_PARTITION_PREMAKE = 2    # 월, 미리 만들어 둘 파티션 수
+MONITORING_RETENTION = {            # 종류별 원본 보관 일수 (None: 무기한, 롤업은 삭제하지 않음)
+    'readings':  None,
+    'behaviors': None,
+}
 
 # --- [배포 환경 보안 설정] ---
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fish.settings')
 
 application = get_wsgi_application()
+
+# 수신 후처리 큐 시작 — 재시작 전에 남은 작업도 바로 처리 (monitoring.jobs)
+from monitoring import jobs  # noqa: E402
+
+jobs.start()